@@ -1,12 +1,32 @@
+import asyncio
+import hashlib
+import json
+import mimetypes
 import os
-from flask import Flask, render_template, request, jsonify, send_from_directory
+import threading
+import time
+from flask import Flask, render_template, request, jsonify, send_from_directory, url_for, g
+from flask.logging import default_handler
 from dotenv import load_dotenv
 from werkzeug.utils import secure_filename
 import uuid
-from utils.document_processor import DocumentProcessor
-from utils.quiz_generator import QuizGenerator
+from utils.assets import AssetManifest, compress, negotiate_encoding
+from utils.document_processor import AsyncDocumentProcessor, DocumentProcessor
+from utils.event_loop import BackgroundLoop
+from utils.knowledge_cache import KnowledgeCache
+from utils.knowledge_store import KnowledgeStore
+from utils.llm_client import get_llm_client
+from utils.page_encoder import PageEncoder
+from utils.quiz_generator import AsyncQuizGenerator, QuizGenerator
 from utils.session_manager import SessionManager
-import traceback
+from utils.storage import create_storage
+from utils.job_queue import JobQueue, QueueFullError
+from utils.logs import configure_logging, request_id_var
+from utils.metrics import REGISTRY, stage
+from utils.question_bank import QuestionBank
+from utils.batch import BatchProcessor
+from utils.maintenance import MaintenanceScheduler, Postpone
+from utils.startup import import_modules
 
 # Load environment variables
 load_dotenv()
@@ -16,12 +36,175 @@ app.config['SECRET_KEY'] = os.urandom(24)
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 10 * 1024 * 1024  # 10MB max file size
 app.config['ALLOWED_EXTENSIONS'] = {'pdf', 'xlsx', 'xls'}
+app.config['LOG_DIR'] = os.getenv('LOG_DIR', 'logs')
+app.config['LOG_LEVEL'] = os.getenv('LOG_LEVEL', 'INFO')
+app.config['LLM_BACKEND'] = os.getenv('LLM_BACKEND', 'anthropic')
+app.config['LLM_MAX_CONCURRENCY'] = int(os.getenv('LLM_MAX_CONCURRENCY', '8'))
+app.config['LLM_REQUESTS_PER_MINUTE'] = int(os.getenv('LLM_REQUESTS_PER_MINUTE', '0'))
+app.config['LLM_MAX_RETRIES'] = int(os.getenv('LLM_MAX_RETRIES', '5'))
+app.config['LLM_DEADLINE_SECONDS'] = float(os.getenv('LLM_DEADLINE_SECONDS', '600'))
+app.config['LLM_POOL_CONNECTIONS'] = int(os.getenv('LLM_POOL_CONNECTIONS', '20'))
+app.config['LLM_ASYNC'] = os.getenv('LLM_ASYNC', 'false').lower() == 'true'
+app.config['LLM_ASYNC_MAX_CONCURRENCY'] = int(os.getenv('LLM_ASYNC_MAX_CONCURRENCY', '200'))
+app.config['ASYNC_EXECUTOR_WORKERS'] = int(os.getenv('ASYNC_EXECUTOR_WORKERS', '0')) or None
+app.config['KNOWLEDGE_CACHE_PATH'] = os.getenv('KNOWLEDGE_CACHE_PATH', 'data/cache/knowledge.db')
+app.config['KNOWLEDGE_CACHE_MAX_BYTES'] = int(os.getenv('KNOWLEDGE_CACHE_MAX_MB', '200')) * 1024 * 1024
+app.config['KNOWLEDGE_CACHE_MAX_AGE_HOURS'] = int(os.getenv('KNOWLEDGE_CACHE_MAX_AGE_HOURS', '720'))
+app.config['KNOWLEDGE_STORE_PATH'] = os.getenv('KNOWLEDGE_STORE_PATH', 'data/knowledge_store.db')
+app.config['PDF_RENDER_CHUNK_PAGES'] = int(os.getenv('PDF_RENDER_CHUNK_PAGES', '4'))
+app.config['PDF_ENCODE_WORKERS'] = int(os.getenv('PDF_ENCODE_WORKERS', '0')) or None
+app.config['PAGE_IMAGE_FORMAT'] = os.getenv('PAGE_IMAGE_FORMAT', 'auto')
+app.config['PAGE_MAX_LONG_EDGE'] = int(os.getenv('PAGE_MAX_LONG_EDGE', '1568'))
+app.config['PAGE_MAX_BYTES'] = int(os.getenv('PAGE_MAX_KB', '400')) * 1024
+app.config['PAGE_TEXT_ONLY'] = os.getenv('PAGE_TEXT_ONLY', 'false').lower() == 'true'
+app.config['EXTRACT_MAP_REDUCE_MIN_PAGES'] = int(os.getenv('EXTRACT_MAP_REDUCE_MIN_PAGES', '20'))
+app.config['EXTRACT_MAP_REDUCE_MIN_CHARS'] = int(os.getenv('EXTRACT_MAP_REDUCE_MIN_CHARS', '100000'))
+app.config['EXTRACT_CHUNK_PAGES'] = int(os.getenv('EXTRACT_CHUNK_PAGES', '10'))
+app.config['EXTRACT_WORKERS'] = int(os.getenv('EXTRACT_WORKERS', '4'))
+app.config['SHEET_MAX_CHARS'] = int(os.getenv('SHEET_MAX_CHARS', '200000'))
+app.config['SHEET_CHUNK_CHARS'] = int(os.getenv('SHEET_CHUNK_CHARS', '50000'))
+app.config['STORAGE_BACKEND'] = os.getenv('STORAGE_BACKEND', 'json')
+app.config['STORAGE_DB_PATH'] = os.getenv('STORAGE_DB_PATH', 'data/webquiz.db')
+app.config['STORAGE_FORMAT'] = os.getenv('STORAGE_FORMAT', 'json')
+app.config['STORAGE_COMPRESSION'] = os.getenv('STORAGE_COMPRESSION', 'none')
+app.config['SESSION_CACHE_SIZE'] = int(os.getenv('SESSION_CACHE_SIZE', '256'))
+app.config['SESSION_FLUSH_INTERVAL'] = float(os.getenv('SESSION_FLUSH_INTERVAL', '2'))
+app.config['SESSION_WRITE_BEHIND'] = os.getenv('SESSION_WRITE_BEHIND', 'true').lower() == 'true'
+app.config['JOB_DB_PATH'] = os.getenv('JOB_DB_PATH', 'data/jobs.db')
+app.config['JOB_WORKERS'] = int(os.getenv('JOB_WORKERS', '4'))
+app.config['JOB_MAX_PENDING'] = int(os.getenv('JOB_MAX_PENDING', '50'))
+app.config['JOB_MAX_PENDING_ASYNC'] = int(os.getenv('JOB_MAX_PENDING_ASYNC', '500'))
+app.config['QUESTION_BANK_PATH'] = os.getenv('QUESTION_BANK_PATH', 'data/question_bank.db')
+app.config['QUESTION_POOL_SIZE'] = int(os.getenv('QUESTION_POOL_SIZE', '40'))
+app.config['QUESTION_POOL_MIN'] = int(os.getenv('QUESTION_POOL_MIN', '20'))
+app.config['QUESTION_PREWARM'] = os.getenv('QUESTION_PREWARM', 'false').lower() == 'true'
+app.config['BATCH_WORKERS'] = int(os.getenv('BATCH_WORKERS', '4'))
+app.config['BATCH_MAX_FILES'] = int(os.getenv('BATCH_MAX_FILES', '50'))
+app.config['QUIZ_CACHE_SECONDS'] = int(os.getenv('QUIZ_CACHE_SECONDS', '3600'))
+app.config['QUIZ_MAX_QUESTIONS'] = int(os.getenv('QUIZ_MAX_QUESTIONS', '50'))
+app.config['COMPRESS_MIN_BYTES'] = int(os.getenv('COMPRESS_MIN_BYTES', '1024'))
+app.config['SESSION_MAX_AGE_HOURS'] = float(os.getenv('SESSION_MAX_AGE_HOURS', '24'))
+app.config['UPLOAD_MAX_AGE_HOURS'] = float(os.getenv('UPLOAD_MAX_AGE_HOURS', '2'))
+app.config['MAINTENANCE_DB_PATH'] = os.getenv('MAINTENANCE_DB_PATH', 'data/maintenance.db')
+app.config['MAINTENANCE_INTERVAL'] = float(os.getenv('MAINTENANCE_INTERVAL', '60'))
+app.config['MAINTENANCE_BATCH_SIZE'] = int(os.getenv('MAINTENANCE_BATCH_SIZE', '200'))
+app.config['WARM_UP'] = os.getenv('WARM_UP', 'true').lower() == 'true'
+
+os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+configure_logging(app.config['LOG_DIR'], app.config['LOG_LEVEL'])
+app.logger.removeHandler(default_handler)
+
+asset_manifest = AssetManifest(app.static_folder)
+if not asset_manifest.built:
+    app.logger.warning("No frontend asset build in static/dist; pages load Tailwind from the CDN. "
+                       "Run python -m utils.assets to build it.")
+
+# Response types worth compressing on the fly
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/html', 'text/plain', 'text/css', 'text/javascript'}
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    'webquiz_request_seconds', 'HTTP request latency by route', ('method', 'route', 'status')
+)
+
+@app.before_request
+def start_request():
+    """Assign a request ID and start the request timer."""
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+    g.request_token = request_id_var.set(g.request_id)
+    g.request_started = time.perf_counter()
+    maintenance.ensure_started()
+
+@app.after_request
+def finish_request(response):
+    """Record route latency, log the request and return its ID."""
+    if 'request_started' not in g:
+        return response
+
+    elapsed = time.perf_counter() - g.request_started
+    # Label by route template, not path, so session IDs do not create new series
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    REQUEST_SECONDS.observe(elapsed, method=request.method, route=route, status=response.status_code)
+
+    app.logger.info('request', extra={
+        'method': request.method,
+        'path': request.path,
+        'route': route,
+        'status': response.status_code,
+        'duration_ms': round(elapsed * 1000, 1)
+    })
+
+    response.headers['X-Request-ID'] = g.request_id
+    return response
+
+@app.after_request
+def compress_response(response):
+    """Compress JSON and HTML responses with brotli or gzip when the client accepts it."""
+    if (response.status_code < 200 or response.status_code >= 300
+            or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    if response.content_length is None or response.content_length < app.config['COMPRESS_MIN_BYTES']:
+        return response
+
+    encoding = negotiate_encoding(request.accept_encodings)
+    if encoding:
+        with stage('compress'):
+            response.set_data(compress(response.get_data(), encoding))
+        response.headers['Content-Encoding'] = encoding
+
+    return response
+
+@app.context_processor
+def asset_helpers():
+    """Template helpers for linking built assets."""
+    return {
+        'asset_url': lambda name: url_for('static', filename=asset_manifest.path(name)),
+        'assets_built': asset_manifest.built
+    }
+
+@app.teardown_request
+def clear_request_id(error=None):
+    """Forget the request ID once the request is done."""
+    if 'request_token' in g:
+        request_id_var.reset(g.request_token)
+        del g.request_token
 
 def allowed_file(filename):
     """Check if file extension is allowed."""
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
+def valid_num_questions(num_questions):
+    """Check a requested question count is an integer within QUIZ_MAX_QUESTIONS."""
+    return (isinstance(num_questions, int) and not isinstance(num_questions, bool)
+            and 1 <= num_questions <= app.config['QUIZ_MAX_QUESTIONS'])
+
+def num_questions_error():
+    """400 response for an invalid question count."""
+    return jsonify({
+        'error': f"num_questions must be a whole number from 1 to {app.config['QUIZ_MAX_QUESTIONS']}"
+    }), 400
+
+@app.route('/static/dist/<path:filename>')
+def dist_asset(filename):
+    """Serve a fingerprinted asset, precompressed when the client accepts it."""
+    send_name, encoding = asset_manifest.encoded(filename, request.accept_encodings)
+    response = send_from_directory(
+        asset_manifest.dist_dir, send_name,
+        mimetype=mimetypes.guess_type(filename)[0],
+        max_age=365 * 24 * 3600
+    )
+    # The name changes with the content, so browsers never need to revalidate
+    response.cache_control.immutable = True
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+
+    return response
+
 @app.route('/')
 def index():
     """Render upload page."""
@@ -33,13 +216,272 @@ def health():
     return jsonify({'status': 'ok'})
 
 # Initialize utilities
-document_processor = DocumentProcessor()
-quiz_generator = QuizGenerator()
-session_manager = SessionManager()
+llm_client = get_llm_client(
+    backend=app.config['LLM_BACKEND'],
+    max_concurrency=app.config['LLM_MAX_CONCURRENCY'],
+    requests_per_minute=app.config['LLM_REQUESTS_PER_MINUTE'],
+    max_retries=app.config['LLM_MAX_RETRIES'],
+    deadline_seconds=app.config['LLM_DEADLINE_SECONDS'],
+    pool_connections=app.config['LLM_POOL_CONNECTIONS'],
+    async_max_concurrency=app.config['LLM_ASYNC_MAX_CONCURRENCY']
+)
+knowledge_cache = KnowledgeCache(
+    app.config['KNOWLEDGE_CACHE_PATH'],
+    max_bytes=app.config['KNOWLEDGE_CACHE_MAX_BYTES'],
+    max_age_hours=app.config['KNOWLEDGE_CACHE_MAX_AGE_HOURS']
+)
+knowledge_store = KnowledgeStore(app.config['KNOWLEDGE_STORE_PATH'])
+# Event loop running Claude jobs as coroutines when LLM_ASYNC is enabled
+event_loop = BackgroundLoop(executor_workers=app.config['ASYNC_EXECUTOR_WORKERS'])
+document_processor = DocumentProcessor(
+    cache=knowledge_cache,
+    llm=llm_client,
+    render_chunk_pages=app.config['PDF_RENDER_CHUNK_PAGES'],
+    encode_workers=app.config['PDF_ENCODE_WORKERS'],
+    encoder=PageEncoder(
+        max_long_edge=app.config['PAGE_MAX_LONG_EDGE'],
+        max_bytes=app.config['PAGE_MAX_BYTES'],
+        image_format=app.config['PAGE_IMAGE_FORMAT'],
+        text_pages=app.config['PAGE_TEXT_ONLY']
+    ),
+    map_reduce_min_pages=app.config['EXTRACT_MAP_REDUCE_MIN_PAGES'],
+    map_reduce_min_chars=app.config['EXTRACT_MAP_REDUCE_MIN_CHARS'],
+    chunk_pages=app.config['EXTRACT_CHUNK_PAGES'],
+    extract_workers=app.config['EXTRACT_WORKERS'],
+    sheet_max_chars=app.config['SHEET_MAX_CHARS'],
+    sheet_chunk_chars=app.config['SHEET_CHUNK_CHARS']
+)
+async_document_processor = AsyncDocumentProcessor(document_processor)
+question_bank = QuestionBank(app.config['QUESTION_BANK_PATH'])
+quiz_generator = QuizGenerator(
+    llm=llm_client,
+    bank=question_bank,
+    pool_size=app.config['QUESTION_POOL_SIZE'],
+    pool_min=app.config['QUESTION_POOL_MIN']
+)
+async_quiz_generator = AsyncQuizGenerator(quiz_generator, event_loop)
+session_manager = SessionManager(
+    cache_size=app.config['SESSION_CACHE_SIZE'],
+    flush_interval=app.config['SESSION_FLUSH_INTERVAL'],
+    write_behind=app.config['SESSION_WRITE_BEHIND'],
+    storage=create_storage(
+        app.config['STORAGE_BACKEND'],
+        db_path=app.config['STORAGE_DB_PATH'],
+        data_format=app.config['STORAGE_FORMAT'],
+        compression=app.config['STORAGE_COMPRESSION']
+    )
+)
+job_queue = JobQueue(
+    app.config['JOB_DB_PATH'],
+    max_workers=app.config['JOB_WORKERS'],
+    max_pending=app.config['JOB_MAX_PENDING'],
+    loop=event_loop,
+    max_pending_async=app.config['JOB_MAX_PENDING_ASYNC']
+)
+batch_processor = BatchProcessor(
+    document_processor, quiz_generator, question_bank,
+    max_workers=app.config['BATCH_WORKERS']
+)
+
+maintenance = MaintenanceScheduler(
+    app.config['MAINTENANCE_DB_PATH'],
+    interval=app.config['MAINTENANCE_INTERVAL'],
+    batch_size=app.config['MAINTENANCE_BATCH_SIZE']
+)
+
+def expire_session(session_id):
+    """Maintenance: delete a session idle for SESSION_MAX_AGE_HOURS."""
+    deleted, next_check = session_manager.expire_session(
+        session_id, app.config['SESSION_MAX_AGE_HOURS'] * 3600
+    )
+    if next_check:
+        return Postpone(next_check)
+    return 0 if deleted else None
+
+def expire_upload(file_path):
+    """Maintenance: delete an upload no quiz was generated from."""
+    try:
+        size = os.path.getsize(file_path)
+        os.remove(file_path)
+    except FileNotFoundError:
+        return None
+    return size
+
+def expire_knowledge(file_id):
+    """Maintenance: forget the knowledge of an upload after UPLOAD_MAX_AGE_HOURS."""
+    return knowledge_store.delete(file_id)
+
+def existing_sessions():
+    """Sessions stored before the expiry index existed."""
+    max_age = app.config['SESSION_MAX_AGE_HOURS'] * 3600
+    for session_id, updated_at in session_manager.storage.iter_session_updates():
+        yield session_id, updated_at + max_age
+
+def existing_uploads():
+    """Uploads saved before the expiry index existed."""
+    max_age = app.config['UPLOAD_MAX_AGE_HOURS'] * 3600
+    with os.scandir(app.config['UPLOAD_FOLDER']) as entries:
+        for entry in entries:
+            if entry.is_file() and not entry.name.startswith('.'):
+                yield os.path.join(app.config['UPLOAD_FOLDER'], entry.name), entry.stat().st_mtime + max_age
+
+maintenance.register('session', expire_session, backfill=existing_sessions)
+maintenance.register('upload', expire_upload, backfill=existing_uploads)
+maintenance.register('knowledge', expire_knowledge)
+maintenance.register_periodic('knowledge_cache', knowledge_cache.evict)
+
+def schedule_upload_expiry(kind, key):
+    """Delete an upload (or its knowledge) after UPLOAD_MAX_AGE_HOURS unless it is cleaned up sooner."""
+    maintenance.schedule(kind, key, time.time() + app.config['UPLOAD_MAX_AGE_HOURS'] * 3600)
+
+def warm_up():
+    """
+    Load what the first upload and quiz would otherwise wait for.
+
+    The Claude SDK, PDF and spreadsheet libraries are imported on first use
+    so the server answers /health quickly after a restart; this loads them,
+    creates the Claude HTTP client and compiles the page templates.
+
+    Returns:
+        dict: Seconds spent per step
+    """
+    timings = import_modules()
+
+    started = time.perf_counter()
+    llm_client.warm_up()
+    timings['llm_client'] = round(time.perf_counter() - started, 3)
+
+    started = time.perf_counter()
+    for template in ('index.html', 'quiz.html', 'results.html', 'history.html'):
+        app.jinja_env.get_template(template)
+    timings['templates'] = round(time.perf_counter() - started, 3)
+
+    app.logger.info("Warm-up finished", extra={'warm_up': timings})
+    return timings
+
+def start_warm_up():
+    """Run warm_up() in a background thread of this process."""
+    threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
+
+REGISTRY.gauge('webquiz_jobs_pending', 'Queued plus running jobs in this process',
+               lambda: sum(job_queue.stats()[key] for key in ('pending', 'pending_async')))
+REGISTRY.gauge('webquiz_llm_queue_depth', 'Claude calls waiting for the limiter',
+               lambda: llm_client.stats()['limiter']['queue_depth'])
+REGISTRY.gauge('webquiz_llm_in_flight', 'Claude calls in flight',
+               lambda: llm_client.stats()['limiter']['in_flight'])
+REGISTRY.gauge('webquiz_sessions_cached', 'Sessions held in the in-memory cache',
+               lambda: session_manager.stats()['cached'])
+REGISTRY.gauge('webquiz_sessions_dirty', 'Sessions waiting for the write-behind flush',
+               lambda: session_manager.stats()['dirty'])
+REGISTRY.gauge('webquiz_knowledge_cache_hit_rate', 'Knowledge cache hit rate',
+               lambda: knowledge_cache.stats()['hit_rate'])
+
+def process_upload(file_path, file_extension, file_id, document_name):
+    """Job: extract knowledge from a saved upload and keep it under the file_id."""
+    try:
+        result = document_processor.process_document(file_path, file_extension)
+    finally:
+        # The knowledge is all later steps need, so the file can go right away
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+    return store_knowledge(result, file_id, document_name, quiz_generator)
+
+async def process_upload_async(file_path, file_extension, file_id, document_name):
+    """Job: process_upload() as a coroutine on the event loop."""
+    try:
+        result = await async_document_processor.process_document(file_path, file_extension)
+    finally:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+    return await asyncio.to_thread(store_knowledge, result, file_id, document_name, async_quiz_generator)
+
+def store_knowledge(result, file_id, document_name, generator):
+    """Keep extracted knowledge under the file_id and build the upload job result."""
+    knowledge = result['knowledge']
+    knowledge_store.put(file_id, knowledge, document_name, result['type'])
+    schedule_upload_expiry('knowledge', file_id)
+
+    # Start banking questions now rather than when the user clicks Start Quiz
+    if app.config['QUESTION_PREWARM']:
+        generator.prewarm(knowledge, document_name)
+
+    return {
+        'file_id': file_id,
+        'document_type': result['type'],
+        'knowledge_chars': len(knowledge),
+        'cached': result['cached'],
+        'cache_key': result.get('cache_key'),
+        'encoding': result.get('encoding')
+    }
+
+def process_quiz(session_id, file_id, num_questions):
+    """Job: stream generated or pooled questions into an already created session."""
+    try:
+        upload = knowledge_store.get(file_id)
+        if upload is None:
+            raise ValueError('Uploaded document has expired. Please upload it again.')
+
+        knowledge, document_name = upload['knowledge'], upload['document_name']
+        questions = quiz_generator.generate_quiz_stream(knowledge, num_questions, document_name)
+        for question in questions:
+            session_manager.append_questions(session_id, [question])
+    except Exception as e:
+        session_manager.finish_generation(session_id, error=str(e))
+        raise
+    else:
+        session_manager.finish_generation(session_id)
+
+    session = session_manager.get_session(session_id)
+
+    return {
+        'session_id': session_id,
+        'total_questions': len(session['questions'])
+    }
+
+async def process_quiz_async(session_id, file_id, num_questions):
+    """Job: process_quiz() as a coroutine on the event loop."""
+    try:
+        upload = await asyncio.to_thread(knowledge_store.get, file_id)
+        if upload is None:
+            raise ValueError('Uploaded document has expired. Please upload it again.')
+
+        knowledge, document_name = upload['knowledge'], upload['document_name']
+        questions = async_quiz_generator.generate_quiz_stream(knowledge, num_questions, document_name)
+        async for question in questions:
+            await asyncio.to_thread(session_manager.append_questions, session_id, [question])
+    except Exception as e:
+        await asyncio.to_thread(session_manager.finish_generation, session_id, error=str(e))
+        raise
+    else:
+        await asyncio.to_thread(session_manager.finish_generation, session_id)
+
+    session = await asyncio.to_thread(session_manager.get_session, session_id)
+
+    return {
+        'session_id': session_id,
+        'total_questions': len(session['questions'])
+    }
+
+def submit_llm_job(kind, func, async_func, *args):
+    """Queue a Claude job: as a coroutine on the event loop with LLM_ASYNC, otherwise on a worker thread."""
+    if app.config['LLM_ASYNC']:
+        return job_queue.submit_async(kind, async_func, *args)
+    return job_queue.submit(kind, func, *args)
+
+def process_batch(file_paths, document_names, num_questions):
+    """Job: bank questions for a batch of saved uploads."""
+    try:
+        return batch_processor.run(file_paths, num_questions, document_names=document_names)
+    finally:
+        for file_path in file_paths:
+            if os.path.exists(file_path):
+                os.remove(file_path)
 
 @app.route('/upload', methods=['POST'])
 def upload_document():
-    """Handle document upload and processing."""
+    """Handle document upload and queue processing."""
     try:
         # Check if file was uploaded
         if 'file' not in request.files:
@@ -60,73 +502,253 @@ def upload_document():
         saved_filename = f"{file_id}.{file_extension}"
         file_path = os.path.join(app.config['UPLOAD_FOLDER'], saved_filename)
 
-        file.save(file_path)
+        with stage('upload_save'):
+            file.save(file_path)
+        schedule_upload_expiry('upload', file_path)
 
-        # Process document
+        # Queue document processing
         try:
-            result = document_processor.process_document(file_path, file_extension)
-
-            # Return knowledge and file info
-            return jsonify({
-                'success': True,
-                'file_id': file_id,
-                'filename': filename,
-                'knowledge': result['knowledge'],
-                'document_type': result['type']
-            })
-
-        except Exception as e:
-            # Clean up file on processing error
-            if os.path.exists(file_path):
-                os.remove(file_path)
+            job_id = submit_llm_job(
+                'upload', process_upload, process_upload_async,
+                file_path, file_extension, file_id, filename
+            )
+        except QueueFullError as e:
+            os.remove(file_path)
+            return jsonify({'error': str(e)}), 503, {'Retry-After': '5'}
 
-            return jsonify({
-                'error': f'Failed to process document: {str(e)}'
-            }), 500
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'file_id': file_id,
+            'filename': filename
+        }), 202
 
     except Exception as e:
-        traceback.print_exc()
+        app.logger.exception("Upload failed")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/generate-quiz', methods=['POST'])
 def generate_quiz():
-    """Generate quiz questions from processed knowledge."""
+    """Queue quiz generation from the knowledge extracted for an upload."""
     try:
         data = request.get_json()
 
-        knowledge = data.get('knowledge')
+        file_id = data.get('file_id')
         num_questions = data.get('num_questions', 10)
         user_id = data.get('user_id')
-        document_name = data.get('document_name')
-        file_id = data.get('file_id')
 
-        if not knowledge:
-            return jsonify({'error': 'No knowledge provided'}), 400
+        if not file_id:
+            return jsonify({'error': 'No file_id provided'}), 400
+
+        if not valid_num_questions(num_questions):
+            return num_questions_error()
 
         if not user_id:
             return jsonify({'error': 'No user_id provided'}), 400
 
-        # Generate quiz questions
-        questions = quiz_generator.generate_quiz(knowledge, num_questions)
+        upload = knowledge_store.describe(file_id)
+        if upload is None:
+            return jsonify({'error': 'Uploaded document not found or expired. Please upload it again.'}), 404
+        document_name = upload['document_name']
 
-        # Create session
-        session_id = session_manager.create_session(user_id, document_name, questions)
+        # Create the session up front so questions can be served while the rest generate
+        session_id = session_manager.create_session(
+            user_id, document_name, [], expected_questions=num_questions
+        )
+        maintenance.schedule('session', session_id,
+                             time.time() + app.config['SESSION_MAX_AGE_HOURS'] * 3600)
 
-        # Clean up uploaded file
-        if file_id:
-            for ext in ['pdf', 'xlsx', 'xls']:
-                file_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{file_id}.{ext}")
-                if os.path.exists(file_path):
-                    os.remove(file_path)
+        try:
+            job_id = submit_llm_job(
+                'generate_quiz', process_quiz, process_quiz_async,
+                session_id, file_id, num_questions
+            )
+        except QueueFullError as e:
+            session_manager.delete_session(session_id)
+            return jsonify({'error': str(e)}), 503, {'Retry-After': '5'}
 
         return jsonify({
             'success': True,
+            'job_id': job_id,
             'session_id': session_id,
-            'total_questions': len(questions)
-        })
+            'total_questions': num_questions
+        }), 202
+
+    except Exception as e:
+        app.logger.exception("Quiz generation request failed")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/batch', methods=['POST'])
+def batch_generate():
+    """Queue question bank generation for several uploaded documents."""
+    try:
+        files = [file for file in request.files.getlist('files') if file.filename]
+
+        if not files:
+            return jsonify({'error': 'No files provided'}), 400
+
+        if len(files) > app.config['BATCH_MAX_FILES']:
+            return jsonify({'error': f"At most {app.config['BATCH_MAX_FILES']} files per batch"}), 400
+
+        invalid = [file.filename for file in files if not allowed_file(file.filename)]
+        if invalid:
+            return jsonify({'error': f"Invalid file type: {', '.join(invalid)}"}), 400
+
+        num_questions = request.form.get('num_questions', '10')
+        num_questions = int(num_questions) if num_questions.isdigit() else None
+        if not valid_num_questions(num_questions):
+            return num_questions_error()
+
+        # Save uploaded files
+        file_paths = []
+        document_names = []
+        for file in files:
+            filename = secure_filename(file.filename)
+            file_extension = filename.rsplit('.', 1)[1].lower()
+            file_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{uuid.uuid4()}.{file_extension}")
+            with stage('upload_save'):
+                file.save(file_path)
+            schedule_upload_expiry('upload', file_path)
+            file_paths.append(file_path)
+            document_names.append(filename)
+
+        try:
+            job_id = job_queue.submit(
+                'batch', process_batch, file_paths, document_names, num_questions
+            )
+        except QueueFullError as e:
+            for file_path in file_paths:
+                os.remove(file_path)
+            return jsonify({'error': str(e)}), 503, {'Retry-After': '5'}
+
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'files': document_names
+        }), 202
+
+    except Exception as e:
+        app.logger.exception("Batch request failed")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/bank/stats', methods=['GET'])
+def bank_stats():
+    """Get question bank size."""
+    return jsonify(question_bank.stats())
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get status and result of a queued job."""
+    job = job_queue.get(job_id)
+
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+
+    return jsonify(job)
+
+def public_question(question):
+    """Question fields a client may see, without answers or explanation."""
+    safe_question = {
+        'id': question['id'],
+        'type': question['type'],
+        'question': question['question']
+    }
+
+    if question['type'] == 'multiple_choice':
+        safe_question['options'] = question['options']
+
+    return safe_question
+
+def valid_question_num(question_num):
+    """Check a submitted question number is an integer (JSON true/false are not)."""
+    return isinstance(question_num, int) and not isinstance(question_num, bool)
+
+def grade_answer(question, user_answer):
+    """
+    Check an answer against a question.
+
+    Args:
+        question: Question dict from the session
+        user_answer: Answer text submitted by the user
+
+    Returns:
+        tuple: (is_correct, answer record for the results review)
+    """
+    is_correct = False
+
+    if question['type'] == 'multiple_choice':
+        is_correct = user_answer.strip() == question['correct_answer'].strip()
+    elif question['type'] == 'fill_blank':
+        # Case-insensitive comparison with acceptable answers
+        user_answer_lower = user_answer.strip().lower()
+        acceptable = [ans.lower() for ans in question.get('acceptable_answers', [question['correct_answer']])]
+        is_correct = user_answer_lower in acceptable
+
+    return is_correct, {
+        'qid': question.get('qid') or QuestionBank.question_id(question),
+        'question': question['question'],
+        'user_answer': user_answer,
+        'correct_answer': question['correct_answer'],
+        'is_correct': is_correct,
+        'explanation': question.get('explanation', '')
+    }
+
+def cacheable_json(payload, max_age=0):
+    """
+    Build a JSON response with an ETag (compressed by compress_response).
+
+    Args:
+        payload: JSON-serializable data
+        max_age: Seconds the browser may reuse it without revalidating
+
+    Returns:
+        Response (304 Not Modified if the client's copy is current)
+    """
+    body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+    response = app.response_class(body, mimetype='application/json')
+    # Weak, so the same ETag stays valid for the compressed body
+    response.set_etag(hashlib.sha256(body).hexdigest()[:32], weak=True)
+    response.headers['Cache-Control'] = f'private, max-age={max_age}' if max_age else 'private, no-cache'
+
+    return response.make_conditional(request)
+
+@app.route('/quiz/<session_id>', methods=['GET'])
+def get_quiz(session_id):
+    """Get every generated question of a quiz at once, without answers."""
+    try:
+        session = session_manager.get_session(session_id)
+
+        if not session:
+            return jsonify({'error': 'Session not found'}), 404
+
+        generation_status = session.get('generation_status', 'complete')
+
+        if generation_status == 'failed':
+            return jsonify({
+                'error': f"Quiz generation failed: {session.get('generation_error', '')}"
+            }), 500
+
+        payload = {
+            'session_id': session_id,
+            'document_name': session['document_name'],
+            'total_questions': session.get('total_questions', len(session['questions'])),
+            'generation_status': generation_status,
+            'questions': [public_question(question) for question in session['questions']],
+            # Lets a reloaded page restore the score and skip answered questions
+            'current_score': session['correct_count'],
+            'answered': sorted(
+                answer['question_num'] for answer in session['user_answers']
+                if answer.get('question_num') is not None
+            )
+        }
+
+        # Questions never change once generation has finished
+        max_age = app.config['QUIZ_CACHE_SECONDS'] if generation_status == 'complete' else 0
+        return cacheable_json(payload, max_age)
 
     except Exception as e:
-        traceback.print_exc()
+        app.logger.exception("Loading quiz failed")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/question/<session_id>/<int:question_num>', methods=['GET'])
@@ -139,42 +761,53 @@ def get_question(session_id, question_num):
             return jsonify({'error': 'Session not found'}), 404
 
         questions = session['questions']
+        total_questions = session.get('total_questions', len(questions))
+        generation_status = session.get('generation_status', 'complete')
 
-        if question_num < 0 or question_num >= len(questions):
+        if generation_status == 'failed':
+            return jsonify({
+                'error': f"Quiz generation failed: {session.get('generation_error', '')}"
+            }), 500
+
+        if question_num < 0 or question_num >= total_questions:
             return jsonify({'error': 'Invalid question number'}), 400
 
-        question = questions[question_num]
+        if question_num >= len(questions):
+            # Question is still being generated
+            return jsonify({
+                'pending': True,
+                'question_num': question_num,
+                'total_questions': total_questions
+            }), 202
 
         # Return question without correct answer
-        safe_question = {
-            'id': question['id'],
-            'type': question['type'],
-            'question': question['question'],
+        safe_question = public_question(questions[question_num])
+        safe_question.update({
             'question_num': question_num,
-            'total_questions': len(questions),
+            'total_questions': total_questions,
             'current_score': session['correct_count']
-        }
-
-        if question['type'] == 'multiple_choice':
-            safe_question['options'] = question['options']
+        })
 
         return jsonify(safe_question)
 
     except Exception as e:
-        traceback.print_exc()
+        app.logger.exception("Loading question failed")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/submit-answer', methods=['POST'])
 def submit_answer():
     """Submit and check an answer."""
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True)
+
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Missing required fields'}), 400
 
         session_id = data.get('session_id')
         question_num = data.get('question_num')
         user_answer = data.get('answer')
 
-        if not session_id or question_num is None or user_answer is None:
+        if not session_id or not valid_question_num(question_num) or not isinstance(user_answer, str):
             return jsonify({'error': 'Missing required fields'}), 400
 
         session = session_manager.get_session(session_id)
@@ -183,47 +816,83 @@ def submit_answer():
             return jsonify({'error': 'Session not found'}), 404
 
         questions = session['questions']
-        question = questions[question_num]
 
-        # Check if answer is correct
-        is_correct = False
-
-        if question['type'] == 'multiple_choice':
-            is_correct = user_answer.strip() == question['correct_answer'].strip()
-        elif question['type'] == 'fill_blank':
-            # Case-insensitive comparison with acceptable answers
-            user_answer_lower = user_answer.strip().lower()
-            acceptable = [ans.lower() for ans in question.get('acceptable_answers', [question['correct_answer']])]
-            is_correct = user_answer_lower in acceptable
-
-        # Update session
-        if is_correct:
-            session['correct_count'] += 1
-
-        # Record answer
-        session['user_answers'].append({
-            'question': question['question'],
-            'user_answer': user_answer,
-            'correct_answer': question['correct_answer'],
-            'is_correct': is_correct,
-            'explanation': question.get('explanation', '')
-        })
+        if question_num < 0 or question_num >= len(questions):
+            return jsonify({'error': 'Invalid question number'}), 400
 
-        session['current_question'] = question_num + 1
+        question = questions[question_num]
+        is_correct, answer = grade_answer(question, user_answer)
 
-        session_manager.update_session(session_id, session)
+        # Record answer and update score; a repeated submit returns the first answer
+        session, recorded = session_manager.record_answer(session_id, question_num, answer, is_correct)
 
         # Return feedback
         return jsonify({
-            'is_correct': is_correct,
+            'is_correct': recorded['is_correct'],
             'correct_answer': question['correct_answer'],
             'explanation': question.get('explanation', ''),
             'current_score': session['correct_count'],
-            'total_questions': len(questions)
+            'total_questions': session.get('total_questions', len(questions))
+        })
+
+    except Exception as e:
+        app.logger.exception("Submitting answer failed")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/submit-answers', methods=['POST'])
+def submit_answers():
+    """Submit and check several answers at once (also accepts navigator.sendBeacon bodies)."""
+    try:
+        # sendBeacon posts text/plain, so parse the body regardless of content type
+        data = request.get_json(force=True, silent=True)
+
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Missing required fields'}), 400
+
+        session_id = data.get('session_id')
+        submitted = data.get('answers')
+
+        if not session_id or not isinstance(submitted, list) or not submitted:
+            return jsonify({'error': 'Missing required fields'}), 400
+        if not all(isinstance(item, dict) for item in submitted):
+            return jsonify({'error': 'Missing required fields'}), 400
+
+        session = session_manager.get_session(session_id)
+
+        if not session:
+            return jsonify({'error': 'Session not found'}), 404
+
+        questions = session['questions']
+        graded = []
+
+        for item in submitted:
+            question_num = item.get('question_num')
+            user_answer = item.get('answer')
+
+            if not valid_question_num(question_num) or not isinstance(user_answer, str):
+                return jsonify({'error': 'Missing required fields'}), 400
+            if question_num < 0 or question_num >= len(questions):
+                return jsonify({'error': 'Invalid question number'}), 400
+
+            is_correct, answer = grade_answer(questions[question_num], user_answer)
+            graded.append((question_num, answer, is_correct))
+
+        # One session update for the whole batch; repeated questions keep their first answer
+        session, recorded = session_manager.record_answers(session_id, graded)
+
+        return jsonify({
+            'results': [{
+                'question_num': answer['question_num'],
+                'is_correct': answer['is_correct'],
+                'correct_answer': answer['correct_answer'],
+                'explanation': answer['explanation']
+            } for answer in recorded],
+            'current_score': session['correct_count'],
+            'total_questions': session.get('total_questions', len(questions))
         })
 
     except Exception as e:
-        traceback.print_exc()
+        app.logger.exception("Submitting answers failed")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/complete-quiz/<session_id>', methods=['POST'])
@@ -235,13 +904,18 @@ def complete_quiz(session_id):
         if not session:
             return jsonify({'error': 'Session not found'}), 404
 
+        if session.get('generation_status', 'complete') == 'generating':
+            return jsonify({'error': 'Quiz is still being generated'}), 409
+        if not session['questions']:
+            return jsonify({'error': 'Quiz has no questions'}), 409
+
         # Save to history and delete session
         session_manager.save_to_history(session_id)
 
         return jsonify({'success': True})
 
     except Exception as e:
-        traceback.print_exc()
+        app.logger.exception("Completing quiz failed")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/results/<session_id>', methods=['GET'])
@@ -266,20 +940,67 @@ def get_results(session_id):
         })
 
     except Exception as e:
-        traceback.print_exc()
+        app.logger.exception("Loading results failed")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/history/<user_id>', methods=['GET'])
 def get_history(user_id):
-    """Get user's quiz history."""
+    """Get one page of a user's quiz history (summaries by default) with their aggregates."""
     try:
-        history = session_manager.get_user_history(user_id)
-        return jsonify({'quizzes': history})
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+        reviews = request.args.get('reviews', 'false').lower() == 'true'
+
+        return jsonify(session_manager.get_history_page(user_id, offset, limit, reviews))
+
+    except Exception as e:
+        app.logger.exception("Loading history failed")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/history/<user_id>/<quiz_id>', methods=['GET'])
+def get_history_quiz(user_id, quiz_id):
+    """Get one completed quiz with the user's stats for its document."""
+    try:
+        quiz = session_manager.get_history_quiz(user_id, quiz_id)
+
+        if not quiz:
+            return jsonify({'error': 'Quiz not found'}), 404
+
+        return jsonify(quiz)
 
     except Exception as e:
-        traceback.print_exc()
+        app.logger.exception("Loading history quiz failed")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """Get knowledge cache hit/miss counters."""
+    return jsonify(knowledge_cache.stats())
+
+@app.route('/cache/<cache_key>', methods=['DELETE'])
+def invalidate_cache_entry(cache_key):
+    """Invalidate a single knowledge cache entry."""
+    if not knowledge_cache.invalidate(cache_key):
+        return jsonify({'error': 'Cache entry not found'}), 404
+
+    return jsonify({'success': True})
+
+@app.route('/cache', methods=['DELETE'])
+def clear_cache():
+    """Invalidate every knowledge cache entry."""
+    removed = knowledge_cache.clear()
+    return jsonify({'success': True, 'removed': removed})
+
+@app.route('/llm/stats', methods=['GET'])
+def llm_stats():
+    """Get per-call-type Claude latency and token usage, plus limiter queue metrics."""
+    return jsonify(llm_client.stats())
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Export metrics in the Prometheus text format."""
+    return REGISTRY.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
 @app.route('/history')
 def history_page():
     """Render history page."""
@@ -296,10 +1017,8 @@ def results_page():
     return render_template('results.html')
 
 if __name__ == '__main__':
-    # Create necessary directories
-    os.makedirs('uploads', exist_ok=True)
-    os.makedirs('data/sessions', exist_ok=True)
-    os.makedirs('data/history', exist_ok=True)
-
+    # Development server with the reloader; serve with gunicorn -c gunicorn.conf.py app:app
+    if app.config['WARM_UP']:
+        start_warm_up()
     # Run on all interfaces to accept LAN connections
     app.run(host='0.0.0.0', port=5666, debug=True)
@@ -0,0 +1,112 @@
+import argparse
+import os
+import random
+
+from openpyxl import Workbook
+from PIL import Image, ImageDraw
+
+# name: (PDF pages, workbook rows)
+SIZES = {
+    'small': (2, 200),
+    'medium': (20, 10_000),
+    'large': (60, 100_000)
+}
+
+WORDS = ('cell membrane nucleus protein enzyme energy photosynthesis respiration '
+         'chromosome gene mitosis osmosis diffusion tissue organ').split()
+
+def make_pdf(path, pages, seed=0):
+    """
+    Write a text-only PDF with the given number of pages.
+
+    Args:
+        path: Output path
+        pages: Number of pages
+        seed: Random seed for the page text
+    """
+    generator = random.Random(seed)
+    images = []
+
+    for page in range(1, pages + 1):
+        # A4 at the 150 DPI the processor renders at; bilevel keeps large PDFs under the upload limit
+        image = Image.new('1', (1240, 1754), 1)
+        draw = ImageDraw.Draw(image)
+        draw.text((100, 80), f"Chapter {page}", fill=0)
+        for line in range(60):
+            sentence = ' '.join(generator.choice(WORDS) for _ in range(14))
+            draw.text((100, 130 + line * 26), sentence, fill=0)
+        images.append(image)
+
+    images[0].save(path, save_all=True, append_images=images[1:], resolution=150)
+
+
+def make_workbook(path, rows, sheets=3, seed=0):
+    """
+    Write a workbook with rows spread over several sheets.
+
+    Args:
+        path: Output path
+        rows: Total data rows
+        sheets: Number of sheets
+        seed: Random seed for the cell values
+    """
+    generator = random.Random(seed)
+    workbook = Workbook(write_only=True)
+
+    for sheet_num in range(1, sheets + 1):
+        sheet = workbook.create_sheet(f"Unit {sheet_num}")
+        sheet.append(['Term', 'Definition', 'Category', 'Score'])
+        for row in range(rows // sheets):
+            sheet.append([
+                f"{generator.choice(WORDS)}-{row}",
+                ' '.join(generator.choice(WORDS) for _ in range(8)),
+                generator.choice(WORDS),
+                generator.randint(1, 100)
+            ])
+
+    workbook.save(path)
+
+
+def generate(out_dir, sizes=None):
+    """
+    Create the fixture set, skipping files that already exist.
+
+    Args:
+        out_dir: Directory for the fixtures
+        sizes: Size names from SIZES (default: all)
+
+    Returns:
+        list: Fixture paths
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+
+    for name in sizes or SIZES:
+        pages, rows = SIZES[name]
+
+        pdf_path = os.path.join(out_dir, f"{name}-{pages}p.pdf")
+        if not os.path.exists(pdf_path):
+            make_pdf(pdf_path, pages)
+
+        workbook_path = os.path.join(out_dir, f"{name}-{rows}r.xlsx")
+        if not os.path.exists(workbook_path):
+            make_workbook(workbook_path, rows)
+
+        paths.extend([pdf_path, workbook_path])
+
+    return paths
+
+
+def main():
+    """Command line entry point: generate benchmark fixtures."""
+    parser = argparse.ArgumentParser(description='Generate WebQuiz benchmark fixtures.')
+    parser.add_argument('--out', default=os.path.join(os.path.dirname(__file__), 'fixtures'))
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=list(SIZES))
+    args = parser.parse_args()
+
+    for path in generate(args.out, args.sizes):
+        print(f"{path} ({os.path.getsize(path) / 1024:.0f} KB)")
+
+
+if __name__ == '__main__':
+    main()
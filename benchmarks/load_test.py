@@ -0,0 +1,249 @@
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENDPOINTS = ('upload', 'jobs', 'generate-quiz', 'quiz', 'submit-answers', 'complete-quiz')
+
+class Recorder:
+    """Thread-safe latency samples per endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+
+    def call(self, name, send, *args, **kwargs):
+        """
+        Time one test-client request.
+
+        Args:
+            name: Endpoint name the sample is recorded under
+            send: Test client method (get/post)
+            *args, **kwargs: Arguments for send
+
+        Returns:
+            Response
+        """
+        started = time.perf_counter()
+        response = send(*args, **kwargs)
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            self.samples.setdefault(name, []).append(elapsed)
+            if response.status_code >= 400:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+        return response
+
+    def add(self, name, elapsed):
+        """Record a sample that is not a single request (e.g. a whole quiz)."""
+        with self._lock:
+            self.samples.setdefault(name, []).append(elapsed)
+
+
+def run_quiz(app, recorder, fixture, num_questions, poll_interval):
+    """
+    Drive one user through upload, generation, answering and completion.
+
+    Args:
+        app: Flask app under test
+        recorder: Recorder for latencies
+        fixture: Path of the document to upload
+        num_questions: Questions requested
+        poll_interval: Seconds between job and pending-question polls
+    """
+    client = app.test_client()
+    started = time.perf_counter()
+
+    with open(fixture, 'rb') as document:
+        response = recorder.call('upload', client.post, '/upload',
+                                 data={'file': (document, os.path.basename(fixture))},
+                                 content_type='multipart/form-data')
+    if response.status_code != 202:
+        raise RuntimeError(f"upload failed: {response.status_code} {response.get_json()}")
+    upload = response.get_json()
+
+    _wait_for_job(client, recorder, upload['job_id'], poll_interval)
+    recorder.add('upload-to-knowledge', time.perf_counter() - started)
+
+    response = recorder.call('generate-quiz', client.post, '/generate-quiz', json={
+        'file_id': upload['file_id'],
+        'num_questions': num_questions,
+        'user_id': 'benchmark'
+    })
+    if response.status_code != 202:
+        raise RuntimeError(f"generate-quiz failed: {response.status_code} {response.get_json()}")
+    quiz = response.get_json()
+    session_id = quiz['session_id']
+
+    # Like quiz.js: load the whole quiz, refetch while questions are still being generated
+    questions = []
+    status = 'generating'
+    question_num = 0
+    while True:
+        if question_num >= len(questions):
+            if status == 'complete':
+                break
+            response = recorder.call('quiz', client.get, f'/quiz/{session_id}')
+            if response.status_code != 200:
+                raise RuntimeError(f"quiz failed: {response.status_code} {response.get_json()}")
+            payload = response.get_json()
+            questions, status = payload['questions'], payload['generation_status']
+            if question_num >= len(questions):
+                time.sleep(poll_interval)
+            continue
+
+        question = questions[question_num]
+        if question_num == 0:
+            recorder.add('time-to-first-question', time.perf_counter() - started)
+
+        answer = question['options'][0] if question['type'] == 'multiple_choice' else 'answer'
+        recorder.call('submit-answers', client.post, '/submit-answers', json={
+            'session_id': session_id,
+            'answers': [{'question_num': question_num, 'answer': answer}]
+        })
+        question_num += 1
+
+    recorder.call('complete-quiz', client.post, f'/complete-quiz/{session_id}')
+    recorder.add('quiz', time.perf_counter() - started)
+
+
+def _wait_for_job(client, recorder, job_id, poll_interval):
+    """Poll a job until it finishes."""
+    while True:
+        job = recorder.call('jobs', client.get, f'/jobs/{job_id}').get_json()
+        if job['status'] == 'done':
+            return job
+        if job['status'] == 'failed':
+            raise RuntimeError(f"job failed: {job['error']}")
+        time.sleep(poll_interval)
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def report(recorder, failures, elapsed, quizzes):
+    """
+    Summarize the run.
+
+    Returns:
+        dict: Per-endpoint latency percentiles and overall throughput
+    """
+    requests = sum(len(recorder.samples.get(name, [])) for name in ENDPOINTS)
+    endpoints = {}
+
+    for name, samples in recorder.samples.items():
+        endpoints[name] = {
+            'count': len(samples),
+            'errors': recorder.errors.get(name, 0),
+            'p50_ms': round(percentile(samples, 0.5) * 1000, 1),
+            'p95_ms': round(percentile(samples, 0.95) * 1000, 1),
+            'p99_ms': round(percentile(samples, 0.99) * 1000, 1)
+        }
+
+    return {
+        'quizzes': quizzes,
+        'failed_quizzes': len(failures),
+        'failures': failures[:10],
+        'elapsed_seconds': round(elapsed, 2),
+        'requests': requests,
+        'requests_per_second': round(requests / elapsed, 1) if elapsed else 0,
+        'quizzes_per_minute': round((quizzes - len(failures)) / elapsed * 60, 1) if elapsed else 0,
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'endpoints': endpoints
+    }
+
+
+def main():
+    """Command line entry point: run the end-to-end load test."""
+    parser = argparse.ArgumentParser(description='End-to-end WebQuiz load test against the fake LLM backend.')
+    parser.add_argument('--users', type=int, default=8, help='Concurrent simulated users')
+    parser.add_argument('--quizzes', type=int, default=32, help='Total quizzes to run')
+    parser.add_argument('--questions', type=int, default=10, help='Questions per quiz')
+    parser.add_argument('--fixtures', nargs='+', help='Documents to upload (default: generated fixtures)')
+    parser.add_argument('--sizes', nargs='+', default=['small', 'medium'],
+                        help='Generated fixture sizes to use (small, medium, large)')
+    parser.add_argument('--latency', type=float, default=0.2, help='Fake LLM seconds to first token')
+    parser.add_argument('--tokens-per-second', type=float, default=0, help='Fake LLM output rate, 0 for instant')
+    parser.add_argument('--knowledge-chars', type=int, default=4000, help='Fake extracted knowledge size')
+    parser.add_argument('--poll-interval', type=float, default=0.05)
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE',
+                        help='Extra app setting, e.g. --set STORAGE_BACKEND=sqlite')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args()
+
+    sys.path.insert(0, REPO_ROOT)
+    from benchmarks.fixtures import generate
+
+    fixtures = [os.path.abspath(path) for path in args.fixtures] if args.fixtures else \
+        generate(os.path.join(REPO_ROOT, 'benchmarks', 'fixtures'), args.sizes)
+
+    # Run the app against the fake backend in a scratch data directory
+    os.environ.update({
+        'LLM_BACKEND': 'fake',
+        'LLM_FAKE_LATENCY': str(args.latency),
+        'LLM_FAKE_TOKENS_PER_SECOND': str(args.tokens_per_second),
+        'LLM_FAKE_KNOWLEDGE_CHARS': str(args.knowledge_chars),
+        'JOB_MAX_PENDING': str(max(50, args.users * 2))
+    })
+    for setting in args.set:
+        name, _, value = setting.partition('=')
+        os.environ[name] = value
+
+    workdir = tempfile.mkdtemp(prefix='webquiz-bench-')
+    os.chdir(workdir)
+    os.makedirs('uploads', exist_ok=True)
+
+    from app import app
+
+    recorder = Recorder()
+    failures = []
+
+    def user(index):
+        try:
+            run_quiz(app, recorder, fixtures[index % len(fixtures)], args.questions, args.poll_interval)
+        except Exception as e:
+            failures.append(f"{os.path.basename(fixtures[index % len(fixtures)])}: {e}")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.users) as executor:
+        list(executor.map(user, range(args.quizzes)))
+    elapsed = time.perf_counter() - started
+
+    result = report(recorder, failures, elapsed, args.quizzes)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+
+    print(f"{args.quizzes} quizzes by {args.users} users in {result['elapsed_seconds']}s "
+          f"({result['quizzes_per_minute']} quizzes/min, {result['requests_per_second']} requests/s, "
+          f"peak RSS {result['peak_rss_mb']} MB)")
+    print(f"{'endpoint':<24}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, stats in result['endpoints'].items():
+        print(f"{name:<24}{stats['count']:>8}{stats['errors']:>8}"
+              f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+    for failure in result['failures']:
+        print(f"failed: {failure}")
+
+
+if __name__ == '__main__':
+    main()
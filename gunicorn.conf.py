@@ -0,0 +1,51 @@
+"""
+Gunicorn settings for serving WebQuiz.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Every setting can be overridden from the environment (or .env).
+"""
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+bind = os.getenv('WEB_BIND', '0.0.0.0:5666')
+
+# Threads serve the many short polling requests; Claude calls run in background jobs
+workers = int(os.getenv('WEB_WORKERS', '2'))
+threads = int(os.getenv('WEB_THREADS', '8'))
+worker_class = 'gthread'
+
+# Uploads, Claude extraction and quiz streaming can hold a request for minutes
+timeout = int(os.getenv('WEB_TIMEOUT', '300'))
+# Time a worker gets on shutdown to finish running jobs and flush sessions
+graceful_timeout = int(os.getenv('WEB_GRACEFUL_TIMEOUT', '60'))
+keepalive = 5
+
+# Load app.py once in the master so workers fork with everything imported.
+# Thread pools, SQLite connections and the Claude client are created per process.
+preload_app = True
+
+# The write-behind session cache is per process, so several workers must write through
+if workers > 1:
+    os.environ.setdefault('SESSION_WRITE_BEHIND', 'false')
+
+
+def post_worker_init(worker):
+    """Load the Claude SDK and document libraries in the background once the worker serves."""
+    from app import app, start_warm_up
+
+    if app.config['WARM_UP']:
+        start_warm_up()
+
+
+def worker_exit(server, worker):
+    """Finish running jobs and write pending session changes before the worker exits."""
+    from app import event_loop, job_queue, maintenance, session_manager
+
+    maintenance.close()
+    job_queue.close()
+    event_loop.close()
+    session_manager.close()
@@ -14,35 +14,63 @@ const userId = getUserId();
 const emptyState = document.getElementById('emptyState');
 const historyTable = document.getElementById('historyTable');
 const historyBody = document.getElementById('historyBody');
+const loadMoreBtn = document.getElementById('loadMoreBtn');
+const statsSummary = document.getElementById('statsSummary');
+
+// Quizzes per page
+const PAGE_SIZE = 20;
+let loadedCount = 0;
+
+loadMoreBtn.addEventListener('click', () => loadHistory(loadedCount));
 
 // Load history
 if (userId) {
-    loadHistory();
+    loadHistory(0);
 }
 
-async function loadHistory() {
+async function loadHistory(offset) {
+    loadMoreBtn.disabled = true;
+
     try {
-        const response = await fetch(`/history/${userId}`);
+        const response = await fetch(`/history/${userId}?offset=${offset}&limit=${PAGE_SIZE}`);
         const data = await response.json();
 
         if (!response.ok) {
             throw new Error(data.error || 'Failed to load history');
         }
 
-        if (data.quizzes.length === 0) {
+        if (data.total === 0) {
             showEmptyState();
-        } else {
-            displayHistory(data.quizzes);
+            return;
+        }
+
+        if (offset === 0) {
+            historyBody.innerHTML = '';
+            displayStats(data.stats);
         }
+        displayHistory(data.quizzes);
+
+        loadedCount = offset + data.quizzes.length;
+        loadMoreBtn.classList.toggle('hidden', loadedCount >= data.total);
 
     } catch (error) {
         console.error('Load history error:', error);
-        showEmptyState();
+        if (offset === 0) showEmptyState();
+    } finally {
+        loadMoreBtn.disabled = false;
     }
 }
 
+function displayStats(stats) {
+    if (!stats || stats.quizzes === 0) return;
+
+    document.getElementById('statsQuizzes').textContent = stats.quizzes;
+    document.getElementById('statsAverage').textContent = `${stats.average_score}%`;
+    document.getElementById('statsBest').textContent = `${stats.best_score}%`;
+    statsSummary.classList.remove('hidden');
+}
+
 function displayHistory(quizzes) {
-    historyBody.innerHTML = '';
     historyTable.classList.remove('hidden');
     emptyState.classList.add('hidden');
 
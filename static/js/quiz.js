@@ -24,10 +24,16 @@ const nextBtn = document.getElementById('nextBtn');
 const loadingIndicator = document.getElementById('loadingIndicator');
 
 // State
+let questions = [];
+let generationStatus = 'generating';
 let currentQuestionNum = 0;
 let currentQuestion = null;
 let totalQuestions = 0;
 let currentScore = 0;
+let refreshing = null;
+
+// Answers not yet acknowledged by the server, by question number
+const pendingAnswers = new Map();
 
 // Event listeners
 submitBtn.addEventListener('click', handleSubmit);
@@ -35,30 +41,86 @@ nextBtn.addEventListener('click', loadNextQuestion);
 fillBlankAnswer.addEventListener('keypress', (e) => {
     if (e.key === 'Enter') handleSubmit();
 });
+window.addEventListener('pagehide', sendPendingAnswers);
 
 // Initialize
-loadQuestion(0);
+resumeQuiz();
 
-async function loadQuestion(questionNum) {
+async function resumeQuiz() {
     showLoading(true);
+
+    try {
+        // Bypass the cached copy so the score includes answers given before a reload
+        const data = await refreshQuiz({ cache: 'no-cache' });
+        const answered = new Set(data.answered);
+
+        currentScore = data.current_score;
+
+        let questionNum = 0;
+        while (answered.has(questionNum)) {
+            questionNum++;
+        }
+        loadQuestion(questionNum);
+
+    } catch (error) {
+        console.error('Load quiz error:', error);
+        alert('Failed to load quiz: ' + error.message);
+        window.location.href = '/';
+    }
+}
+
+async function refreshQuiz(options = {}) {
+    // Share one request between callers; the browser revalidates it with the ETag
+    if (!refreshing) {
+        refreshing = (async () => {
+            try {
+                const response = await fetch(`/quiz/${sessionId}`, options);
+                const data = await response.json();
+
+                if (!response.ok) {
+                    throw new Error(data.error || 'Failed to load quiz');
+                }
+
+                questions = data.questions;
+                totalQuestions = data.total_questions;
+                generationStatus = data.generation_status;
+                return data;
+            } finally {
+                refreshing = null;
+            }
+        })();
+    }
+    return refreshing;
+}
+
+async function loadQuestion(questionNum) {
     hideFeedback();
 
     try {
-        const response = await fetch(`/question/${sessionId}/${questionNum}`);
-        const data = await response.json();
+        if (questionNum >= questions.length) {
+            showLoading(true);
+            await refreshQuiz();
+        }
 
-        if (!response.ok) {
-            throw new Error(data.error || 'Failed to load question');
+        if (questionNum >= questions.length) {
+            if (generationStatus === 'complete') {
+                // Fewer questions than requested were generated
+                totalQuestions = questions.length;
+                completeQuiz();
+                return;
+            }
+            // Question is still being generated; try again shortly
+            setTimeout(() => loadQuestion(questionNum), 1000);
+            return;
         }
 
-        currentQuestion = data;
+        currentQuestion = questions[questionNum];
         currentQuestionNum = questionNum;
-        totalQuestions = data.total_questions;
-        currentScore = data.current_score;
 
-        displayQuestion(data);
+        displayQuestion(currentQuestion);
         updateHeader();
         showLoading(false);
+        prefetchQuestions();
 
     } catch (error) {
         console.error('Load question error:', error);
@@ -67,6 +129,13 @@ async function loadQuestion(questionNum) {
     }
 }
 
+function prefetchQuestions() {
+    // Fetch newly generated questions in the background before they are needed
+    if (generationStatus !== 'complete' && questions.length - currentQuestionNum <= 2) {
+        setTimeout(() => refreshQuiz().catch(error => console.error('Prefetch error:', error)), 1000);
+    }
+}
+
 function displayQuestion(data) {
     questionText.textContent = data.question;
 
@@ -121,27 +190,14 @@ async function handleSubmit() {
     submitBtn.disabled = true;
     submitBtn.textContent = 'Checking...';
 
-    try {
-        const response = await fetch('/submit-answer', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({
-                session_id: sessionId,
-                question_num: currentQuestionNum,
-                answer: userAnswer
-            })
-        });
-
-        const data = await response.json();
+    pendingAnswers.set(currentQuestionNum, userAnswer);
 
-        if (!response.ok) {
-            throw new Error(data.error || 'Failed to submit answer');
-        }
+    try {
+        const data = await flushAnswers();
+        const result = data.results.find(item => item.question_num === currentQuestionNum);
 
         currentScore = data.current_score;
-        showFeedback(data);
+        showFeedback(result);
         updateHeader();
 
     } catch (error) {
@@ -152,6 +208,41 @@ async function handleSubmit() {
     }
 }
 
+async function flushAnswers() {
+    // Send every unacknowledged answer in one request; they stay queued if it fails
+    const answers = Array.from(pendingAnswers, ([question_num, answer]) => ({ question_num, answer }));
+
+    const response = await fetch('/submit-answers', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({
+            session_id: sessionId,
+            answers: answers
+        })
+    });
+
+    const data = await response.json();
+
+    if (!response.ok) {
+        throw new Error(data.error || 'Failed to submit answer');
+    }
+
+    answers.forEach(item => pendingAnswers.delete(item.question_num));
+    return data;
+}
+
+function sendPendingAnswers() {
+    // Deliver answers that could not be sent before the user left the page
+    if (pendingAnswers.size === 0) return;
+
+    const answers = Array.from(pendingAnswers, ([question_num, answer]) => ({ question_num, answer }));
+    if (navigator.sendBeacon('/submit-answers', JSON.stringify({ session_id: sessionId, answers: answers }))) {
+        pendingAnswers.clear();
+    }
+}
+
 function showFeedback(data) {
     feedbackPanel.classList.remove('hidden');
 
@@ -191,6 +282,9 @@ function loadNextQuestion() {
 
 async function completeQuiz() {
     try {
+        if (pendingAnswers.size > 0) {
+            await flushAnswers();
+        }
         await fetch(`/complete-quiz/${sessionId}`, {
             method: 'POST'
         });
@@ -15,6 +15,7 @@ const incorrectCount = document.getElementById('incorrectCount');
 const documentName = document.getElementById('documentName');
 const timeSpent = document.getElementById('timeSpent');
 const questionsList = document.getElementById('questionsList');
+const comparison = document.getElementById('comparison');
 
 // Load results
 loadResults();
@@ -25,13 +26,12 @@ async function loadResults() {
         const data = await response.json();
 
         if (!response.ok) {
+            // Completed quizzes move to history; fetch just this one
             const userId = getUserId();
-            const historyResponse = await fetch(`/history/${userId}`);
-            const historyData = await historyResponse.json();
+            const historyResponse = await fetch(`/history/${userId}/${sessionId}`);
 
-            const quiz = historyData.quizzes.find(q => q.quiz_id === sessionId);
-            if (quiz) {
-                displayHistoryResults(quiz);
+            if (historyResponse.ok) {
+                displayHistoryResults(await historyResponse.json());
                 return;
             }
 
@@ -79,9 +79,22 @@ function displayHistoryResults(quiz) {
     documentName.textContent = `Document: ${quiz.document_name}`;
     timeSpent.textContent = `Time: ${formatTime(quiz.time_taken_seconds)}`;
 
+    displayComparison(quiz.document_stats);
     displayQuestionsList(quiz.questions_review);
 }
 
+function displayComparison(stats) {
+    // Only meaningful once the document has been quizzed more than once
+    if (!stats || stats.quizzes < 2) return;
+
+    let text = `Your average on this document: ${stats.average_score}% over ${stats.quizzes} quizzes (best ${stats.best_score}%)`;
+    if (stats.trend !== null) {
+        text += `, latest ${stats.trend >= 0 ? '+' : ''}${stats.trend}% vs the attempt before`;
+    }
+    comparison.textContent = text;
+    comparison.classList.remove('hidden');
+}
+
 function displayQuestionsList(questions) {
     questionsList.innerHTML = '';
 
@@ -105,12 +105,14 @@ async function uploadDocument(file) {
             throw new Error(data.error || 'Upload failed');
         }
 
+        // Wait for background processing to finish; the knowledge stays on the server
+        const result = await waitForJob(data.job_id);
+
         // Store processed data
         processedData = {
             fileId: data.file_id,
             filename: data.filename,
-            knowledge: data.knowledge,
-            documentType: data.document_type
+            documentType: result.document_type
         };
 
         // Show quiz setup
@@ -141,11 +143,9 @@ async function handleStartQuiz() {
                 'Content-Type': 'application/json'
             },
             body: JSON.stringify({
-                knowledge: processedData.knowledge,
+                file_id: processedData.fileId,
                 num_questions: numQuestions,
-                user_id: userId,
-                document_name: processedData.filename,
-                file_id: processedData.fileId
+                user_id: userId
             })
         });
 
@@ -155,7 +155,7 @@ async function handleStartQuiz() {
             throw new Error(data.error || 'Quiz generation failed');
         }
 
-        // Redirect to quiz page
+        // Questions stream into the session, so the quiz can start right away
         window.location.href = `/quiz?session_id=${data.session_id}`;
 
     } catch (error) {
@@ -166,6 +166,28 @@ async function handleStartQuiz() {
     }
 }
 
+async function waitForJob(jobId) {
+    // Poll job status until the server finishes processing
+    while (true) {
+        const response = await fetch(`/jobs/${jobId}`);
+        const job = await response.json();
+
+        if (!response.ok) {
+            throw new Error(job.error || 'Failed to check job status');
+        }
+
+        if (job.status === 'done') {
+            return job.result;
+        }
+
+        if (job.status === 'failed') {
+            throw new Error(job.error || 'Processing failed');
+        }
+
+        await new Promise(resolve => setTimeout(resolve, 1000));
+    }
+}
+
 function showError(message) {
     errorText.textContent = message;
     errorMessage.classList.remove('hidden');
@@ -0,0 +1,15 @@
+/** Tailwind settings for the asset build (python -m utils.assets). */
+module.exports = {
+    content: ['./templates/**/*.html', './static/js/**/*.js'],
+    theme: {
+        extend: {
+            colors: {
+                primary: '#4A90E2',
+                success: '#7ED321',
+                error: '#FF6B6B',
+                cream: '#FAFAF8',
+                darkgray: '#2C3E50',
+            }
+        }
+    }
+}
@@ -0,0 +1,77 @@
+import os
+import sys
+import time
+
+import pytest
+
+# Tests import app and utils from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.fake_llm import FakeLLMClient
+
+
+@pytest.fixture
+def fake_llm():
+    """Fake Claude client answering instantly."""
+    return FakeLLMClient(latency=0, knowledge_chars=800)
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    """Small .xlsx file with a header row and a few data rows."""
+    from openpyxl import Workbook
+
+    book = Workbook()
+    sheet = book.active
+    sheet.title = 'Elements'
+    sheet.append(['Element', 'Symbol', 'Number'])
+    for row in [('Hydrogen', 'H', 1), ('Helium', 'He', 2), ('Lithium', 'Li', 3)]:
+        sheet.append(row)
+
+    path = tmp_path / 'elements.xlsx'
+    book.save(path)
+    return str(path)
+
+
+@pytest.fixture(scope='session')
+def webquiz(tmp_path_factory):
+    """The app module, running against the fake backend in a scratch data directory."""
+    os.environ.update({
+        'LLM_BACKEND': 'fake',
+        'LLM_FAKE_LATENCY': '0',
+        'LLM_FAKE_KNOWLEDGE_CHARS': '800',
+        'WARM_UP': 'false',
+        'LOG_DIR': str(tmp_path_factory.mktemp('logs'))
+    })
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp('webquiz'))
+
+    import app
+
+    yield app
+
+    app.job_queue.close()
+    app.event_loop.close()
+    app.session_manager.close()
+    os.chdir(cwd)
+
+
+@pytest.fixture
+def client(webquiz):
+    """Flask test client."""
+    return webquiz.app.test_client()
+
+
+@pytest.fixture
+def wait_for_job(client):
+    """Poll /jobs/<job_id> until the job has finished and return its state."""
+    def wait(job_id, timeout=10):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            job = client.get(f'/jobs/{job_id}').get_json()
+            if job['status'] in ('done', 'failed'):
+                return job
+            time.sleep(0.02)
+        raise AssertionError(f"Job {job_id} did not finish within {timeout}s")
+
+    return wait
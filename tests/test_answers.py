@@ -0,0 +1,138 @@
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+from utils.locks import StripedFileLock
+from utils.session_manager import SessionManager
+
+QUESTIONS = [
+    {'id': 1, 'type': 'fill_blank', 'question': 'Water boils at ___ C', 'correct_answer': '100'},
+    {'id': 2, 'type': 'fill_blank', 'question': 'Ice melts at ___ C', 'correct_answer': '0'}
+]
+
+
+@pytest.fixture(params=[True, False], ids=['write-behind', 'write-through'])
+def sessions(request, tmp_path):
+    manager = SessionManager(
+        sessions_dir=str(tmp_path / 'sessions'), history_dir=str(tmp_path / 'history'),
+        lock_dir=str(tmp_path / 'locks'), write_behind=request.param
+    )
+    yield manager
+    manager.close()
+
+
+def answer(text, correct):
+    """Answer record as built by the submit routes."""
+    return {'user_answer': text, 'is_correct': correct}
+
+
+def test_repeated_answer_keeps_the_first_and_scores_once(sessions):
+    session_id = sessions.create_session('user-1', 'notes.pdf', QUESTIONS)
+
+    sessions.record_answer(session_id, 0, answer('100', True), True)
+    session, recorded = sessions.record_answer(session_id, 0, answer('90', False), False)
+
+    assert recorded['user_answer'] == '100'
+    assert session['correct_count'] == 1
+    assert len(session['user_answers']) == 1
+
+
+def test_batch_with_duplicates_records_each_question_once(sessions):
+    session_id = sessions.create_session('user-1', 'notes.pdf', QUESTIONS)
+
+    session, recorded = sessions.record_answers(session_id, [
+        (0, answer('100', True), True),
+        (1, answer('0', True), True),
+        (0, answer('50', False), False)
+    ])
+
+    assert [item['question_num'] for item in recorded] == [0, 1, 0]
+    assert recorded[2]['user_answer'] == '100'
+    assert session['correct_count'] == 2
+    assert session['current_question'] == 2
+
+
+def test_answers_survive_a_restart(sessions, tmp_path):
+    session_id = sessions.create_session('user-1', 'notes.pdf', QUESTIONS)
+    sessions.record_answer(session_id, 1, answer('0', True), True)
+    sessions.flush()
+
+    reloaded = SessionManager(storage=sessions.storage, lock_dir=str(tmp_path / 'locks'))
+    session = reloaded.get_session(session_id)
+    reloaded.close()
+
+    assert session['correct_count'] == 1
+    assert [item['question_num'] for item in session['user_answers']] == [1]
+
+
+def test_concurrent_submits_of_the_same_answer_score_once(sessions):
+    session_id = sessions.create_session('user-1', 'notes.pdf', QUESTIONS)
+    barrier = threading.Barrier(8)
+
+    def submit():
+        barrier.wait()
+        sessions.record_answer(session_id, 0, answer('100', True), True)
+
+    threads = [threading.Thread(target=submit) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    session = sessions.get_session(session_id)
+    assert session['correct_count'] == 1
+    assert len(session['user_answers']) == 1
+
+
+def test_lock_is_reentrant_within_a_thread(tmp_path):
+    locks = StripedFileLock(str(tmp_path), stripes=1)
+
+    with locks.hold('a'):
+        # Another key on the same stripe would deadlock without reentrancy
+        with locks.hold('b'):
+            pass
+
+
+def test_lock_excludes_other_threads(tmp_path):
+    locks = StripedFileLock(str(tmp_path))
+    inside = []
+    overlaps = []
+
+    def work():
+        for _ in range(50):
+            with locks.hold('session'):
+                inside.append(1)
+                if len(inside) > 1:
+                    overlaps.append(1)
+                inside.pop()
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not overlaps
+
+
+def _hold_in_child(lock_dir, held, seconds):
+    with StripedFileLock(lock_dir).hold('session'):
+        held.set()
+        time.sleep(seconds)
+
+
+def test_lock_excludes_other_processes(tmp_path):
+    context = multiprocessing.get_context('fork')
+    held = context.Event()
+    child = context.Process(target=_hold_in_child, args=(str(tmp_path), held, 0.5))
+    child.start()
+    assert held.wait(5)
+
+    started = time.monotonic()
+    with StripedFileLock(str(tmp_path)).hold('session'):
+        waited = time.monotonic() - started
+    child.join()
+
+    assert waited >= 0.3
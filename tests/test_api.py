@@ -0,0 +1,190 @@
+import json
+
+
+QUESTIONS = [
+    {
+        'id': 1,
+        'type': 'multiple_choice',
+        'question': 'Where does photosynthesis happen?',
+        'options': ['Chloroplast', 'Nucleus', 'Ribosome', 'Vacuole'],
+        'correct_answer': 'Chloroplast',
+        'explanation': 'Chloroplasts hold chlorophyll.'
+    },
+    {
+        'id': 2,
+        'type': 'fill_blank',
+        'question': 'Plants release ___ during photosynthesis',
+        'correct_answer': 'oxygen',
+        'acceptable_answers': ['oxygen', 'O2'],
+        'explanation': 'Oxygen is a by-product.'
+    }
+]
+
+
+def create_session(webquiz, questions, expected_questions=None):
+    """Create a quiz session directly, as the generation job would."""
+    return webquiz.session_manager.create_session(
+        'user-1', 'notes.pdf', questions, expected_questions=expected_questions
+    )
+
+
+def test_complete_quiz_is_rejected_while_generating(webquiz, client):
+    session_id = create_session(webquiz, [], expected_questions=5)
+
+    response = client.post(f'/complete-quiz/{session_id}')
+
+    assert response.status_code == 409
+    assert webquiz.session_manager.get_session(session_id) is not None
+
+
+def test_complete_quiz_is_rejected_when_generation_produced_nothing(webquiz, client):
+    session_id = create_session(webquiz, [], expected_questions=5)
+    webquiz.session_manager.finish_generation(session_id, error='Claude is overloaded')
+
+    response = client.post(f'/complete-quiz/{session_id}')
+
+    assert response.status_code == 409
+    assert webquiz.session_manager.get_session(session_id) is not None
+
+
+def upload(client, wait_for_job, workbook):
+    """Upload a workbook and return its file_id once extraction has finished."""
+    with open(workbook, 'rb') as f:
+        response = client.post('/upload', data={'file': (f, 'elements.xlsx')},
+                               content_type='multipart/form-data')
+    assert response.status_code == 202
+
+    job = wait_for_job(response.get_json()['job_id'])
+    assert job['status'] == 'done', job.get('error')
+    return job['result']['file_id']
+
+
+def test_generate_quiz_streams_into_the_session(client, wait_for_job, workbook):
+    file_id = upload(client, wait_for_job, workbook)
+
+    response = client.post('/generate-quiz', json={'file_id': file_id, 'num_questions': 3, 'user_id': 'user-1'})
+    assert response.status_code == 202
+    wait_for_job(response.get_json()['job_id'])
+
+    quiz = client.get(f"/quiz/{response.get_json()['session_id']}").get_json()
+    assert quiz['generation_status'] == 'complete'
+    assert len(quiz['questions']) == 3
+    assert all('correct_answer' not in question for question in quiz['questions'])
+
+
+def test_generate_quiz_rejects_invalid_question_counts(webquiz, client):
+    maximum = webquiz.app.config['QUIZ_MAX_QUESTIONS']
+
+    for num_questions in [0, -5, maximum + 1, 2.5, '10', True]:
+        response = client.post('/generate-quiz', json={
+            'file_id': 'any', 'num_questions': num_questions, 'user_id': 'user-1'
+        })
+        assert response.status_code == 400, num_questions
+        assert 'num_questions' in response.get_json()['error']
+
+
+def test_batch_rejects_invalid_question_counts(client, workbook):
+    for num_questions in ['0', 'ten', '1000']:
+        with open(workbook, 'rb') as f:
+            response = client.post('/batch', data={'files': (f, 'elements.xlsx'), 'num_questions': num_questions},
+                                   content_type='multipart/form-data')
+        assert response.status_code == 400, num_questions
+        assert 'num_questions' in response.get_json()['error']
+
+
+def test_submit_answers_grades_a_batch(webquiz, client):
+    session_id = create_session(webquiz, QUESTIONS)
+
+    response = client.post('/submit-answers', json={'session_id': session_id, 'answers': [
+        {'question_num': 0, 'answer': 'Chloroplast'},
+        {'question_num': 1, 'answer': ' o2 '}
+    ]})
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert [result['is_correct'] for result in body['results']] == [True, True]
+    assert body['current_score'] == 2
+
+
+def test_submit_answers_accepts_beacon_bodies_and_keeps_first_answers(webquiz, client):
+    session_id = create_session(webquiz, QUESTIONS)
+    client.post('/submit-answers', json={'session_id': session_id, 'answers': [{'question_num': 0, 'answer': 'Nucleus'}]})
+
+    # navigator.sendBeacon posts text/plain
+    response = client.post('/submit-answers', content_type='text/plain', data=json.dumps({
+        'session_id': session_id, 'answers': [{'question_num': 0, 'answer': 'Chloroplast'}]
+    }))
+
+    body = response.get_json()
+    assert body['results'][0]['is_correct'] is False
+    assert body['current_score'] == 0
+
+
+def test_submit_answers_rejects_bad_input(webquiz, client):
+    session_id = create_session(webquiz, QUESTIONS)
+
+    for answers in [[], [1], [{'question_num': '0', 'answer': 'x'}], [{'question_num': True, 'answer': 'x'}],
+                    [{'question_num': 0, 'answer': 1}], [{'question_num': 5, 'answer': 'x'}]]:
+        response = client.post('/submit-answers', json={'session_id': session_id, 'answers': answers})
+        assert response.status_code == 400, answers
+
+    # Beacon bodies that are valid JSON but not an object
+    for body in ['[1]', '"x"', 'null', 'not json']:
+        response = client.post('/submit-answers', content_type='text/plain', data=body)
+        assert response.status_code == 400, body
+
+    response = client.post('/submit-answers', json={'session_id': 'missing', 'answers': [{'question_num': 0, 'answer': 'x'}]})
+    assert response.status_code == 404
+
+
+def test_submit_answer_rejects_non_integer_question_numbers(webquiz, client):
+    session_id = create_session(webquiz, QUESTIONS)
+
+    for question_num in ['0', 0.0, None, True]:
+        response = client.post('/submit-answer', json={
+            'session_id': session_id, 'question_num': question_num, 'answer': 'Chloroplast'
+        })
+        assert response.status_code == 400, question_num
+
+    response = client.post('/submit-answer', json={'session_id': session_id, 'question_num': 0, 'answer': 0})
+    assert response.status_code == 400
+    assert client.post('/submit-answer', json=[1]).status_code == 400
+
+
+def test_quiz_revalidates_with_etag(webquiz, client):
+    session_id = create_session(webquiz, QUESTIONS)
+
+    response = client.get(f'/quiz/{session_id}')
+    etag = response.headers['ETag']
+
+    assert response.status_code == 200
+    assert 'max-age=' in response.headers['Cache-Control']
+    assert all('correct_answer' not in question for question in response.get_json()['questions'])
+
+    cached = client.get(f'/quiz/{session_id}', headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.data == b''
+
+
+def test_quiz_includes_score_and_answered_questions(webquiz, client):
+    session_id = create_session(webquiz, QUESTIONS)
+    client.post('/submit-answers', json={'session_id': session_id, 'answers': [{'question_num': 1, 'answer': 'O2'}]})
+
+    body = client.get(f'/quiz/{session_id}').get_json()
+
+    assert body['current_score'] == 1
+    assert body['answered'] == [1]
+
+
+def test_quiz_etag_changes_while_questions_arrive(webquiz, client):
+    session_id = create_session(webquiz, QUESTIONS[:1], expected_questions=2)
+
+    first = client.get(f'/quiz/{session_id}')
+    assert first.headers['Cache-Control'] == 'private, no-cache'
+
+    webquiz.session_manager.append_questions(session_id, QUESTIONS[1:])
+    webquiz.session_manager.finish_generation(session_id)
+
+    second = client.get(f'/quiz/{session_id}', headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 200
+    assert len(second.get_json()['questions']) == 2
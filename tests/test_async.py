@@ -0,0 +1,99 @@
+import asyncio
+import time
+
+import pytest
+
+from utils.document_processor import AsyncDocumentProcessor, DocumentProcessor
+from utils.event_loop import BackgroundLoop
+from utils.question_bank import QuestionBank
+from utils.quiz_generator import AsyncQuizGenerator, QuizGenerator
+
+
+@pytest.fixture
+def loop():
+    background = BackgroundLoop(executor_workers=2)
+    yield background
+    background.close()
+
+
+def rendered_pages(count):
+    """Stand-in for iter_pdf_pages yielding count text pages."""
+    def iter_pdf_pages(file_path, page_count=None):
+        for number in range(1, count + 1):
+            yield {'block': {'type': 'text', 'text': f'Page {number} notes.'},
+                   'format': 'text', 'raw_bytes': 100, 'encoded_bytes': 20}
+    return iter_pdf_pages
+
+
+@pytest.mark.parametrize('rendered,chunks', [(30, 3), (25, 3)])
+def test_async_chunked_extraction_stops_when_pages_run_out(fake_llm, loop, rendered, chunks):
+    processor = DocumentProcessor(llm=fake_llm, chunk_pages=10)
+    processor.iter_pdf_pages = rendered_pages(rendered)
+    encoding = {'image_pages': 0, 'text_pages': 0, 'raw_bytes': 0, 'encoded_bytes': 0}
+
+    # pdfinfo reported 30 pages; the renderer may yield fewer
+    future = loop.submit(AsyncDocumentProcessor(processor)._process_pdf_chunked('notes.pdf', 30, encoding))
+    knowledge, extracted = future.result(timeout=10)
+
+    assert extracted == chunks
+    assert encoding['text_pages'] == rendered
+    assert knowledge
+
+
+def test_async_spreadsheet_extraction_matches_sync(fake_llm, loop, workbook):
+    processor = DocumentProcessor(llm=fake_llm)
+
+    result = loop.submit(AsyncDocumentProcessor(processor).process_document(workbook, 'xlsx')).result(timeout=10)
+
+    assert result['knowledge'] == processor.process_document(workbook, 'xlsx')['knowledge']
+
+
+def test_async_stream_fills_the_shared_pool(fake_llm, loop, tmp_path):
+    bank = QuestionBank(str(tmp_path / 'question_bank.db'))
+    generator = QuizGenerator(llm=fake_llm, bank=bank, pool_size=20, pool_min=10)
+    knowledge = 'Enzymes lower activation energy. ' * 20
+
+    async def collect():
+        return [question async for question in
+                AsyncQuizGenerator(generator, loop).generate_quiz_stream(knowledge, 5)]
+
+    questions = loop.submit(collect()).result(timeout=10)
+
+    knowledge_hash = bank.knowledge_hash(knowledge)
+    deadline = time.monotonic() + 5
+    while bank.pool_size(knowledge_hash) < 20 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert len(questions) == 5
+    assert bank.pool_size(knowledge_hash) >= 20
+    # The sync generator still samples the pool on its own
+    assert len(list(generator.generate_quiz_stream(knowledge, 10))) == 10
+
+
+def test_concurrent_calls_share_one_loop(fake_llm, loop):
+    fake_llm.latency = 0.3
+
+    async def many():
+        started = time.perf_counter()
+        await asyncio.gather(*[fake_llm.acreate('Hello', max_tokens=10) for _ in range(50)])
+        return time.perf_counter() - started
+
+    assert loop.submit(many()).result(timeout=10) < 2
+
+
+def test_upload_and_quiz_jobs_run_on_the_event_loop(webquiz, client, wait_for_job, workbook, monkeypatch):
+    monkeypatch.setitem(webquiz.app.config, 'LLM_ASYNC', True)
+    # Nothing may go to the worker pool
+    monkeypatch.setattr(webquiz.job_queue, 'submit', None)
+
+    with open(workbook, 'rb') as f:
+        response = client.post('/upload', data={'file': (f, 'elements.xlsx')}, content_type='multipart/form-data')
+    job = wait_for_job(response.get_json()['job_id'])
+    assert job['status'] == 'done', job.get('error')
+
+    response = client.post('/generate-quiz', json={
+        'file_id': job['result']['file_id'], 'num_questions': 4, 'user_id': 'user-1'
+    })
+    job = wait_for_job(response.get_json()['job_id'])
+    assert job['status'] == 'done', job.get('error')
+    assert job['result']['total_questions'] == 4
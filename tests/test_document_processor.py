@@ -0,0 +1,39 @@
+import pytest
+
+from utils.document_processor import DocumentProcessor
+
+
+def rendered_pages(count):
+    """Stand-in for iter_pdf_pages yielding count text pages."""
+    def iter_pdf_pages(file_path, page_count=None):
+        for number in range(1, count + 1):
+            yield {'block': {'type': 'text', 'text': f'Page {number} notes.'},
+                   'format': 'text', 'raw_bytes': 100, 'encoded_bytes': 20}
+    return iter_pdf_pages
+
+
+def new_encoding():
+    return {'image_pages': 0, 'text_pages': 0, 'raw_bytes': 0, 'encoded_bytes': 0}
+
+
+@pytest.mark.parametrize('rendered,chunks', [(30, 3), (25, 3), (20, 2)])
+def test_chunked_extraction_covers_every_rendered_page(fake_llm, rendered, chunks):
+    processor = DocumentProcessor(llm=fake_llm, chunk_pages=10)
+    processor.iter_pdf_pages = rendered_pages(rendered)
+    encoding = new_encoding()
+
+    # pdfinfo reported 30 pages; the renderer may yield fewer
+    knowledge, extracted = processor._process_pdf_chunked('notes.pdf', 30, encoding)
+
+    assert extracted == chunks
+    assert encoding['text_pages'] == rendered
+    assert fake_llm.stats()['extract_chunk']['calls'] == chunks
+    assert knowledge
+
+
+def test_spreadsheet_extraction(fake_llm, workbook):
+    result = DocumentProcessor(llm=fake_llm).process_document(workbook, 'xlsx')
+
+    assert result['type'] == 'spreadsheet'
+    assert result['rows']['total'] == 3
+    assert result['knowledge']
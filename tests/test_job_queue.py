@@ -0,0 +1,29 @@
+import sqlite3
+
+import pytest
+
+from utils.job_queue import JobQueue, QueueFullError
+
+
+def test_failed_submit_does_not_hold_a_slot(tmp_path, monkeypatch):
+    queue = JobQueue(str(tmp_path / 'jobs.db'), max_workers=1, max_pending=1)
+
+    def broken_insert(kind):
+        raise sqlite3.OperationalError('database is locked')
+
+    with monkeypatch.context() as patch:
+        patch.setattr(queue, '_insert', broken_insert)
+        with pytest.raises(sqlite3.OperationalError):
+            queue.submit('upload', lambda: {})
+
+    job_id = queue.submit('upload', lambda: {})
+    assert queue.get(job_id) is not None
+    queue.close()
+
+
+def test_submit_rejects_over_max_pending(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.db'), max_workers=1, max_pending=0)
+
+    with pytest.raises(QueueFullError):
+        queue.submit('upload', lambda: {})
+    queue.close()
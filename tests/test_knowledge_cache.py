@@ -0,0 +1,62 @@
+import shutil
+import time
+
+from utils.document_processor import MODEL, PROMPT_VERSION, DocumentProcessor
+from utils.knowledge_cache import KnowledgeCache
+
+
+def test_key_depends_on_contents_model_and_prompt_version(tmp_path, workbook):
+    copy = tmp_path / 'renamed.xlsx'
+    shutil.copy(workbook, copy)
+
+    key = KnowledgeCache.make_key(workbook, 'model-a', 'v1')
+
+    assert KnowledgeCache.make_key(str(copy), 'model-a', 'v1') == key
+    assert KnowledgeCache.make_key(workbook, 'model-b', 'v1') != key
+    assert KnowledgeCache.make_key(workbook, 'model-a', 'v2') != key
+
+
+def test_get_counts_hits_and_misses(tmp_path):
+    cache = KnowledgeCache(str(tmp_path / 'knowledge.db'))
+
+    assert cache.get('missing') is None
+    cache.put('key', {'knowledge': 'facts'})
+    assert cache.get('key') == {'knowledge': 'facts'}
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+    assert stats['hit_rate'] == 0.5
+
+
+def test_entries_older_than_max_age_miss(tmp_path):
+    cache = KnowledgeCache(str(tmp_path / 'knowledge.db'), max_age_hours=1)
+    cache.put('key', {'knowledge': 'facts'})
+    cache.db.execute('UPDATE knowledge SET created_at = ?', (time.time() - 2 * 3600,))
+
+    assert cache.get('key') is None
+    assert cache.evict() == 1
+
+
+def test_least_recently_used_entries_are_evicted_over_budget(tmp_path):
+    cache = KnowledgeCache(str(tmp_path / 'knowledge.db'), max_bytes=100)
+    cache.put('old', {'knowledge': 'a' * 40})
+    cache.db.execute('UPDATE knowledge SET last_access = last_access - 10')
+    cache.put('new', {'knowledge': 'b' * 40})
+
+    assert cache.get('old') is None
+    assert cache.get('new') == {'knowledge': 'b' * 40}
+
+
+def test_reupload_is_served_from_cache_without_claude(tmp_path, fake_llm, workbook):
+    cache = KnowledgeCache(str(tmp_path / 'knowledge.db'))
+    processor = DocumentProcessor(cache=cache, llm=fake_llm)
+
+    first = processor.process_document(workbook, 'xlsx')
+    calls = fake_llm.stats()['extract']['calls']
+    second = processor.process_document(workbook, 'xlsx')
+
+    assert first['cached'] is False
+    assert second['cached'] is True
+    assert second['knowledge'] == first['knowledge']
+    assert second['cache_key'] == KnowledgeCache.make_key(workbook, MODEL, PROMPT_VERSION)
+    assert fake_llm.stats()['extract']['calls'] == calls
@@ -0,0 +1,37 @@
+from utils.llm_client import MIN_CACHEABLE_TOKENS, cached_text, quiz_max_tokens
+
+SYSTEM = 'You write quiz questions.'
+
+
+def breakpoints(request):
+    """Indexes of the content blocks marked as cache breakpoints."""
+    return [index for index, block in enumerate(request['messages'][0]['content']) if 'cache_control' in block]
+
+
+def test_system_prompt_is_not_a_breakpoint(fake_llm):
+    request = fake_llm._build_request('Hello', SYSTEM, 100)
+
+    assert request['system'] == SYSTEM
+
+
+def test_breakpoint_on_a_short_prefix_is_dropped(fake_llm):
+    content = [cached_text('KNOWLEDGE:\nshort'), {'type': 'text', 'text': 'Write 5 questions.'}]
+
+    assert breakpoints(fake_llm._build_request(content, SYSTEM, 100)) == []
+
+
+def test_breakpoint_on_a_long_prefix_is_kept(fake_llm):
+    knowledge = 'x' * (MIN_CACHEABLE_TOKENS * 4)
+    content = [cached_text(knowledge), {'type': 'text', 'text': 'Write 5 questions.'}]
+
+    assert breakpoints(fake_llm._build_request(content, SYSTEM, 100)) == [0]
+
+
+def test_repeated_knowledge_is_read_from_the_cache(fake_llm):
+    knowledge = 'y' * (MIN_CACHEABLE_TOKENS * 4)
+    for num_questions in (3, 5):
+        content = [cached_text(knowledge), {'type': 'text', 'text': f'Write {num_questions} questions.'}]
+        fake_llm.create(content, system=SYSTEM, max_tokens=quiz_max_tokens(num_questions), label='quiz')
+
+    stats = fake_llm.stats()['quiz']
+    assert stats['cache_write_tokens'] == stats['cache_read_tokens'] > MIN_CACHEABLE_TOKENS
@@ -0,0 +1,128 @@
+import pytest
+
+from utils.maintenance import MaintenanceScheduler, Postpone
+
+NOW = 1_000_000.0
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'maintenance.db')
+
+
+def scheduler(db_path, handler, **kwargs):
+    """Scheduler with a 'file' handler registered."""
+    maintenance = MaintenanceScheduler(db_path, **kwargs)
+    maintenance.register('file', handler)
+    return maintenance
+
+
+def test_only_due_items_are_expired(db_path):
+    expired = []
+    maintenance = scheduler(db_path, lambda key: expired.append(key) or 100)
+    maintenance.schedule('file', 'old', NOW - 1)
+    maintenance.schedule('file', 'new', NOW + 60)
+
+    assert maintenance.run_once(NOW) == {'file': 1}
+    assert expired == ['old']
+
+    # Handled items leave the index; the rest expire once due
+    assert maintenance.run_once(NOW + 61) == {'file': 1}
+    assert expired == ['old', 'new']
+
+
+def test_rescheduling_replaces_the_due_time(db_path):
+    expired = []
+    maintenance = scheduler(db_path, lambda key: expired.append(key) or 1)
+    maintenance.schedule('file', 'session', NOW - 1)
+    maintenance.schedule('file', 'session', NOW + 60)
+
+    maintenance.run_once(NOW)
+    assert expired == []
+
+
+def test_items_already_gone_are_dropped_without_counting(db_path):
+    maintenance = scheduler(db_path, lambda key: None)
+    maintenance.schedule('file', 'gone', NOW - 1)
+
+    assert maintenance.run_once(NOW) == {}
+    assert maintenance.run_once(NOW + 3600) == {}
+
+
+def test_passes_handle_at_most_batch_size_items(db_path):
+    expired = []
+    maintenance = scheduler(db_path, lambda key: expired.append(key) or 1, batch_size=2)
+    for index in range(5):
+        maintenance.schedule('file', f'item-{index}', NOW - 10 + index)
+
+    maintenance.run_once(NOW)
+    assert expired == ['item-0', 'item-1']
+
+    maintenance.run_once(NOW)
+    maintenance.run_once(NOW)
+    assert len(expired) == 5
+
+
+def test_postponed_items_come_back_at_the_new_due_time(db_path):
+    calls = []
+
+    def handler(key):
+        calls.append(key)
+        return Postpone(NOW + 30) if len(calls) == 1 else 1
+
+    maintenance = scheduler(db_path, handler)
+    maintenance.schedule('file', 'in-use', NOW - 1)
+
+    assert maintenance.run_once(NOW) == {}
+    assert maintenance.run_once(NOW + 29) == {}
+    assert maintenance.run_once(NOW + 30) == {'file': 1}
+    assert calls == ['in-use', 'in-use']
+
+
+def test_leased_items_are_hidden_from_other_processes(db_path):
+    first = scheduler(db_path, lambda key: 1, lease_seconds=300)
+    second = scheduler(db_path, lambda key: 1, lease_seconds=300)
+    first.schedule('file', 'shared', NOW - 1)
+
+    # A process claims the item and dies before handling it
+    assert first._claim(NOW) == [('file', 'shared')]
+
+    assert second.run_once(NOW + 1) == {}
+    assert second.run_once(NOW + 301) == {'file': 1}
+
+
+def test_failed_items_are_retried_after_the_lease(db_path):
+    attempts = []
+
+    def handler(key):
+        attempts.append(key)
+        if len(attempts) == 1:
+            raise OSError('disk busy')
+        return 1
+
+    maintenance = scheduler(db_path, handler, lease_seconds=300)
+    maintenance.schedule('file', 'flaky', NOW - 1)
+
+    assert maintenance.run_once(NOW) == {}
+    assert maintenance.run_once(NOW + 100) == {}
+    assert maintenance.run_once(NOW + 301) == {'file': 1}
+    assert len(attempts) == 2
+
+
+def test_backfill_runs_once_per_index(db_path):
+    maintenance = MaintenanceScheduler(db_path)
+    maintenance.register('file', lambda key: 1, backfill=lambda: [('a', NOW - 1), ('b', NOW + 60)])
+    other = MaintenanceScheduler(db_path)
+    other.register('file', lambda key: 1, backfill=lambda: [('c', NOW - 1)])
+
+    assert maintenance.backfill() == 2
+    assert other.backfill() == 0
+    assert maintenance.run_once(NOW) == {'file': 1}
+
+
+def test_periodic_tasks_run_every_pass(db_path):
+    maintenance = MaintenanceScheduler(db_path)
+    maintenance.register_periodic('cache', lambda: 3)
+
+    assert maintenance.run_once(NOW) == {'cache': 3}
+    assert maintenance.run_once(NOW) == {'cache': 3}
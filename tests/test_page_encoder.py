@@ -0,0 +1,93 @@
+import base64
+import io
+import random
+
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+
+from utils.page_encoder import PageEncoder
+
+
+def text_page(width=1700, height=2200):
+    """White page with lines of black text, like a page rendered at 200 DPI."""
+    image = Image.new('RGB', (width, height), 'white')
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default(size=20)
+    for y in range(150, height - 150, 40):
+        draw.text((150, y), 'The mitochondria is the powerhouse of the cell and makes ATP.', fill='black', font=font)
+    return image
+
+
+def chart_page():
+    """Slide-like page with a few flat colors."""
+    image = Image.new('RGB', (800, 600), 'white')
+    draw = ImageDraw.Draw(image)
+    for index, color in enumerate(['red', 'green', 'blue', 'orange']):
+        draw.rectangle((100 + index * 150, 500 - index * 100, 200 + index * 150, 500), fill=color)
+    return image
+
+
+def photo_page():
+    """Noisy full-color page standing in for a photograph."""
+    rng = random.Random(0)
+    image = Image.new('RGB', (400, 300))
+    image.putdata([(rng.randrange(256), rng.randrange(256), rng.randrange(256)) for _ in range(400 * 300)])
+    return image
+
+
+def decode(page):
+    """Open the image of an encoded page."""
+    return Image.open(io.BytesIO(base64.b64decode(page['block']['source']['data'])))
+
+
+def test_text_pages_are_grayscale_png():
+    page = PageEncoder().encode(text_page())
+
+    assert page['format'] == 'png'
+    assert page['block']['source']['media_type'] == 'image/png'
+    assert decode(page).mode == 'L'
+
+
+def test_few_color_pages_stay_lossless():
+    page = PageEncoder().encode(chart_page())
+
+    assert page['format'] == 'png'
+    assert decode(page).mode == 'RGB'
+
+
+def test_photographic_pages_use_jpeg():
+    page = PageEncoder().encode(photo_page())
+
+    assert page['format'] == 'jpeg'
+    assert page['block']['source']['media_type'] == 'image/jpeg'
+
+
+def test_configured_format_overrides_auto():
+    page = PageEncoder(image_format='jpeg').encode(text_page())
+
+    assert page['format'] == 'jpeg'
+
+
+@pytest.mark.parametrize('image_format', ['gif', 'jpg', ''])
+def test_unknown_formats_are_rejected_up_front(image_format):
+    with pytest.raises(ValueError):
+        PageEncoder(image_format=image_format)
+
+
+def test_large_pages_are_downscaled_to_the_long_edge():
+    page = PageEncoder(max_long_edge=1000).encode(text_page(2550, 3300))
+
+    assert max(decode(page).size) <= 1000
+    assert page['encoded_bytes'] < page['raw_bytes']
+
+
+def test_text_only_pages_can_be_sent_as_text():
+    encoder = PageEncoder(text_pages=True, text_min_chars=20)
+    page_text = 'The mitochondria is the powerhouse of the cell.'
+
+    page = encoder.encode(text_page(), page_text=page_text)
+    assert page['format'] == 'text'
+    assert page['block'] == {'type': 'text', 'text': page_text}
+
+    # Pages with pictures are still sent as images
+    assert encoder.encode(photo_page(), page_text=page_text)['format'] == 'jpeg'
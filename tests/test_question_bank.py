@@ -0,0 +1,113 @@
+import time
+
+import pytest
+
+from utils.question_bank import QuestionBank
+from utils.quiz_generator import QuizGenerator
+
+KNOWLEDGE = 'Photosynthesis turns light into chemical energy.'
+
+
+def make_questions(question_type, count, start=0):
+    """Distinct questions of one type."""
+    return [{'type': question_type, 'question': f'{question_type} question {number}', 'correct_answer': 'x'}
+            for number in range(start, start + count)]
+
+
+@pytest.fixture
+def bank(tmp_path):
+    return QuestionBank(str(tmp_path / 'question_bank.db'))
+
+
+def counts(questions):
+    """Number of questions per type."""
+    return {question_type: sum(question['type'] == question_type for question in questions)
+            for question_type in ('multiple_choice', 'fill_blank')}
+
+
+def test_sample_is_sixty_forty_and_numbered(bank):
+    bank.add_questions(KNOWLEDGE, make_questions('multiple_choice', 20) + make_questions('fill_blank', 20))
+
+    quiz = bank.sample(bank.knowledge_hash(KNOWLEDGE), 10)
+
+    assert counts(quiz) == {'multiple_choice': 6, 'fill_blank': 4}
+    assert sorted(question['id'] for question in quiz) == list(range(1, 11))
+    assert len({question['qid'] for question in quiz}) == 10
+
+
+def test_short_type_is_made_up_from_the_other(bank):
+    bank.add_questions(KNOWLEDGE, make_questions('multiple_choice', 20) + make_questions('fill_blank', 2))
+
+    quiz = bank.sample(bank.knowledge_hash(KNOWLEDGE), 10)
+
+    assert counts(quiz) == {'multiple_choice': 8, 'fill_blank': 2}
+    assert len({question['qid'] for question in quiz}) == 10
+
+
+def test_pool_smaller_than_the_quiz_samples_nothing(bank):
+    bank.add_questions(KNOWLEDGE, make_questions('multiple_choice', 3) + make_questions('fill_blank', 3))
+
+    assert bank.sample(bank.knowledge_hash(KNOWLEDGE), 10) is None
+
+
+def test_same_wording_is_stored_once(bank):
+    questions = make_questions('fill_blank', 3)
+    reworded = [dict(questions[0], question='  FILL_BLANK   question 0 ')]
+
+    assert bank.add_questions(KNOWLEDGE, questions) == 3
+    assert bank.add_questions(KNOWLEDGE, questions + reworded) == 0
+    assert bank.pool_size(bank.knowledge_hash(KNOWLEDGE)) == 3
+
+
+def test_full_pool_answers_quizzes_without_claude(bank, fake_llm):
+    bank.add_questions(KNOWLEDGE, make_questions('multiple_choice', 12) + make_questions('fill_blank', 8))
+    generator = QuizGenerator(llm=fake_llm, bank=bank, pool_size=20, pool_min=10)
+
+    quiz = list(generator.generate_quiz_stream(KNOWLEDGE, 10))
+
+    assert counts(quiz) == {'multiple_choice': 6, 'fill_blank': 4}
+    assert 'quiz_stream' not in fake_llm.stats()
+    assert 'quiz' not in fake_llm.stats()
+
+
+def test_generated_quiz_is_topped_up_in_the_background(bank, fake_llm):
+    generator = QuizGenerator(llm=fake_llm, bank=bank, pool_size=20, pool_min=10)
+    knowledge_hash = bank.knowledge_hash(KNOWLEDGE)
+
+    quiz = list(generator.generate_quiz_stream(KNOWLEDGE, 5))
+
+    deadline = time.monotonic() + 5
+    while bank.pool_size(knowledge_hash) < 20 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert len(quiz) == 5
+    assert bank.pool_size(knowledge_hash) >= 20
+
+
+def test_prewarm_waits_for_a_running_generation(bank, fake_llm):
+    generator = QuizGenerator(llm=fake_llm, bank=bank, pool_size=20, pool_min=10)
+    knowledge_hash = bank.knowledge_hash(KNOWLEDGE)
+
+    stream = generator.generate_quiz_stream(KNOWLEDGE, 5)
+    next(stream)
+    generator.prewarm(KNOWLEDGE)
+
+    # Only the streamed generation has called Claude so far
+    assert 'quiz' not in fake_llm.stats()
+    assert knowledge_hash in generator._claimed
+
+    list(stream)
+    deadline = time.monotonic() + 5
+    while bank.pool_size(knowledge_hash) < 20 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert bank.pool_size(knowledge_hash) >= 20
+
+
+def test_prewarm_skips_full_pools(bank, fake_llm):
+    bank.add_questions(KNOWLEDGE, make_questions('multiple_choice', 12) + make_questions('fill_blank', 8))
+    generator = QuizGenerator(llm=fake_llm, bank=bank, pool_size=20, pool_min=10)
+
+    generator.prewarm(KNOWLEDGE)
+
+    assert generator._claimed == set()
+    assert 'quiz' not in fake_llm.stats()
@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from utils.quiz_generator import QuestionStreamParser, QuizGenerator
+
+QUESTIONS = [
+    {
+        'id': 1,
+        'type': 'multiple_choice',
+        'question': 'Which bracket closes a JSON object: "}" or "]"?',
+        'options': ['}', ']', '{', '['],
+        'correct_answer': '}',
+        'explanation': 'Objects are written {like this}; arrays [like this].'
+    },
+    {
+        'id': 2,
+        'type': 'fill_blank',
+        'question': 'A backslash escapes a quote: \\" is written ___',
+        'correct_answer': '\\\\"',
+        'acceptable_answers': ['\\\\"'],
+        'explanation': 'Inside a string, {"nested": ["text"]} is only text.'
+    }
+]
+
+RESPONSE = 'Here is your quiz:\n' + json.dumps({'questions': QUESTIONS}, indent=2) + '\nGood luck!'
+
+
+def feed_all(parser, chunks):
+    """Feed chunks in order and collect every completed question."""
+    questions = []
+    for chunk in chunks:
+        questions.extend(parser.feed(chunk))
+    return questions
+
+
+def test_whole_response_in_one_chunk():
+    parser = QuestionStreamParser()
+
+    assert parser.feed(RESPONSE) == QUESTIONS
+    assert parser.found_array and parser.done
+
+
+@pytest.mark.parametrize('size', [1, 2, 7, 64])
+def test_chunk_boundaries_do_not_matter(size):
+    parser = QuestionStreamParser()
+    chunks = [RESPONSE[start:start + size] for start in range(0, len(RESPONSE), size)]
+
+    assert feed_all(parser, chunks) == QUESTIONS
+    assert parser.done
+
+
+def test_questions_are_returned_as_soon_as_they_close():
+    parser = QuestionStreamParser()
+    # With indent=2 the question objects close at four spaces
+    first_end = RESPONSE.index('\n    },') + len('\n    }')
+
+    assert parser.feed(RESPONSE[:first_end]) == QUESTIONS[:1]
+    assert parser.feed(RESPONSE[first_end:]) == QUESTIONS[1:]
+
+
+def test_text_after_the_array_is_ignored():
+    parser = QuestionStreamParser()
+    parser.feed(RESPONSE)
+
+    assert parser.feed('{"id": 3, "type": "fill_blank"}') == []
+
+
+def test_response_without_questions_array():
+    parser = QuestionStreamParser()
+
+    assert feed_all(parser, ['I cannot ', 'write a quiz {for this}.']) == []
+    assert not parser.found_array
+
+
+def test_generate_quiz_stream_yields_requested_questions(fake_llm):
+    generator = QuizGenerator(llm=fake_llm)
+
+    questions = list(generator.generate_quiz_stream('Cells contain mitochondria. ' * 20, 4))
+
+    assert len(questions) == 4
+    assert fake_llm.stats()['quiz_stream']['calls'] == 1
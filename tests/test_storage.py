@@ -0,0 +1,115 @@
+import itertools
+
+import pytest
+
+from utils import storage
+from utils.session_manager import update_stats
+from utils.storage import Codec, JSONFileStorage, SQLiteStorage, migrate, pack_history, unpack_history
+
+RECORD = {
+    'session_id': 'abc',
+    'questions': [{'question': 'Ünïcode ✓', 'options': ['a', 'b'], 'correct_answer': 'a'}],
+    'user_answers': [],
+    'correct_count': 0,
+    'score': 87.5,
+    'finished': None
+}
+
+# msgpack and zstandard are optional packages
+CODECS = [(data_format, compression)
+          for data_format, compression in itertools.product(['json', 'msgpack'], ['none', 'gzip', 'zstd'])
+          if not (data_format == 'msgpack' and storage.msgpack is None)
+          and not (compression == 'zstd' and storage.zstandard is None)]
+
+
+def review(qid, user_answer, correct_answer='Chloroplast'):
+    """Answer record as stored in a quiz's questions_review."""
+    return {
+        'qid': qid,
+        'question': f'Question {qid}?',
+        'user_answer': user_answer,
+        'correct_answer': correct_answer,
+        'is_correct': user_answer == correct_answer,
+        'explanation': f'Explanation of {qid}.'
+    }
+
+
+def quiz(quiz_id, answers):
+    """Quiz record as saved to history."""
+    return {'quiz_id': quiz_id, 'document_name': 'biology.pdf', 'score_percentage': 50, 'questions_review': answers}
+
+
+@pytest.mark.parametrize('data_format,compression', CODECS)
+def test_codec_round_trip(data_format, compression):
+    codec = Codec(data_format, compression)
+
+    assert codec.loads(codec.dumps(RECORD)) == RECORD
+
+
+@pytest.mark.parametrize('written,reader', list(itertools.product(CODECS, CODECS)))
+def test_any_codec_reads_every_format(written, reader):
+    assert Codec(*reader).loads(Codec(*written).dumps(RECORD)) == RECORD
+
+
+def test_unknown_settings_are_rejected():
+    with pytest.raises(ValueError):
+        Codec('yaml')
+    with pytest.raises(ValueError):
+        Codec('json', 'lz4')
+
+
+def test_pack_history_stores_shared_questions_once():
+    quizzes = [quiz('q2', [review('a', 'Chloroplast'), review('b', 'x')]),
+               quiz('q1', [review('a', 'Nucleus')])]
+
+    history = pack_history('user-1', quizzes)
+
+    assert set(history['questions']) == {'a', 'b'}
+    assert all('question' not in answer for packed in history['quizzes'] for answer in packed['questions_review'])
+    assert unpack_history(history) == quizzes
+
+
+def test_same_qid_with_different_answer_keeps_its_own_copy():
+    quizzes = [quiz('q2', [review('a', 'x', correct_answer='Mitochondria')]),
+               quiz('q1', [review('a', 'x')])]
+
+    history = pack_history('user-1', quizzes)
+
+    assert 'question' in history['quizzes'][1]['questions_review'][0]
+    assert unpack_history(history) == quizzes
+
+
+def test_unpack_reads_histories_without_a_questions_table():
+    quizzes = [quiz('q1', [review('a', 'x')])]
+
+    assert unpack_history({'user_id': 'user-1', 'quizzes': quizzes}) == quizzes
+
+
+def test_history_switches_format_on_the_next_write(tmp_path):
+    old = JSONFileStorage(tmp_path / 'sessions', tmp_path / 'history')
+    old.add_history('user-1', quiz('q1', [review('a', 'x')]))
+
+    new = JSONFileStorage(tmp_path / 'sessions', tmp_path / 'history', codec=Codec('json', 'gzip'))
+    new.add_history('user-1', quiz('q2', [review('a', 'Chloroplast')]))
+
+    assert [record['quiz_id'] for record in new.get_history('user-1')] == ['q2', 'q1']
+    assert [path.name for path in (tmp_path / 'history').iterdir()] == ['user_user-1_history.json.gz']
+
+
+def test_migrate_copies_history_stats(tmp_path):
+    source = JSONFileStorage(tmp_path / 'sessions', tmp_path / 'history')
+    stats = None
+    for quiz_id in ['q1', 'q2']:
+        record = dict(quiz(quiz_id, [review('a', 'x')]), completed_at=f'2026-01-0{quiz_id[1]}T00:00:00Z')
+        stats = update_stats(stats, record)
+        source.add_history('user-1', record, stats=stats)
+    # Saved before aggregates were tracked
+    source.add_history('user-2', dict(quiz('q3', [review('a', 'x')]), completed_at='2026-01-03T00:00:00Z'))
+
+    target = SQLiteStorage(str(tmp_path / 'webquiz.db'))
+    counts = migrate(source, target)
+
+    assert counts == {'sessions': 0, 'users': 2, 'quizzes': 3}
+    assert [record['quiz_id'] for record in target.get_history('user-1')] == ['q2', 'q1']
+    assert target.get_history_stats('user-1') == stats
+    assert target.get_history_stats('user-2')['documents']['biology.pdf']['quizzes'] == 1
@@ -0,0 +1,230 @@
+"""
+Frontend asset build and manifest.
+
+    python -m utils.assets
+
+compiles the Tailwind classes used by templates/ and static/js/ into one
+minified stylesheet (together with static/css/style.css), copies the
+scripts under content-hashed names into static/dist/ and writes gzip and
+brotli versions of each file next to it. static/dist/manifest.json maps
+source names (e.g. 'js/quiz.js') to the built files.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import shlex
+import subprocess
+import tempfile
+from datetime import datetime
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+TAILWIND_DIRECTIVES = "@tailwind base;\n@tailwind components;\n@tailwind utilities;\n"
+MANIFEST_NAME = 'manifest.json'
+PRECOMPRESSED_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+def compress(data, encoding, best=False):
+    """
+    Compress a response body.
+
+    Args:
+        data: Bytes to compress
+        encoding: 'br' or 'gzip'
+        best: Use the slowest, smallest setting (for build output)
+
+    Returns:
+        bytes: Compressed data
+    """
+    if encoding == 'br':
+        return brotli.compress(data, quality=11 if best else 4)
+    return gzip.compress(data, compresslevel=9 if best else 6)
+
+def negotiate_encoding(accept_encodings):
+    """
+    Pick the response encoding for a request.
+
+    Args:
+        accept_encodings: The request's Accept-Encoding header (werkzeug Accept)
+
+    Returns:
+        str: 'br', 'gzip', or None to send the body uncompressed
+    """
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return accept_encodings.best_match(offered)
+
+
+class AssetManifest:
+    """Maps source asset names to the fingerprinted files of the last build."""
+
+    def __init__(self, static_dir='static'):
+        """
+        Initialize asset manifest.
+
+        Args:
+            static_dir: Flask static folder holding dist/
+        """
+        self.dist_dir = os.path.join(static_dir, 'dist')
+        self.files = {}
+
+        try:
+            with open(os.path.join(self.dist_dir, MANIFEST_NAME), encoding='utf-8') as f:
+                self.files = json.load(f)
+        except FileNotFoundError:
+            pass
+
+    @property
+    def built(self):
+        """Whether an asset build exists."""
+        return bool(self.files)
+
+    def path(self, name):
+        """
+        Get the static path to serve an asset from.
+
+        Args:
+            name: Source path relative to static/ (e.g. 'js/quiz.js')
+
+        Returns:
+            str: Fingerprinted path under dist/, or the source path without a build
+        """
+        if name in self.files:
+            return f"dist/{self.files[name]}"
+        return name
+
+    def encoded(self, filename, accept_encodings):
+        """
+        Pick the precompressed variant of a built file the client accepts.
+
+        Args:
+            filename: File name under dist/
+            accept_encodings: The request's Accept-Encoding header (werkzeug Accept)
+
+        Returns:
+            tuple: (file name to send, content encoding or None)
+        """
+        for encoding, suffix in PRECOMPRESSED_SUFFIXES.items():
+            if accept_encodings[encoding] and os.path.isfile(os.path.join(self.dist_dir, filename + suffix)):
+                return filename + suffix, encoding
+        return filename, None
+
+
+def build(static_dir='static', tailwind=None, config='tailwind.config.js'):
+    """
+    Build the stylesheet and fingerprinted scripts into static/dist/.
+
+    Files of the previous build are kept, so pages rendered before a restart
+    still load; older ones are removed.
+
+    Args:
+        static_dir: Flask static folder
+        tailwind: Tailwind CLI command (default: TAILWIND_BIN or 'tailwindcss')
+        config: Tailwind config file
+
+    Returns:
+        dict: Source name -> (built name, bytes, gzip bytes, brotli bytes or None)
+    """
+    dist_dir = os.path.join(static_dir, 'dist')
+    os.makedirs(dist_dir, exist_ok=True)
+
+    outputs = {'css/app.css': _build_css(static_dir, tailwind, config)}
+    js_dir = os.path.join(static_dir, 'js')
+    for filename in sorted(os.listdir(js_dir)):
+        if filename.endswith('.js'):
+            with open(os.path.join(js_dir, filename), 'rb') as f:
+                outputs[f'js/{filename}'] = f.read()
+
+    previous = AssetManifest(static_dir).files
+    files = {}
+    report = {}
+    for name, data in outputs.items():
+        stem, ext = os.path.splitext(os.path.basename(name))
+        built_name = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+        files[name] = built_name
+
+        _write(os.path.join(dist_dir, built_name), data)
+        gzipped = compress(data, 'gzip', best=True)
+        _write(os.path.join(dist_dir, built_name + '.gz'), gzipped)
+        brotlied = None
+        if brotli is not None:
+            brotlied = compress(data, 'br', best=True)
+            _write(os.path.join(dist_dir, built_name + '.br'), brotlied)
+
+        report[name] = (built_name, len(data), len(gzipped), len(brotlied) if brotlied else None)
+
+    _write(os.path.join(dist_dir, MANIFEST_NAME), json.dumps(files, indent=2).encode('utf-8'))
+
+    keep = set(files.values()) | set(previous.values())
+    for entry in os.listdir(dist_dir):
+        base = entry
+        for suffix in PRECOMPRESSED_SUFFIXES.values():
+            base = base.removesuffix(suffix)
+        if entry != MANIFEST_NAME and base not in keep:
+            os.remove(os.path.join(dist_dir, entry))
+
+    return report
+
+def _build_css(static_dir, tailwind, config):
+    """Compile Tailwind plus style.css into one purged, minified stylesheet."""
+    command = shlex.split(tailwind or os.getenv('TAILWIND_BIN', 'tailwindcss'))
+
+    with open(os.path.join(static_dir, 'css', 'style.css'), encoding='utf-8') as f:
+        source = TAILWIND_DIRECTIVES + f.read()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, 'input.css')
+        output_path = os.path.join(tmp, 'app.css')
+        with open(input_path, 'w', encoding='utf-8') as f:
+            f.write(source)
+
+        try:
+            subprocess.run(
+                command + ['-c', config, '-i', input_path, '-o', output_path, '--minify'],
+                check=True, capture_output=True, text=True
+            )
+        except FileNotFoundError:
+            raise RuntimeError(
+                f"Tailwind CLI not found ({command[0]}). Download the standalone binary from "
+                "https://github.com/tailwindlabs/tailwindcss/releases and set TAILWIND_BIN"
+            )
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"Tailwind build failed: {e.stderr.strip()}")
+
+        with open(output_path, 'rb') as f:
+            return f.read()
+
+def _write(path, data):
+    """Write a build output file."""
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def main():
+    """Command line entry point: build the frontend assets."""
+    parser = argparse.ArgumentParser(description='Build the WebQuiz stylesheet and fingerprinted scripts '
+                                                 'into static/dist/.')
+    parser.add_argument('--static-dir', default='static')
+    parser.add_argument('--tailwind', help='Tailwind CLI command (default: $TAILWIND_BIN or tailwindcss)')
+    parser.add_argument('--config', default='tailwind.config.js')
+    args = parser.parse_args()
+
+    started = datetime.now()
+    report = build(args.static_dir, args.tailwind, args.config)
+    elapsed = (datetime.now() - started).total_seconds()
+
+    for name, (built_name, size, gzipped, brotlied) in report.items():
+        compressed = f"{gzipped / 1024:.1f} KB gzip"
+        if brotlied is not None:
+            compressed += f", {brotlied / 1024:.1f} KB brotli"
+        print(f"{name} -> dist/{built_name}: {size / 1024:.1f} KB ({compressed})")
+    if brotli is None:
+        print("brotli is not installed (pip install brotli); only gzip versions were written")
+    print(f"Built {len(report)} assets in {elapsed:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
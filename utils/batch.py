@@ -0,0 +1,199 @@
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+SUPPORTED_EXTENSIONS = {'pdf', 'xlsx', 'xls'}
+
+logger = logging.getLogger(__name__)
+
+class BatchProcessor:
+    """Generate question sets for many documents at once and store them in the question bank."""
+
+    def __init__(self, document_processor, quiz_generator, question_bank, max_workers=4):
+        """
+        Initialize batch processor.
+
+        Args:
+            document_processor: DocumentProcessor used for extraction
+            quiz_generator: QuizGenerator used for questions
+            question_bank: QuestionBank the question sets are written to
+            max_workers: Documents processed concurrently
+        """
+        self.document_processor = document_processor
+        self.quiz_generator = quiz_generator
+        self.question_bank = question_bank
+        self.max_workers = max_workers
+
+    def run(self, file_paths, num_questions=10, document_names=None):
+        """
+        Process documents concurrently.
+
+        A failing document is reported in its own entry and does not stop
+        the rest of the batch.
+
+        Args:
+            file_paths: Paths of PDF or Excel files
+            num_questions: Questions generated per document
+            document_names: Optional display names, one per path
+
+        Returns:
+            dict: Per-file results and a throughput summary
+        """
+        names = document_names or [os.path.basename(path) for path in file_paths]
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers,
+                                thread_name_prefix='webquiz-batch') as executor:
+            files = list(executor.map(
+                lambda item: self.process_file(item[0], item[1], num_questions),
+                zip(file_paths, names)
+            ))
+
+        elapsed = time.perf_counter() - started
+        succeeded = [entry for entry in files if entry['status'] == 'done']
+        questions = sum(entry['questions'] for entry in succeeded)
+
+        return {
+            'files': files,
+            'summary': {
+                'files': len(files),
+                'succeeded': len(succeeded),
+                'failed': len(files) - len(succeeded),
+                'questions': questions,
+                'new_questions': sum(entry['new_questions'] for entry in succeeded),
+                'elapsed_seconds': round(elapsed, 2),
+                'files_per_minute': round(len(succeeded) / elapsed * 60, 2) if elapsed else 0,
+                'questions_per_minute': round(questions / elapsed * 60, 2) if elapsed else 0
+            }
+        }
+
+    def process_file(self, file_path, document_name, num_questions):
+        """
+        Extract, generate and bank the questions for one document.
+
+        Args:
+            file_path: Path to the document
+            document_name: Name stored with the question pool
+            num_questions: Questions to generate
+
+        Returns:
+            dict: Status, question counts and per-stage timings in seconds
+        """
+        entry = {
+            'file': document_name,
+            'status': 'done',
+            'questions': 0,
+            'new_questions': 0,
+            'cached': False,
+            'knowledge_hash': None,
+            'extract_seconds': 0,
+            'generate_seconds': 0,
+            'total_seconds': 0,
+            'error': None
+        }
+        started = time.perf_counter()
+
+        try:
+            file_extension = file_path.rsplit('.', 1)[1].lower()
+
+            result = self.document_processor.process_document(file_path, file_extension)
+            entry['cached'] = result.get('cached', False)
+            entry['extract_seconds'] = round(time.perf_counter() - started, 2)
+
+            generate_started = time.perf_counter()
+            questions = self.quiz_generator.generate_quiz(result['knowledge'], num_questions)
+            entry['generate_seconds'] = round(time.perf_counter() - generate_started, 2)
+
+            entry['questions'] = len(questions)
+            entry['new_questions'] = self.question_bank.add_questions(
+                result['knowledge'], questions, document_name=document_name
+            )
+            entry['knowledge_hash'] = self.question_bank.knowledge_hash(result['knowledge'])
+
+        except Exception as e:
+            logger.exception("Batch processing failed for %s", document_name)
+            entry['status'] = 'failed'
+            entry['error'] = str(e)
+
+        entry['total_seconds'] = round(time.perf_counter() - started, 2)
+        return entry
+
+
+def collect_files(paths):
+    """
+    Expand files and directories into the supported documents they contain.
+
+    Args:
+        paths: File or directory paths
+
+    Returns:
+        list: Sorted document paths
+    """
+    files = []
+
+    for path in map(Path, paths):
+        candidates = path.rglob('*') if path.is_dir() else [path]
+        for candidate in candidates:
+            if candidate.is_file() and candidate.suffix.lstrip('.').lower() in SUPPORTED_EXTENSIONS:
+                files.append(str(candidate))
+
+    return sorted(set(files))
+
+
+def main():
+    """Command line entry point: bank questions for a directory or list of documents."""
+    parser = argparse.ArgumentParser(description='Generate WebQuiz question sets for many documents.')
+    parser.add_argument('paths', nargs='+', help='Documents or directories of documents')
+    parser.add_argument('--num-questions', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=int(os.getenv('BATCH_WORKERS', '4')))
+    parser.add_argument('--bank', default=os.getenv('QUESTION_BANK_PATH', 'data/question_bank.db'))
+    parser.add_argument('--json', action='store_true', help='Print the full report as JSON')
+    args = parser.parse_args()
+
+    from utils.document_processor import DocumentProcessor
+    from utils.knowledge_cache import KnowledgeCache
+    from utils.llm_client import get_llm_client
+    from utils.question_bank import QuestionBank
+    from utils.quiz_generator import QuizGenerator
+
+    files = collect_files(args.paths)
+    if not files:
+        parser.error('no PDF or Excel files found')
+
+    llm = get_llm_client()
+    processor = BatchProcessor(
+        DocumentProcessor(
+            cache=KnowledgeCache(os.getenv('KNOWLEDGE_CACHE_PATH', 'data/cache/knowledge.db')),
+            llm=llm
+        ),
+        QuizGenerator(llm=llm),
+        QuestionBank(args.bank),
+        max_workers=args.workers
+    )
+    report = processor.run(files, args.num_questions)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    for entry in report['files']:
+        if entry['status'] == 'done':
+            print(f"{entry['file']}: {entry['questions']} questions "
+                  f"({entry['new_questions']} new), extract {entry['extract_seconds']}s"
+                  f"{' (cached)' if entry['cached'] else ''}, "
+                  f"generate {entry['generate_seconds']}s")
+        else:
+            print(f"{entry['file']}: failed after {entry['total_seconds']}s: {entry['error']}")
+
+    summary = report['summary']
+    print(f"{summary['succeeded']}/{summary['files']} files, {summary['questions']} questions "
+          f"in {summary['elapsed_seconds']}s ({summary['files_per_minute']} files/min, "
+          f"{summary['questions_per_minute']} questions/min)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""SQLite helpers shared by the local on-disk stores."""
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+
+class SQLiteDatabase:
+    """Lazily opened, per-thread SQLite connections for a single database file."""
+
+    def __init__(self, db_path, schema=''):
+        """
+        Initialize database handle.
+
+        Args:
+            db_path: Path to the SQLite database file
+            schema: SQL script run once per connection to create tables/indexes
+        """
+        self.db_path = Path(db_path)
+        self.schema = schema
+        self._local = threading.local()
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+    def connection(self):
+        """
+        Get the connection for the current thread and process.
+
+        Connections are never shared across threads or forked workers, so
+        each one is opened on first use in WAL mode.
+
+        Returns:
+            sqlite3.Connection: Open connection in autocommit mode
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        if self.schema:
+            conn.executescript(self.schema)
+
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def execute(self, sql, params=()):
+        """Execute a single statement on the current thread's connection."""
+        return self.connection().execute(sql, params)
+
+    def transaction(self):
+        """
+        Start an immediate (write-locked) transaction.
+
+        Returns:
+            _Transaction: Context manager yielding the connection
+        """
+        return _Transaction(self.connection())
+
+
+class _Transaction:
+    """Context manager wrapping BEGIN IMMEDIATE / COMMIT / ROLLBACK."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.execute('COMMIT')
+        else:
+            self.conn.execute('ROLLBACK')
+        return False
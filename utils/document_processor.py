@@ -1,168 +1,618 @@
-import base64
+import asyncio
+import hashlib
+import json
 import os
-from pdf2image import convert_from_path
-from anthropic import Anthropic
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-import io
-from PIL import Image
+from utils.llm_client import MODEL, get_llm_client
+from utils.metrics import stage
+from utils.page_encoder import PageEncoder
+from utils.spreadsheet_reader import iter_workbook, read_sheet, sheet_chunks
 
 load_dotenv()
 
+PDF_DPI = 150
+
+# Bump whenever the extraction prompts change so cached knowledge is not reused
+PROMPT_VERSION = 2
+
+EXTRACTION_GUIDELINES = """Organize your findings by topic/category. Include:
+- Key facts and definitions
+- Important concepts and their relationships
+- Processes and how they work
+- Dates, names, and specific details
+- Any testable information
+
+Be thorough and precise. This will be used to generate quiz questions."""
+
+# Sent as the system prompt of every extraction call
+EXTRACTION_SYSTEM = f"""Analyze the study material you are given and extract all factual information, key concepts, definitions, relationships, and testable knowledge.
+
+{EXTRACTION_GUIDELINES}"""
+
 class DocumentProcessor:
     """Process uploaded documents and extract knowledge using Claude."""
 
-    def __init__(self):
-        """Initialize Anthropic client."""
-        api_key = os.getenv('ANTHROPIC_API_KEY')
-        if not api_key:
-            raise ValueError("ANTHROPIC_API_KEY not found in environment variables")
-        self.client = Anthropic(api_key=api_key)
+    def __init__(self, cache=None, llm=None, render_chunk_pages=4, encode_workers=None, encoder=None,
+                 map_reduce_min_pages=20, map_reduce_min_chars=100_000, chunk_pages=10,
+                 extract_workers=4, sheet_max_chars=200_000, sheet_chunk_chars=50_000):
+        """
+        Initialize document processor.
+
+        Args:
+            cache: Optional KnowledgeCache for previously processed files
+            llm: LLMClient to use (default: the process-wide client)
+            render_chunk_pages: Max PDF pages rasterized in memory at once
+            encode_workers: Threads used to encode pages (default: CPU count)
+            encoder: PageEncoder choosing the format of each page
+            map_reduce_min_pages: PDFs with this many pages are extracted in chunks
+            map_reduce_min_chars: Workbooks with this much markdown are extracted per sheet
+            chunk_pages: Pages per chunk in map-reduce mode
+            extract_workers: Concurrent Claude calls in map-reduce mode
+            sheet_max_chars: Table text kept per sheet; larger sheets are sampled
+            sheet_chunk_chars: Table text per chunk when large sheets are split
+        """
+        self.llm = llm or get_llm_client()
+        self.cache = cache
+        self.render_chunk_pages = max(1, render_chunk_pages)
+        self.encode_workers = encode_workers or os.cpu_count() or 1
+        self.encoder = encoder or PageEncoder()
+        self.map_reduce_min_pages = map_reduce_min_pages
+        self.map_reduce_min_chars = map_reduce_min_chars
+        self.chunk_pages = max(1, chunk_pages)
+        self.extract_workers = max(1, extract_workers)
+        self.sheet_max_chars = sheet_max_chars
+        self.sheet_chunk_chars = sheet_chunk_chars
+
+    def iter_pdf_pages(self, file_path, page_count=None):
+        """
+        Rasterize and encode PDF pages in bounded chunks.
+
+        Only render_chunk_pages bitmaps are alive at any time: each chunk is
+        rendered by parallel poppler processes, encoded across a thread pool
+        and released before the next chunk is rendered.
+
+        Args:
+            file_path: Path to PDF file
+            page_count: Number of pages, if already known
+
+        Yields:
+            dict: PageEncoder result for each page, in page order
+        """
+        # pdf2image and PIL are imported on first use to keep server startup fast
+        from pdf2image import convert_from_path, pdfinfo_from_path
+
+        if page_count is None:
+            with stage('pdf_info'):
+                page_count = pdfinfo_from_path(file_path)['Pages']
+
+        with ThreadPoolExecutor(max_workers=self.encode_workers) as executor:
+            for first_page in range(1, page_count + 1, self.render_chunk_pages):
+                last_page = min(first_page + self.render_chunk_pages - 1, page_count)
+
+                with stage('pdf_render'):
+                    images = convert_from_path(
+                        file_path,
+                        dpi=PDF_DPI,
+                        first_page=first_page,
+                        last_page=last_page,
+                        thread_count=min(self.encode_workers, last_page - first_page + 1)
+                    )
+
+                if self.encoder.text_pages:
+                    with stage('pdf_text'):
+                        texts = _extract_page_texts(file_path, first_page, last_page)
+                else:
+                    texts = [None] * len(images)
+
+                try:
+                    yield from executor.map(self._encode_page, images, texts)
+                finally:
+                    for image in images:
+                        image.close()
+                    del images
+
+    def _encode_page(self, image, page_text):
+        """Encode one page and release its bitmap."""
+        try:
+            with stage('page_encode'):
+                return self.encoder.encode(image, page_text)
+        finally:
+            image.close()
 
     def process_pdf(self, file_path):
         """
         Convert PDF to images and send to Claude for analysis.
 
+        Documents with at least map_reduce_min_pages pages are split into
+        page chunks that are extracted concurrently and merged afterwards.
+
         Args:
             file_path: Path to PDF file
 
         Returns:
             dict: Extracted knowledge from document
         """
-        # Convert PDF pages to images
-        images = convert_from_path(file_path, dpi=150)
+        from pdf2image import pdfinfo_from_path
 
-        # Prepare content for Claude with all pages
-        content = []
-        for i, image in enumerate(images):
-            # Convert PIL Image to base64
-            buffered = io.BytesIO()
-            image.save(buffered, format="PNG")
-            img_base64 = base64.b64encode(buffered.getvalue()).decode('utf-8')
+        with stage('pdf_info'):
+            page_count = pdfinfo_from_path(file_path)['Pages']
+        encoding = {'image_pages': 0, 'text_pages': 0, 'raw_bytes': 0, 'encoded_bytes': 0}
 
-            # Add image to content
+        if page_count >= self.map_reduce_min_pages:
+            knowledge, chunks = self._process_pdf_chunked(file_path, page_count, encoding)
+        else:
+            # Prepare content for Claude with all pages
+            content = []
+            for page in self.iter_pdf_pages(file_path, page_count):
+                content.append(page['block'])
+                _count_page(encoding, page)
+
+            # Add text prompt after all images
             content.append({
-                "type": "image",
-                "source": {
-                    "type": "base64",
-                    "media_type": "image/png",
-                    "data": img_base64
-                }
+                "type": "text",
+                "text": "Extract the knowledge from this study material."
             })
 
-        # Add text prompt after all images
-        content.append({
-            "type": "text",
-            "text": """Analyze this study material and extract all factual information, key concepts, definitions, relationships, and testable knowledge.
+            knowledge = self._call_claude(content)
+            chunks = 1
 
-Organize your findings by topic/category. Include:
-- Key facts and definitions
-- Important concepts and their relationships
-- Processes and how they work
-- Dates, names, and specific details
-- Any testable information
-
-Be thorough and precise. This will be used to generate quiz questions."""
-        })
-
-        # Call Claude API
-        message = self.client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=4096,
-            messages=[
-                {
-                    "role": "user",
-                    "content": content
-                }
-            ]
-        )
-
-        # Extract text response
-        knowledge = message.content[0].text
+        encoding['bytes_saved'] = encoding['raw_bytes'] - encoding['encoded_bytes']
 
         return {
             "type": "pdf",
-            "pages": len(images),
+            "pages": page_count,
+            "chunks": chunks,
+            "encoding": encoding,
             "knowledge": knowledge
         }
 
-    def process_spreadsheet(self, file_path):
+    def _process_pdf_chunked(self, file_path, page_count, encoding):
+        """
+        Map-reduce extraction over page chunks.
+
+        Each chunk is submitted as soon as its pages are encoded, so Claude
+        calls overlap with rendering of the following pages.
+
+        Args:
+            file_path: Path to PDF file
+            page_count: Number of pages in the PDF
+            encoding: Encoding stats dict updated in place
+
+        Returns:
+            tuple: (merged knowledge, number of chunks)
+        """
+        futures = []
+        chunk = []
+        first_page = 1
+        page_num = 0
+
+        with ThreadPoolExecutor(max_workers=self.extract_workers) as executor:
+            for page_num, page in enumerate(self.iter_pdf_pages(file_path, page_count), start=1):
+                chunk.append(page['block'])
+                _count_page(encoding, page)
+
+                if len(chunk) == self.chunk_pages:
+                    label, content = _page_chunk(chunk, first_page, page_num, page_count)
+                    futures.append((label, executor.submit(self._extract_chunk, content)))
+
+                    chunk = []
+                    first_page = page_num + 1
+
+            # The renderer may yield fewer pages than pdfinfo reported
+            if chunk:
+                label, content = _page_chunk(chunk, first_page, page_num, page_count)
+                futures.append((label, executor.submit(self._extract_chunk, content)))
+
+            parts = _collect_chunks(futures)
+
+        return self._merge_knowledge(parts), len(parts)
+
+    def _extract_chunk(self, content):
+        """
+        Extract knowledge from one chunk, reusing a cached result if present.
+
+        Args:
+            content: Claude content blocks for the chunk
+
+        Returns:
+            str: Extracted knowledge
+        """
+        cache_key = None
+        if self.cache:
+            cache_key = _chunk_cache_key(content)
+            cached = self.cache.get(cache_key)
+            if cached:
+                return cached['knowledge']
+
+        knowledge = self._call_claude(content, label='extract_chunk')
+
+        if cache_key:
+            self.cache.put(cache_key, {'knowledge': knowledge})
+
+        return knowledge
+
+    def _merge_knowledge(self, parts):
+        """
+        Reduce step: merge per-chunk knowledge into one document summary.
+
+        Args:
+            parts: List of (label, knowledge) tuples in document order
+
+        Returns:
+            str: Merged knowledge
+        """
+        if len(parts) == 1:
+            return parts[0][1]
+
+        return self._call_claude(_merge_prompt(parts), max_tokens=8192, label='merge')
+
+    def _call_claude(self, content, max_tokens=4096, label='extract'):
+        """
+        Send a single extraction request to Claude.
+
+        Args:
+            content: Message content (string or content blocks)
+            max_tokens: Output token limit
+            label: Call name in LLM stats
+
+        Returns:
+            str: Text response
+        """
+        return self.llm.create(content, system=EXTRACTION_SYSTEM, max_tokens=max_tokens, label=label)
+
+    def process_spreadsheet(self, file_path, file_extension='xlsx'):
         """
         Convert spreadsheet to markdown and send to Claude for analysis.
 
+        Sheets are streamed row by row and kept within sheet_max_chars each
+        (see read_sheet). Workbooks whose markdown exceeds map_reduce_min_chars
+        are extracted in chunks of at most sheet_chunk_chars, concurrently,
+        and merged afterwards.
+
+        Args:
+            file_path: Path to Excel file
+            file_extension: 'xlsx' or 'xls'
+
+        Returns:
+            dict: Extracted knowledge from document
+        """
+        sheets, rows, chunks = self._read_workbook(file_path, file_extension)
+
+        total_chars = sum(len(markdown) for _, markdown in chunks)
+        map_reduce = len(chunks) > 1 and total_chars >= self.map_reduce_min_chars
+
+        if map_reduce:
+            with ThreadPoolExecutor(max_workers=self.extract_workers) as executor:
+                futures = [
+                    (label, executor.submit(
+                        self._extract_chunk,
+                        _spreadsheet_prompt(markdown, "part of a larger workbook")
+                    ))
+                    for label, markdown in chunks
+                ]
+                parts = _collect_chunks(futures)
+
+            knowledge = self._merge_knowledge(parts)
+        else:
+            markdown_text = '\n'.join(markdown for _, markdown in chunks)
+            knowledge = self._call_claude(_spreadsheet_prompt(markdown_text, "a spreadsheet"))
+
+        return {
+            "type": "spreadsheet",
+            "sheets": sheets,
+            "chunks": len(chunks) if map_reduce else 1,
+            "rows": rows,
+            "knowledge": knowledge
+        }
+
+    def _read_workbook(self, file_path, file_extension):
+        """
+        Read every sheet and split the table text into extraction chunks.
+
         Args:
             file_path: Path to Excel file
+            file_extension: 'xlsx' or 'xls'
+
+        Returns:
+            tuple: (sheet count, row counts dict, list of (label, markdown) chunks)
+        """
+        sheets = 0
+        rows = {'total': 0, 'duplicates': 0, 'omitted': 0}
+        chunks = []
+
+        for sheet_name, sheet_rows in iter_workbook(file_path, file_extension):
+            with stage('spreadsheet_read'):
+                sheet = read_sheet(sheet_name, sheet_rows, self.sheet_max_chars)
+            sheets += 1
+            rows['total'] += sheet['total_rows']
+            rows['duplicates'] += sheet['duplicate_rows']
+            rows['omitted'] += sheet['omitted_rows']
+
+            parts = sheet_chunks(sheet, self.sheet_chunk_chars)
+            for index, markdown in enumerate(parts):
+                label = f"sheet {sheet_name}" + (f" part {index + 1}" if len(parts) > 1 else "")
+                chunks.append((label, markdown))
+
+        if not chunks:
+            raise ValueError("Spreadsheet contains no data")
+
+        return sheets, rows, chunks
+
+    def process_document(self, file_path, file_extension):
+        """
+        Process document based on file type.
+
+        Args:
+            file_path: Path to uploaded file
+            file_extension: File extension (pdf, xlsx, xls)
 
         Returns:
             dict: Extracted knowledge from document
         """
-        from openpyxl import load_workbook
+        if file_extension not in ['pdf', 'xlsx', 'xls']:
+            raise ValueError(f"Unsupported file type: {file_extension}")
 
-        # Load workbook
-        workbook = load_workbook(file_path, data_only=True)
+        cache_key = None
+        if self.cache:
+            cache_key, cached = self._cache_lookup(file_path)
+            if cached:
+                return cached
 
-        # Convert all sheets to markdown
-        markdown_content = []
+        if file_extension == 'pdf':
+            result = self.process_pdf(file_path)
+        else:
+            result = self.process_spreadsheet(file_path, file_extension)
 
-        for sheet_name in workbook.sheetnames:
-            sheet = workbook[sheet_name]
-            markdown_content.append(f"## Sheet: {sheet_name}\n")
+        if cache_key:
+            result['cache_key'] = cache_key
+            self.cache.put(cache_key, result)
 
-            # Convert sheet to markdown table
-            rows = []
-            for row in sheet.iter_rows(values_only=True):
-                # Skip empty rows
-                if all(cell is None or str(cell).strip() == '' for cell in row):
-                    continue
-                # Convert row to strings
-                row_strings = [str(cell) if cell is not None else '' for cell in row]
-                rows.append('| ' + ' | '.join(row_strings) + ' |')
+        result['cached'] = False
+        return result
 
-            if rows:
-                # Add header separator after first row
-                if len(rows) > 1:
-                    num_cols = rows[0].count('|') - 1
-                    separator = '| ' + ' | '.join(['---'] * num_cols) + ' |'
-                    rows.insert(1, separator)
+    def _cache_lookup(self, file_path):
+        """
+        Look up a previously processed file in the knowledge cache.
 
-                markdown_content.extend(rows)
+        Args:
+            file_path: Path to uploaded file
 
-            markdown_content.append('\n')
+        Returns:
+            tuple: (cache key, cached result marked cached=True, or None)
+        """
+        with stage('knowledge_cache_lookup'):
+            cache_key = self.cache.make_key(file_path, MODEL, PROMPT_VERSION)
+            cached = self.cache.get(cache_key)
 
-        markdown_text = '\n'.join(markdown_content)
+        if cached:
+            cached['cached'] = True
+        return cache_key, cached
 
-        # Call Claude API
-        message = self.client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=4096,
-            messages=[
-                {
-                    "role": "user",
-                    "content": f"""Analyze this study material (from a spreadsheet) and extract all factual information, key concepts, definitions, relationships, and testable knowledge.
 
-{markdown_text}
+class AsyncDocumentProcessor:
+    """
+    Async counterpart of DocumentProcessor, calling Claude through AsyncAnthropic.
 
-Organize your findings by topic/category. Include:
-- Key facts and definitions
-- Important concepts and their relationships
-- Processes and how they work
-- Dates, names, and specific details
-- Any testable information
+    Wraps a DocumentProcessor for its settings, renderer and cache. Claude
+    calls are awaited instead of holding a thread. Rasterization, page
+    encoding, workbook reading and cache access run in the loop's executor,
+    so they never stall other calls multiplexed on the loop.
+    """
 
-Be thorough and precise. This will be used to generate quiz questions."""
-                }
+    def __init__(self, processor):
+        """
+        Initialize async document processor.
+
+        Args:
+            processor: DocumentProcessor providing the client, cache and extraction settings
+        """
+        self.processor = processor
+
+    @property
+    def llm(self):
+        """LLMClient shared with the wrapped processor."""
+        return self.processor.llm
+
+    @property
+    def cache(self):
+        """KnowledgeCache shared with the wrapped processor."""
+        return self.processor.cache
+
+    async def process_pdf(self, file_path):
+        """
+        Convert PDF to images and send to Claude for analysis.
+
+        Args:
+            file_path: Path to PDF file
+
+        Returns:
+            dict: Extracted knowledge from document
+        """
+        from pdf2image import pdfinfo_from_path
+
+        with stage('pdf_info'):
+            page_count = (await asyncio.to_thread(pdfinfo_from_path, file_path))['Pages']
+        encoding = {'image_pages': 0, 'text_pages': 0, 'raw_bytes': 0, 'encoded_bytes': 0}
+
+        if page_count >= self.processor.map_reduce_min_pages:
+            knowledge, chunks = await self._process_pdf_chunked(file_path, page_count, encoding)
+        else:
+            pages = await asyncio.to_thread(list, self.processor.iter_pdf_pages(file_path, page_count))
+
+            content = []
+            for page in pages:
+                content.append(page['block'])
+                _count_page(encoding, page)
+            content.append({
+                "type": "text",
+                "text": "Extract the knowledge from this study material."
+            })
+
+            knowledge = await self._call_claude(content)
+            chunks = 1
+
+        encoding['bytes_saved'] = encoding['raw_bytes'] - encoding['encoded_bytes']
+
+        return {
+            "type": "pdf",
+            "pages": page_count,
+            "chunks": chunks,
+            "encoding": encoding,
+            "knowledge": knowledge
+        }
+
+    async def _process_pdf_chunked(self, file_path, page_count, encoding):
+        """
+        Map-reduce extraction over page chunks.
+
+        Pages are rendered in the executor one at a time; each chunk's Claude
+        call starts as soon as its pages are encoded.
+
+        Args:
+            file_path: Path to PDF file
+            page_count: Number of pages in the PDF
+            encoding: Encoding stats dict updated in place
+
+        Returns:
+            tuple: (merged knowledge, number of chunks)
+        """
+        limit = asyncio.Semaphore(self.processor.extract_workers)
+        pages = self.processor.iter_pdf_pages(file_path, page_count)
+        tasks = []
+        chunk = []
+        first_page = 1
+        page_num = 0
+
+        try:
+            while True:
+                # A StopIteration cannot cross into the awaiting coroutine, so the end is None
+                page = await asyncio.to_thread(next, pages, None)
+                if page is None:
+                    break
+                page_num += 1
+                chunk.append(page['block'])
+                _count_page(encoding, page)
+
+                if len(chunk) == self.processor.chunk_pages:
+                    label, content = _page_chunk(chunk, first_page, page_num, page_count)
+                    tasks.append((label, asyncio.create_task(self._extract_chunk(content, limit))))
+
+                    chunk = []
+                    first_page = page_num + 1
+
+            # The renderer may yield fewer pages than pdfinfo reported
+            if chunk:
+                label, content = _page_chunk(chunk, first_page, page_num, page_count)
+                tasks.append((label, asyncio.create_task(self._extract_chunk(content, limit))))
+        except BaseException:
+            for _, task in tasks:
+                task.cancel()
+            raise
+        finally:
+            # Closing the generator releases its bitmaps and encoder threads
+            await asyncio.to_thread(pages.close)
+
+        parts = await _gather_chunks(tasks)
+
+        return await self._merge_knowledge(parts), len(parts)
+
+    async def _extract_chunk(self, content, limit):
+        """
+        Extract knowledge from one chunk, reusing a cached result if present.
+
+        Args:
+            content: Claude content blocks for the chunk
+            limit: Semaphore bounding this document's concurrent calls
+
+        Returns:
+            str: Extracted knowledge
+        """
+        cache_key = None
+        if self.cache:
+            cache_key = await asyncio.to_thread(_chunk_cache_key, content)
+            cached = await asyncio.to_thread(self.cache.get, cache_key)
+            if cached:
+                return cached['knowledge']
+
+        async with limit:
+            knowledge = await self._call_claude(content, label='extract_chunk')
+
+        if cache_key:
+            await asyncio.to_thread(self.cache.put, cache_key, {'knowledge': knowledge})
+
+        return knowledge
+
+    async def _merge_knowledge(self, parts):
+        """
+        Reduce step: merge per-chunk knowledge into one document summary.
+
+        Args:
+            parts: List of (label, knowledge) tuples in document order
+
+        Returns:
+            str: Merged knowledge
+        """
+        if len(parts) == 1:
+            return parts[0][1]
+
+        return await self._call_claude(_merge_prompt(parts), max_tokens=8192, label='merge')
+
+    async def _call_claude(self, content, max_tokens=4096, label='extract'):
+        """
+        Send a single extraction request to Claude.
+
+        Args:
+            content: Message content (string or content blocks)
+            max_tokens: Output token limit
+            label: Call name in LLM stats
+
+        Returns:
+            str: Text response
+        """
+        return await self.llm.acreate(content, system=EXTRACTION_SYSTEM, max_tokens=max_tokens, label=label)
+
+    async def process_spreadsheet(self, file_path, file_extension='xlsx'):
+        """
+        Convert spreadsheet to markdown and send to Claude for analysis.
+
+        Args:
+            file_path: Path to Excel file
+            file_extension: 'xlsx' or 'xls'
+
+        Returns:
+            dict: Extracted knowledge from document
+        """
+        sheets, rows, chunks = await asyncio.to_thread(self.processor._read_workbook, file_path, file_extension)
+
+        total_chars = sum(len(markdown) for _, markdown in chunks)
+        map_reduce = len(chunks) > 1 and total_chars >= self.processor.map_reduce_min_chars
+
+        if map_reduce:
+            limit = asyncio.Semaphore(self.processor.extract_workers)
+            tasks = [
+                (label, asyncio.create_task(self._extract_chunk(
+                    _spreadsheet_prompt(markdown, "part of a larger workbook"), limit
+                )))
+                for label, markdown in chunks
             ]
-        )
+            parts = await _gather_chunks(tasks)
 
-        # Extract text response
-        knowledge = message.content[0].text
+            knowledge = await self._merge_knowledge(parts)
+        else:
+            markdown_text = '\n'.join(markdown for _, markdown in chunks)
+            knowledge = await self._call_claude(_spreadsheet_prompt(markdown_text, "a spreadsheet"))
 
         return {
             "type": "spreadsheet",
-            "sheets": len(workbook.sheetnames),
+            "sheets": sheets,
+            "chunks": len(chunks) if map_reduce else 1,
+            "rows": rows,
             "knowledge": knowledge
         }
 
-    def process_document(self, file_path, file_extension):
+    async def process_document(self, file_path, file_extension):
         """
         Process document based on file type.
 
@@ -173,9 +623,163 @@ Be thorough and precise. This will be used to generate quiz questions."""
         Returns:
             dict: Extracted knowledge from document
         """
+        if file_extension not in ['pdf', 'xlsx', 'xls']:
+            raise ValueError(f"Unsupported file type: {file_extension}")
+
+        cache_key = None
+        if self.cache:
+            # Hashing the file and reading SQLite stay off the event loop
+            cache_key, cached = await asyncio.to_thread(self.processor._cache_lookup, file_path)
+            if cached:
+                return cached
+
         if file_extension == 'pdf':
-            return self.process_pdf(file_path)
-        elif file_extension in ['xlsx', 'xls']:
-            return self.process_spreadsheet(file_path)
+            result = await self.process_pdf(file_path)
         else:
-            raise ValueError(f"Unsupported file type: {file_extension}")
+            result = await self.process_spreadsheet(file_path, file_extension)
+
+        if cache_key:
+            result['cache_key'] = cache_key
+            await asyncio.to_thread(self.cache.put, cache_key, result)
+
+        result['cached'] = False
+        return result
+
+
+def _count_page(encoding, page):
+    """Add one encoded page to the document encoding stats."""
+    encoding['text_pages' if page['format'] == 'text' else 'image_pages'] += 1
+    encoding['raw_bytes'] += page['raw_bytes']
+    encoding['encoded_bytes'] += page['encoded_bytes']
+
+
+def _page_chunk(blocks, first_page, last_page, page_count):
+    """
+    Build the Claude content for one chunk of PDF pages.
+
+    Args:
+        blocks: Content blocks of the chunk's pages
+        first_page: Number of the chunk's first page
+        last_page: Number of the chunk's last page
+        page_count: Pages in the whole document
+
+    Returns:
+        tuple: (label, content blocks)
+    """
+    label = f"pages {first_page}-{last_page} of {page_count}"
+    return label, blocks + [{
+        "type": "text",
+        "text": f"These are {label} of a larger study document. Extract the knowledge from them."
+    }]
+
+
+def _collect_chunks(futures):
+    """
+    Wait for every chunk and gather results in document order.
+
+    Successful chunks are cached by _extract_chunk before this raises, so a
+    retry of the document only re-runs the chunks that failed.
+
+    Args:
+        futures: List of (label, Future) tuples
+
+    Returns:
+        list: (label, knowledge) tuples
+    """
+    parts = []
+    failed = []
+
+    for label, future in futures:
+        try:
+            parts.append((label, future.result()))
+        except Exception as e:
+            failed.append(f"{label}: {e}")
+
+    if failed:
+        raise _chunks_failed(failed, len(futures))
+
+    return parts
+
+
+async def _gather_chunks(tasks):
+    """
+    Like _collect_chunks(), for asyncio tasks.
+
+    Args:
+        tasks: List of (label, Task) tuples
+
+    Returns:
+        list: (label, knowledge) tuples
+    """
+    results = await asyncio.gather(*(task for _, task in tasks), return_exceptions=True)
+
+    parts = []
+    failed = []
+    for (label, _), result in zip(tasks, results):
+        if isinstance(result, BaseException):
+            failed.append(f"{label}: {result}")
+        else:
+            parts.append((label, result))
+
+    if failed:
+        raise _chunks_failed(failed, len(tasks))
+
+    return parts
+
+
+def _chunks_failed(failed, total):
+    """Error for a document whose chunk extractions partly failed."""
+    return RuntimeError(
+        f"Knowledge extraction failed for {len(failed)} of {total} chunks ({'; '.join(failed)})"
+    )
+
+
+def _chunk_cache_key(content):
+    """Cache key of one chunk's extraction: its content, the model and the prompt version."""
+    digest = hashlib.sha256(json.dumps(content, sort_keys=True).encode('utf-8'))
+    digest.update(f'|chunk|{MODEL}|{PROMPT_VERSION}'.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _merge_prompt(parts):
+    """Build the reduce prompt merging per-chunk knowledge."""
+    sections = '\n\n'.join(f"### Part {i} ({label})\n{knowledge}"
+                           for i, (label, knowledge) in enumerate(parts, start=1))
+
+    return f"""Below are knowledge extracts from consecutive parts of one study document. Merge them into a single knowledge summary: combine topics that appear in several parts, remove duplicates, and keep every distinct fact and detail.
+
+{sections}"""
+
+
+def _spreadsheet_prompt(markdown_text, source):
+    """Build the extraction prompt for spreadsheet markdown."""
+    return f"""This study material is {source}:
+
+{markdown_text}"""
+
+
+def _extract_page_texts(file_path, first_page, last_page):
+    """
+    Extract text for a page range with poppler's pdftotext.
+
+    Args:
+        file_path: Path to PDF file
+        first_page: First page number (1-based)
+        last_page: Last page number (inclusive)
+
+    Returns:
+        list: Text per page, or None where extraction failed
+    """
+    page_count = last_page - first_page + 1
+
+    try:
+        result = subprocess.run(
+            ['pdftotext', '-f', str(first_page), '-l', str(last_page), '-layout', file_path, '-'],
+            capture_output=True, check=True, timeout=60
+        )
+    except (OSError, subprocess.SubprocessError):
+        return [None] * page_count
+
+    # pdftotext terminates every page with a form feed
+    pages = result.stdout.decode('utf-8', errors='replace').split('\f')
+    return [pages[i] if i < len(pages) else None for i in range(page_count)]
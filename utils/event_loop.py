@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+class BackgroundLoop:
+    """
+    asyncio event loop running in a daemon thread of each process.
+
+    Request threads hand coroutines to the loop and return immediately, so
+    hundreds of Claude calls can wait on one thread instead of one thread
+    each. Blocking work the coroutines offload with asyncio.to_thread
+    (rasterization, file reads, SQLite) runs on the loop's own executor.
+    """
+
+    def __init__(self, executor_workers=None, name='webquiz-async'):
+        """
+        Initialize background loop.
+
+        Args:
+            executor_workers: Threads for blocking work offloaded by coroutines (default: CPU count)
+            name: Thread name prefix
+        """
+        self.executor_workers = executor_workers or os.cpu_count() or 1
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._loop = None
+        self._loop_pid = None
+        self._thread = None
+
+    def _get_loop(self):
+        """Start the loop lazily so forked server workers each run their own."""
+        with self._lock:
+            if self._loop_pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                loop.set_default_executor(ThreadPoolExecutor(
+                    max_workers=self.executor_workers, thread_name_prefix=f'{self.name}-executor'
+                ))
+                self._thread = threading.Thread(
+                    target=self._run, args=(loop,), name=self.name, daemon=True
+                )
+                self._loop = loop
+                self._loop_pid = os.getpid()
+                self._thread.start()
+
+            return self._loop
+
+    def _run(self, loop):
+        """Loop thread: run until stopped, then release the executor."""
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_forever()
+        finally:
+            loop.run_until_complete(loop.shutdown_default_executor())
+            loop.close()
+
+    def submit(self, coro):
+        """
+        Schedule a coroutine on the loop from any thread.
+
+        The coroutine runs in a copy of the caller's context, so logs it
+        writes carry the request ID.
+
+        Args:
+            coro: Coroutine object
+
+        Returns:
+            concurrent.futures.Future: Resolves with the coroutine's result
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._get_loop())
+
+    def close(self, timeout=None):
+        """
+        Let running coroutines finish, then stop the loop.
+
+        Args:
+            timeout: Seconds to wait for running coroutines before cancelling them
+        """
+        with self._lock:
+            loop = self._loop if self._loop_pid == os.getpid() else None
+            thread = self._thread
+            self._loop_pid = None
+
+        if loop is None:
+            return
+
+        try:
+            asyncio.run_coroutine_threadsafe(_drain(timeout), loop).result()
+        except Exception:
+            logger.exception("Draining the event loop failed")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+
+async def _drain(timeout):
+    """Wait for every other task on the loop, cancelling those still running after timeout."""
+    tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+    if not tasks:
+        return
+
+    _, pending = await asyncio.wait(tasks, timeout=timeout)
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.wait(pending)
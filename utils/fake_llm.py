@@ -0,0 +1,220 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import time
+import uuid
+from types import SimpleNamespace
+
+from utils.llm_client import CHARS_PER_TOKEN, LLMClient, estimate_tokens
+
+QUESTION_COUNT = re.compile(r'create exactly (\d+) quiz questions')
+
+class FakeLLMClient(LLMClient):
+    """
+    LLMClient answering from a local fake instead of the Anthropic API.
+
+    Only the HTTP client is replaced, so the limiter, retries, token
+    budgeting and stats behave as in production. Selected with
+    LLM_BACKEND=fake; used by the benchmarks and for working without a key.
+    """
+
+    def __init__(self, latency=None, tokens_per_second=None, knowledge_chars=None, **kwargs):
+        """
+        Initialize fake client.
+
+        Args:
+            latency: Seconds before the first token of every response
+            tokens_per_second: Output rate, 0 for instant responses
+            knowledge_chars: Size of extracted knowledge responses
+            **kwargs: LLMClient settings
+        """
+        self.latency = float(os.getenv('LLM_FAKE_LATENCY', '0.5')) if latency is None else latency
+        self.tokens_per_second = (float(os.getenv('LLM_FAKE_TOKENS_PER_SECOND', '0'))
+                                  if tokens_per_second is None else tokens_per_second)
+        self.knowledge_chars = (int(os.getenv('LLM_FAKE_KNOWLEDGE_CHARS', '4000'))
+                                if knowledge_chars is None else knowledge_chars)
+        super().__init__(**kwargs)
+
+    def _load_api_key(self):
+        """No key is needed."""
+        return None
+
+    def _new_client(self):
+        """Build the fake messages API."""
+        return SimpleNamespace(messages=_FakeMessages(self))
+
+    def _new_async_client(self):
+        """Build the fake async messages API."""
+        return SimpleNamespace(messages=_FakeAsyncMessages(self))
+
+
+class _FakeMessages:
+    """Stand-in for client.messages with create() and stream()."""
+
+    def __init__(self, fake):
+        self.fake = fake
+        self._cached_prefixes = set()
+
+    def create(self, **request):
+        text = self._respond(request)
+        time.sleep(self.fake.latency + self._output_seconds(text))
+        return SimpleNamespace(content=[SimpleNamespace(text=text)], usage=self._usage(request, text))
+
+    def stream(self, **request):
+        return _FakeStream(self, request)
+
+    def _respond(self, request):
+        """Build a response of the right shape for the request."""
+        content = request['messages'][0]['content']
+        prompt = content if isinstance(content, str) else ' '.join(
+            block.get('text', '') for block in content if block.get('type') == 'text'
+        )
+
+        match = QUESTION_COUNT.search(prompt)
+        if match:
+            return json.dumps({'questions': _fake_questions(int(match.group(1)))}, indent=2)
+
+        # Same document, same knowledge, so caches behave realistically
+        seed = hashlib.sha256(json.dumps(content, sort_keys=True).encode('utf-8')).hexdigest()
+        return _fake_knowledge(seed, self.fake.knowledge_chars)
+
+    def _output_seconds(self, text):
+        """Time to produce text at the configured output rate."""
+        if not self.fake.tokens_per_second:
+            return 0
+        return len(text) / CHARS_PER_TOKEN / self.fake.tokens_per_second
+
+    def _usage(self, request, text):
+        """Token usage, counting the prefix up to the last breakpoint as cached after its first use."""
+        content = request['messages'][0]['content']
+        system = request.get('system') or ''
+        input_tokens = estimate_tokens(content) + (estimate_tokens(system) if system else 0)
+        cache_read = cache_write = 0
+
+        blocks = [] if isinstance(content, str) else content
+        breakpoints = [index for index, block in enumerate(blocks) if 'cache_control' in block]
+        if breakpoints:
+            cached_blocks = blocks[:breakpoints[-1] + 1]
+            prefix = json.dumps([system, cached_blocks], sort_keys=True)
+            prefix_tokens = estimate_tokens(cached_blocks) + (estimate_tokens(system) if system else 0)
+            if prefix in self._cached_prefixes:
+                cache_read = prefix_tokens
+            else:
+                self._cached_prefixes.add(prefix)
+                cache_write = prefix_tokens
+            input_tokens -= prefix_tokens
+
+        return SimpleNamespace(
+            input_tokens=input_tokens,
+            output_tokens=len(text) // CHARS_PER_TOKEN,
+            cache_read_input_tokens=cache_read,
+            cache_creation_input_tokens=cache_write
+        )
+
+
+class _FakeStream:
+    """Stand-in for the messages.stream() context manager."""
+
+    def __init__(self, messages, request):
+        self.messages = messages
+        self.request = request
+        self.text = messages._respond(request)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    @property
+    def text_stream(self):
+        time.sleep(self.messages.fake.latency)
+        for start in range(0, len(self.text), 64):
+            chunk = self.text[start:start + 64]
+            time.sleep(self.messages._output_seconds(chunk))
+            yield chunk
+
+    def get_final_message(self):
+        return SimpleNamespace(usage=self.messages._usage(self.request, self.text))
+
+
+class _FakeAsyncMessages(_FakeMessages):
+    """Stand-in for the async client.messages; waits with asyncio.sleep."""
+
+    async def create(self, **request):
+        text = self._respond(request)
+        await asyncio.sleep(self.fake.latency + self._output_seconds(text))
+        return SimpleNamespace(content=[SimpleNamespace(text=text)], usage=self._usage(request, text))
+
+    def stream(self, **request):
+        return _FakeAsyncStream(self, request)
+
+
+class _FakeAsyncStream(_FakeStream):
+    """Stand-in for the async messages.stream() context manager."""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    @property
+    async def text_stream(self):
+        await asyncio.sleep(self.messages.fake.latency)
+        for start in range(0, len(self.text), 64):
+            chunk = self.text[start:start + 64]
+            await asyncio.sleep(self.messages._output_seconds(chunk))
+            yield chunk
+
+    async def get_final_message(self):
+        return super().get_final_message()
+
+
+def _fake_questions(count):
+    """Unique questions, mixed 60/40 like real responses."""
+    questions = []
+
+    for number in range(1, count + 1):
+        tag = uuid.uuid4().hex[:8]
+        if number % 5 in (1, 2, 3):
+            options = [f"Option {letter} {tag}" for letter in 'ABCD']
+            questions.append({
+                'id': number,
+                'type': 'multiple_choice',
+                'question': f"Which statement about concept {tag} is correct?",
+                'options': options,
+                'correct_answer': options[0],
+                'explanation': f"Concept {tag} is described by option A."
+            })
+        else:
+            questions.append({
+                'id': number,
+                'type': 'fill_blank',
+                'question': f"The term for concept {tag} is ___",
+                'correct_answer': tag,
+                'acceptable_answers': [tag],
+                'explanation': f"The term is {tag}."
+            })
+
+    return questions
+
+
+def _fake_knowledge(seed, size):
+    """Deterministic knowledge text of about size characters."""
+    generator = random.Random(seed)
+    lines = []
+    length = 0
+    topic = 0
+
+    while length < size:
+        topic += 1
+        line = (f"## Topic {topic}\n- Fact {generator.randint(1000, 9999)}: "
+                f"concept {seed[:6]}-{topic} relates to value {generator.random():.4f}.")
+        lines.append(line)
+        length += len(line) + 1
+
+    return '\n'.join(lines)
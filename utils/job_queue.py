@@ -0,0 +1,307 @@
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.db import SQLiteDatabase
+from utils.metrics import REGISTRY
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    owner_pid INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs (finished_at);
+"""
+
+logger = logging.getLogger(__name__)
+
+JOB_SECONDS = REGISTRY.histogram(
+    'webquiz_job_seconds', 'Job run time by kind and outcome', ('kind', 'status')
+)
+JOB_WAIT_SECONDS = REGISTRY.histogram(
+    'webquiz_job_wait_seconds', 'Time jobs spent queued before a worker picked them up', ('kind',)
+)
+JOBS_REJECTED = REGISTRY.counter(
+    'webquiz_jobs_rejected_total', 'Jobs refused because the queue was full', ('kind',)
+)
+
+class QueueFullError(Exception):
+    """Raised when the queue already holds max_pending jobs."""
+
+
+class JobQueue:
+    """
+    Run slow requests on a bounded worker pool with status kept in SQLite.
+
+    Coroutine jobs (submit_async) run on a BackgroundLoop instead, where
+    they only hold a thread while doing blocking work, so far more of them
+    can be in progress at once.
+    """
+
+    def __init__(self, db_path='data/jobs.db', max_workers=4, max_pending=50, job_ttl_hours=24,
+                 loop=None, max_pending_async=500):
+        """
+        Initialize job queue.
+
+        Args:
+            db_path: Path to the SQLite job store
+            max_workers: Jobs run concurrently by this process
+            max_pending: Queued plus running jobs accepted by this process
+            job_ttl_hours: Finished jobs are deleted after this many hours
+            loop: BackgroundLoop running coroutine jobs
+            max_pending_async: Coroutine jobs in progress accepted by this process
+        """
+        self.db = SQLiteDatabase(db_path, SCHEMA)
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.job_ttl_hours = job_ttl_hours
+        self.loop = loop
+        self.max_pending_async = max_pending_async
+
+        self._lock = threading.Lock()
+        self._executor = None
+        self._executor_pid = None
+        self._pending = 0
+        self._pending_async = 0
+
+    def _get_executor(self):
+        """Create the worker pool lazily so forked server workers each get their own."""
+        if self._executor is None or self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix='webquiz-job'
+            )
+            self._executor_pid = os.getpid()
+            self._pending = 0
+        return self._executor
+
+    def submit(self, kind, func, *args, **kwargs):
+        """
+        Enqueue a job.
+
+        Args:
+            kind: Job type name (e.g. 'upload')
+            func: Callable returning a JSON-serializable result
+            *args, **kwargs: Arguments passed to func
+
+        Returns:
+            str: Job ID
+
+        Raises:
+            QueueFullError: If max_pending jobs are already queued or running
+        """
+        with self._lock:
+            executor = self._get_executor()
+            if self._pending >= self.max_pending:
+                JOBS_REJECTED.inc(kind=kind)
+                raise QueueFullError(f"Job queue is full ({self.max_pending} pending jobs)")
+            self._pending += 1
+
+        try:
+            job_id, now = self._insert(kind)
+            # Run in a copy of the caller's context so job logs carry the request ID
+            context = contextvars.copy_context()
+            executor.submit(context.run, self._run, job_id, kind, now, func, args, kwargs)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+
+        return job_id
+
+    def submit_async(self, kind, func, *args, **kwargs):
+        """
+        Enqueue a coroutine job on the background event loop.
+
+        Args:
+            kind: Job type name (e.g. 'upload')
+            func: Coroutine function returning a JSON-serializable result
+            *args, **kwargs: Arguments passed to func
+
+        Returns:
+            str: Job ID
+
+        Raises:
+            QueueFullError: If max_pending_async coroutine jobs are already in progress
+        """
+        with self._lock:
+            if self._pending_async >= self.max_pending_async:
+                JOBS_REJECTED.inc(kind=kind)
+                raise QueueFullError(f"Job queue is full ({self.max_pending_async} pending jobs)")
+            self._pending_async += 1
+
+        try:
+            job_id, now = self._insert(kind)
+            # The loop runs the coroutine in a copy of this context, keeping the request ID
+            self.loop.submit(self._run_async(job_id, kind, now, func, args, kwargs))
+        except Exception:
+            with self._lock:
+                self._pending_async -= 1
+            raise
+
+        return job_id
+
+    def _insert(self, kind):
+        """Record a new queued job and drop expired ones."""
+        job_id = str(uuid.uuid4())
+        now = time.time()
+
+        self.db.execute(
+            'DELETE FROM jobs WHERE finished_at < ?', (now - self.job_ttl_hours * 3600,)
+        )
+        self.db.execute(
+            'INSERT INTO jobs (job_id, kind, status, owner_pid, created_at) VALUES (?, ?, ?, ?, ?)',
+            (job_id, kind, 'queued', os.getpid(), now)
+        )
+
+        return job_id, now
+
+    def _run(self, job_id, kind, created_at, func, args, kwargs):
+        """Execute a job and record its outcome."""
+        try:
+            started_at = self._started(job_id, kind, created_at)
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                self._finished(job_id, kind, started_at, error=e)
+            else:
+                self._finished(job_id, kind, started_at, result=result)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def _run_async(self, job_id, kind, created_at, func, args, kwargs):
+        """Execute a coroutine job and record its outcome."""
+        try:
+            started_at = await asyncio.to_thread(self._started, job_id, kind, created_at)
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as e:
+                await asyncio.to_thread(self._finished, job_id, kind, started_at, error=e)
+            else:
+                await asyncio.to_thread(self._finished, job_id, kind, started_at, result=result)
+        finally:
+            with self._lock:
+                self._pending_async -= 1
+
+    def _started(self, job_id, kind, created_at):
+        """Mark a job as running and return its start time."""
+        started_at = time.time()
+        JOB_WAIT_SECONDS.observe(started_at - created_at, kind=kind)
+        self.db.execute(
+            'UPDATE jobs SET status = ?, started_at = ? WHERE job_id = ?',
+            ('running', started_at, job_id)
+        )
+        return started_at
+
+    def _finished(self, job_id, kind, started_at, result=None, error=None):
+        """Record a job's result or error."""
+        if error is not None:
+            logger.error("Job %s (%s) failed", job_id, kind, exc_info=error)
+            self.db.execute(
+                'UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE job_id = ?',
+                ('failed', str(error), time.time(), job_id)
+            )
+            JOB_SECONDS.observe(time.time() - started_at, kind=kind, status='failed')
+        else:
+            self.db.execute(
+                'UPDATE jobs SET status = ?, result = ?, finished_at = ? WHERE job_id = ?',
+                ('done', json.dumps(result), time.time(), job_id)
+            )
+            JOB_SECONDS.observe(time.time() - started_at, kind=kind, status='done')
+
+    def get(self, job_id):
+        """
+        Get job status.
+
+        Args:
+            job_id: Job UUID
+
+        Returns:
+            dict: Job status, result and error, or None if not found
+        """
+        row = self.db.execute('SELECT * FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+
+        if row is None:
+            return None
+
+        job = {
+            'job_id': row['job_id'],
+            'kind': row['kind'],
+            'status': row['status'],
+            'result': json.loads(row['result']) if row['result'] else None,
+            'error': row['error'],
+            'created_at': row['created_at'],
+            'started_at': row['started_at'],
+            'finished_at': row['finished_at']
+        }
+
+        # Jobs owned by a process that has since exited will never finish
+        if job['status'] in ('queued', 'running') and not _process_alive(row['owner_pid']):
+            job['status'] = 'failed'
+            job['error'] = 'Job was interrupted by a server restart'
+            job['finished_at'] = time.time()
+            self.db.execute(
+                'UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE job_id = ?',
+                (job['status'], job['error'], job['finished_at'], job_id)
+            )
+
+        return job
+
+    def close(self, wait=True):
+        """
+        Stop accepting work in this process and drop jobs that have not started.
+
+        Dropped jobs keep their queued status and are reported as interrupted
+        once this process has exited.
+
+        Args:
+            wait: Block until running jobs have finished
+        """
+        with self._lock:
+            executor = self._executor if self._executor_pid == os.getpid() else None
+            self._executor = None
+
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def stats(self):
+        """
+        Get queue counters for this process.
+
+        Returns:
+            dict: Pending jobs and limits
+        """
+        with self._lock:
+            return {
+                'pending': self._pending,
+                'pending_async': self._pending_async,
+                'max_workers': self.max_workers,
+                'max_pending': self.max_pending,
+                'max_pending_async': self.max_pending_async
+            }
+
+
+def _process_alive(pid):
+    """Check whether a local process is still running."""
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
@@ -0,0 +1,192 @@
+import hashlib
+import json
+import threading
+import time
+
+from utils.db import SQLiteDatabase
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS knowledge (
+    key TEXT PRIMARY KEY,
+    result TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_knowledge_created ON knowledge (created_at);
+CREATE INDEX IF NOT EXISTS idx_knowledge_access ON knowledge (last_access);
+"""
+
+
+class KnowledgeCache:
+    """Persistent, content-addressed cache of extracted document knowledge."""
+
+    def __init__(self, db_path='data/cache/knowledge.db', max_bytes=200 * 1024 * 1024,
+                 max_age_hours=24 * 30):
+        """
+        Initialize knowledge cache.
+
+        Args:
+            db_path: Path to the SQLite cache database
+            max_bytes: Total size budget for cached results
+            max_age_hours: Entries older than this are evicted
+        """
+        self.db = SQLiteDatabase(db_path, SCHEMA)
+        self.max_bytes = max_bytes
+        self.max_age_hours = max_age_hours
+
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def make_key(file_path, model, prompt_version):
+        """
+        Build a cache key from file contents, model name and prompt version.
+
+        Args:
+            file_path: Path to uploaded file
+            model: Claude model used for extraction
+            prompt_version: Version of the extraction prompt
+
+        Returns:
+            str: Hex SHA-256 digest
+        """
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+
+        digest.update(f'|{model}|{prompt_version}'.encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key):
+        """
+        Look up a cached extraction result.
+
+        Args:
+            key: Cache key from make_key
+
+        Returns:
+            dict: Cached result or None on a miss
+        """
+        now = time.time()
+        min_created = now - self.max_age_hours * 3600
+
+        row = self.db.execute(
+            'SELECT result FROM knowledge WHERE key = ? AND created_at >= ?',
+            (key, min_created)
+        ).fetchone()
+
+        if row is None:
+            with self._lock:
+                self._misses += 1
+            return None
+
+        self.db.execute(
+            'UPDATE knowledge SET last_access = ?, hits = hits + 1 WHERE key = ?',
+            (now, key)
+        )
+        with self._lock:
+            self._hits += 1
+
+        return json.loads(row['result'])
+
+    def put(self, key, result):
+        """
+        Store an extraction result and evict entries over budget.
+
+        Args:
+            key: Cache key from make_key
+            result: JSON-serializable extraction result
+        """
+        payload = json.dumps(result, separators=(',', ':'))
+        now = time.time()
+
+        self.db.execute(
+            'INSERT OR REPLACE INTO knowledge (key, result, size, created_at, last_access, hits) '
+            'VALUES (?, ?, ?, ?, ?, 0)',
+            (key, payload, len(payload), now, now)
+        )
+
+        self.evict()
+
+    def invalidate(self, key):
+        """
+        Remove a single cache entry.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            bool: True if an entry was removed
+        """
+        cursor = self.db.execute('DELETE FROM knowledge WHERE key = ?', (key,))
+        return cursor.rowcount > 0
+
+    def clear(self):
+        """
+        Remove every cache entry.
+
+        Returns:
+            int: Number of entries removed
+        """
+        cursor = self.db.execute('DELETE FROM knowledge')
+        return cursor.rowcount
+
+    def evict(self):
+        """
+        Evict expired entries, then least recently used entries over the size budget.
+
+        Returns:
+            int: Number of entries evicted
+        """
+        threshold = time.time() - self.max_age_hours * 3600
+        removed = self.db.execute(
+            'DELETE FROM knowledge WHERE created_at < ?', (threshold,)
+        ).rowcount
+
+        total = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM knowledge').fetchone()[0]
+
+        if total > self.max_bytes:
+            with self.db.transaction() as conn:
+                rows = conn.execute(
+                    'SELECT key, size FROM knowledge ORDER BY last_access'
+                ).fetchall()
+                for row in rows:
+                    if total <= self.max_bytes:
+                        break
+                    conn.execute('DELETE FROM knowledge WHERE key = ?', (row['key'],))
+                    total -= row['size']
+                    removed += 1
+
+        with self._lock:
+            self._evictions += removed
+
+        return removed
+
+    def stats(self):
+        """
+        Get cache counters.
+
+        Returns:
+            dict: Hit/miss/eviction counters and current size
+        """
+        row = self.db.execute(
+            'SELECT COUNT(*) AS entries, COALESCE(SUM(size), 0) AS size FROM knowledge'
+        ).fetchone()
+
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 3) if lookups else 0.0,
+                'evictions': self._evictions,
+                'entries': row['entries'],
+                'size_bytes': row['size'],
+                'max_bytes': self.max_bytes,
+                'max_age_hours': self.max_age_hours
+            }
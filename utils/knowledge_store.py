@@ -0,0 +1,95 @@
+import time
+
+from utils.db import SQLiteDatabase
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    file_id TEXT PRIMARY KEY,
+    document_name TEXT,
+    document_type TEXT,
+    knowledge TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+class KnowledgeStore:
+    """Extracted knowledge of each upload, kept server-side under its file_id."""
+
+    def __init__(self, db_path='data/knowledge_store.db'):
+        """
+        Initialize knowledge store.
+
+        Args:
+            db_path: Path to the SQLite database
+        """
+        self.db = SQLiteDatabase(db_path, SCHEMA)
+
+    def put(self, file_id, knowledge, document_name=None, document_type=None):
+        """
+        Store the knowledge extracted from an upload.
+
+        Args:
+            file_id: Upload UUID
+            knowledge: Extracted knowledge text
+            document_name: Original file name
+            document_type: 'pdf' or 'spreadsheet'
+        """
+        self.db.execute(
+            'INSERT OR REPLACE INTO uploads (file_id, document_name, document_type, knowledge, created_at) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (file_id, document_name, document_type, knowledge, time.time())
+        )
+
+    def get(self, file_id):
+        """
+        Look up an upload's knowledge.
+
+        Args:
+            file_id: Upload UUID
+
+        Returns:
+            dict: knowledge, document_name and document_type, or None if not found
+        """
+        row = self.db.execute(
+            'SELECT knowledge, document_name, document_type FROM uploads WHERE file_id = ?',
+            (file_id,)
+        ).fetchone()
+
+        return dict(row) if row else None
+
+    def describe(self, file_id):
+        """
+        Look up an upload without reading its knowledge.
+
+        Args:
+            file_id: Upload UUID
+
+        Returns:
+            dict: document_name, document_type and created_at, or None if not found
+        """
+        row = self.db.execute(
+            'SELECT document_name, document_type, created_at FROM uploads WHERE file_id = ?',
+            (file_id,)
+        ).fetchone()
+
+        return dict(row) if row else None
+
+    def delete(self, file_id):
+        """
+        Forget an upload's knowledge.
+
+        Args:
+            file_id: Upload UUID
+
+        Returns:
+            int: Size of the removed knowledge in bytes, or None if not found
+        """
+        with self.db.transaction() as conn:
+            row = conn.execute(
+                'SELECT LENGTH(knowledge) AS size FROM uploads WHERE file_id = ?', (file_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute('DELETE FROM uploads WHERE file_id = ?', (file_id,))
+
+        return row['size']
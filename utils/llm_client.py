@@ -0,0 +1,720 @@
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from dotenv import load_dotenv
+from utils.metrics import REGISTRY
+
+load_dotenv()
+
+MODEL = "claude-sonnet-4-20250514"
+
+# Input plus output tokens the model accepts per request
+CONTEXT_WINDOW = 200_000
+
+# Rough local estimates, used to bound requests before they are sent
+CHARS_PER_TOKEN = 4
+IMAGE_TOKENS = 1600  # a page at the 1568px / 1.15MP encoder limits
+TOKENS_PER_QUESTION = 300
+MAX_OUTPUT_TOKENS = 16_000
+
+CACHE_CONTROL = {"type": "ephemeral"}
+# Shorter prompt prefixes are never cached, so a breakpoint on them only uses up a slot
+MIN_CACHEABLE_TOKENS = 1024
+
+# Rate limited (429), unavailable (503) and overloaded (529) responses are retried
+RETRY_STATUS_CODES = {429, 503, 529}
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+
+_shared_client = None
+_shared_lock = threading.Lock()
+
+LLM_SECONDS = REGISTRY.histogram(
+    'webquiz_llm_seconds', 'Claude call latency by call type', ('label',)
+)
+LLM_TOKENS = REGISTRY.counter(
+    'webquiz_llm_tokens_total', 'Claude tokens by call type and kind', ('label', 'kind')
+)
+LLM_WAIT_SECONDS = REGISTRY.histogram(
+    'webquiz_llm_wait_seconds', 'Time Claude calls waited for the rate limiter and a free slot'
+)
+LLM_RETRIES = REGISTRY.counter(
+    'webquiz_llm_retries_total', 'Retried Claude calls by reason', ('reason',)
+)
+
+class DeadlineExceededError(Exception):
+    """Raised when a Claude call cannot finish within its deadline."""
+
+
+class LLMClient:
+    """Shared Claude client: prompt caching, token budgeting, rate limiting and per-call stats."""
+
+    def __init__(self, model=MODEL, context_window=CONTEXT_WINDOW, history=500,
+                 max_concurrency=8, requests_per_minute=0, max_retries=5,
+                 deadline_seconds=600, pool_connections=20, async_max_concurrency=200):
+        """
+        Initialize Anthropic client settings.
+
+        The HTTP client is created lazily per process, so forked server
+        workers never share connections. The async methods use a separate
+        AsyncAnthropic client per event loop with its own concurrency limit,
+        sharing the request rate limit and stats with the blocking calls.
+
+        Args:
+            model: Claude model used for every call
+            context_window: Input plus output token limit checked before sending
+            history: Recent calls kept per label for latency percentiles
+            max_concurrency: Claude calls in flight at once in this process
+            requests_per_minute: Token-bucket request rate, 0 for no limit
+            max_retries: Retries of rate-limited or overloaded calls
+            deadline_seconds: Time allowed per call, including waits and retries
+            pool_connections: HTTP connections kept open to the API
+            async_max_concurrency: Async Claude calls in flight at once in this process
+        """
+        self.api_key = self._load_api_key()
+        self.model = model
+        self.context_window = context_window
+        self.history = history
+        self.max_concurrency = max(1, max_concurrency)
+        self.requests_per_minute = requests_per_minute
+        self.max_retries = max_retries
+        self.deadline_seconds = deadline_seconds
+        self.pool_connections = pool_connections
+        self.async_max_concurrency = max(1, async_max_concurrency)
+
+        self._lock = threading.Lock()
+        self._stats = {}
+        self.client = None
+        self._client_pid = None
+        self._slots = None
+        self._async_client = None
+        self._async_loop = None
+        self._async_slots = None
+        self._bucket = None
+        self._waiting = 0
+        self._in_flight = 0
+        self._waits = deque(maxlen=history)
+        self._limiter = {'retries': 0, 'throttled': 0, 'deadline_exceeded': 0}
+
+    def _load_api_key(self):
+        """Read the Anthropic API key from the environment."""
+        api_key = os.getenv('ANTHROPIC_API_KEY')
+        if not api_key:
+            raise ValueError("ANTHROPIC_API_KEY not found in environment variables")
+        return api_key
+
+    def _new_client(self):
+        """Build the Anthropic client with a sized connection pool."""
+        # The SDK takes longer to import than the rest of the app, so it is
+        # loaded with the first client instead of at startup
+        from anthropic import Anthropic, DefaultHttpxClient
+
+        httpx = _import_httpx()
+        http_client = None
+        if httpx is not None:
+            http_client = DefaultHttpxClient(limits=httpx.Limits(
+                max_connections=self.pool_connections,
+                max_keepalive_connections=self.pool_connections
+            ))
+
+        # Retries are handled here, with jitter and a shared deadline
+        return Anthropic(api_key=self.api_key, max_retries=0, http_client=http_client)
+
+    def _new_async_client(self):
+        """Build the AsyncAnthropic client for the running event loop."""
+        from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
+
+        httpx = _import_httpx()
+        http_client = None
+        if httpx is not None:
+            http_client = DefaultAsyncHttpxClient(limits=httpx.Limits(
+                max_connections=self.async_max_concurrency,
+                max_keepalive_connections=self.pool_connections
+            ))
+
+        return AsyncAnthropic(api_key=self.api_key, max_retries=0, http_client=http_client)
+
+    def _ensure_process(self):
+        """Reset the clients and limiter after a fork. Caller holds self._lock."""
+        if self._client_pid != os.getpid():
+            self.client = None
+            self._async_client = None
+            self._async_loop = None
+            self._slots = threading.BoundedSemaphore(self.max_concurrency)
+            self._bucket = _TokenBucket(self.requests_per_minute) if self.requests_per_minute else None
+            self._waiting = 0
+            self._in_flight = 0
+            self._client_pid = os.getpid()
+
+    def _get_client(self):
+        """Create the HTTP client and limiter once per process."""
+        with self._lock:
+            self._ensure_process()
+            if self.client is None:
+                self.client = self._new_client()
+
+            return self.client
+
+    def _get_async_client(self):
+        """Create the async HTTP client and its slots once per event loop."""
+        loop = asyncio.get_running_loop()
+
+        with self._lock:
+            self._ensure_process()
+            if self._async_loop is not loop:
+                self._async_client = self._new_async_client()
+                self._async_slots = asyncio.Semaphore(self.async_max_concurrency)
+                self._async_loop = loop
+
+            return self._async_client
+
+    def warm_up(self):
+        """Load the SDK and create the HTTP client ahead of the first call."""
+        self._get_client()
+
+    def create(self, content, system=None, max_tokens=4096, label='call'):
+        """
+        Send one message and wait for the full response.
+
+        Args:
+            content: User message content (string or content blocks)
+            system: Static instructions, sent as the system prompt
+            max_tokens: Output token limit
+            label: Name the call is recorded under in stats()
+
+        Returns:
+            str: Text response
+        """
+        request = self._build_request(content, system, max_tokens)
+        deadline = time.monotonic() + self.deadline_seconds
+        attempt = 0
+
+        while True:
+            client = self._get_client()
+            try:
+                with self._slot(deadline):
+                    started = time.perf_counter()
+                    message = client.messages.create(**request, timeout=_remaining(deadline))
+            except Exception as e:
+                self._before_retry(e, attempt, deadline)
+                attempt += 1
+                continue
+
+            self._record(label, started, message.usage, retries=attempt)
+            return message.content[0].text
+
+    def stream(self, content, system=None, max_tokens=4096, label='call'):
+        """
+        Send one message and yield the response text as it arrives.
+
+        Failures before the first text arrives are retried like create();
+        once text has been yielded, errors are raised to the caller.
+
+        Args:
+            content: User message content (string or content blocks)
+            system: Static instructions, sent as the system prompt
+            max_tokens: Output token limit
+            label: Name the call is recorded under in stats()
+
+        Yields:
+            str: Text deltas
+        """
+        request = self._build_request(content, system, max_tokens)
+        deadline = time.monotonic() + self.deadline_seconds
+        attempt = 0
+
+        while True:
+            client = self._get_client()
+            first_token = None
+            try:
+                with self._slot(deadline):
+                    started = time.perf_counter()
+                    with client.messages.stream(**request, timeout=_remaining(deadline)) as stream:
+                        for text in stream.text_stream:
+                            if first_token is None:
+                                first_token = time.perf_counter() - started
+                            yield text
+                        usage = stream.get_final_message().usage
+            except Exception as e:
+                if first_token is not None:
+                    raise
+                self._before_retry(e, attempt, deadline)
+                attempt += 1
+                continue
+
+            self._record(label, started, usage, first_token, retries=attempt)
+            return
+
+    async def acreate(self, content, system=None, max_tokens=4096, label='call'):
+        """
+        Like create(), but awaitable on an event loop.
+
+        Waiting for the limiter and the response does not hold a thread, so
+        up to async_max_concurrency calls share the event loop's thread.
+
+        Args:
+            content: User message content (string or content blocks)
+            system: Static instructions, sent as the system prompt
+            max_tokens: Output token limit
+            label: Name the call is recorded under in stats()
+
+        Returns:
+            str: Text response
+        """
+        request = self._build_request(content, system, max_tokens)
+        deadline = time.monotonic() + self.deadline_seconds
+        attempt = 0
+
+        while True:
+            client = self._get_async_client()
+            try:
+                async with self._async_slot(deadline):
+                    started = time.perf_counter()
+                    message = await client.messages.create(**request, timeout=_remaining(deadline))
+            except Exception as e:
+                await asyncio.sleep(self._retry_delay(e, attempt, deadline))
+                attempt += 1
+                continue
+
+            self._record(label, started, message.usage, retries=attempt)
+            return message.content[0].text
+
+    async def astream(self, content, system=None, max_tokens=4096, label='call'):
+        """
+        Like stream(), but an async generator for use on an event loop.
+
+        Args:
+            content: User message content (string or content blocks)
+            system: Static instructions, sent as the system prompt
+            max_tokens: Output token limit
+            label: Name the call is recorded under in stats()
+
+        Yields:
+            str: Text deltas
+        """
+        request = self._build_request(content, system, max_tokens)
+        deadline = time.monotonic() + self.deadline_seconds
+        attempt = 0
+
+        while True:
+            client = self._get_async_client()
+            first_token = None
+            try:
+                async with self._async_slot(deadline):
+                    started = time.perf_counter()
+                    async with client.messages.stream(**request, timeout=_remaining(deadline)) as stream:
+                        async for text in stream.text_stream:
+                            if first_token is None:
+                                first_token = time.perf_counter() - started
+                            yield text
+                        usage = (await stream.get_final_message()).usage
+            except Exception as e:
+                if first_token is not None:
+                    raise
+                await asyncio.sleep(self._retry_delay(e, attempt, deadline))
+                attempt += 1
+                continue
+
+            self._record(label, started, usage, first_token, retries=attempt)
+            return
+
+    @contextmanager
+    def _slot(self, deadline):
+        """Wait for the rate limiter and a concurrency slot, then hold the slot."""
+        queued = time.perf_counter()
+        with self._lock:
+            self._waiting += 1
+            slots = self._slots
+            bucket = self._bucket
+
+        try:
+            if bucket is not None:
+                bucket.acquire(deadline)
+            if not slots.acquire(timeout=_remaining(deadline)):
+                raise DeadlineExceededError("Timed out waiting for a free Claude request slot")
+        except DeadlineExceededError:
+            with self._lock:
+                self._waiting -= 1
+                self._limiter['deadline_exceeded'] += 1
+            raise
+
+        waited = time.perf_counter() - queued
+        LLM_WAIT_SECONDS.observe(waited)
+        with self._lock:
+            self._waiting -= 1
+            self._in_flight += 1
+            self._waits.append(waited)
+
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            slots.release()
+
+    @asynccontextmanager
+    async def _async_slot(self, deadline):
+        """Like _slot(), but waits on the event loop for an async slot."""
+        queued = time.perf_counter()
+        with self._lock:
+            self._waiting += 1
+            slots = self._async_slots
+            bucket = self._bucket
+
+        try:
+            if bucket is not None:
+                await bucket.acquire_async(deadline)
+            try:
+                await asyncio.wait_for(slots.acquire(), timeout=_remaining(deadline))
+            except asyncio.TimeoutError:
+                raise DeadlineExceededError("Timed out waiting for a free Claude request slot")
+        except DeadlineExceededError:
+            with self._lock:
+                self._waiting -= 1
+                self._limiter['deadline_exceeded'] += 1
+            raise
+
+        waited = time.perf_counter() - queued
+        LLM_WAIT_SECONDS.observe(waited)
+        with self._lock:
+            self._waiting -= 1
+            self._in_flight += 1
+            self._waits.append(waited)
+
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            slots.release()
+
+    def _before_retry(self, error, attempt, deadline):
+        """
+        Sleep before retrying a failed call, or re-raise if it should not be retried.
+
+        Args:
+            error: Exception raised by the call
+            attempt: Retries already made
+            deadline: time.monotonic() value the call must finish by
+        """
+        time.sleep(self._retry_delay(error, attempt, deadline))
+
+    def _retry_delay(self, error, attempt, deadline):
+        """
+        Get the backoff before retrying a failed call, or re-raise if it should not be retried.
+
+        Args:
+            error: Exception raised by the call
+            attempt: Retries already made
+            deadline: time.monotonic() value the call must finish by
+
+        Returns:
+            float: Seconds to wait before the next attempt
+        """
+        # Errors raised before the SDK was ever loaded cannot be API errors
+        anthropic = sys.modules.get('anthropic')
+        if anthropic is None:
+            raise error
+        APIConnectionError, APIStatusError = anthropic.APIConnectionError, anthropic.APIStatusError
+
+        if isinstance(error, APIStatusError):
+            if error.status_code not in RETRY_STATUS_CODES:
+                raise error
+        elif not isinstance(error, APIConnectionError):
+            raise error
+
+        if attempt >= self.max_retries:
+            raise error
+
+        # Full jitter, but never sooner than the server asked for
+        delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+
+        if time.monotonic() + delay >= deadline:
+            with self._lock:
+                self._limiter['deadline_exceeded'] += 1
+            raise DeadlineExceededError(
+                f"Claude call did not succeed within {self.deadline_seconds}s: {error}"
+            ) from error
+
+        LLM_RETRIES.inc(reason=error.status_code if isinstance(error, APIStatusError) else 'connection')
+        with self._lock:
+            self._limiter['retries'] += 1
+            if isinstance(error, APIStatusError):
+                self._limiter['throttled'] += 1
+
+        return delay
+
+    def _build_request(self, content, system, max_tokens):
+        """Assemble message parameters and check them against the context window."""
+        estimated = estimate_tokens(content) + estimate_tokens(system or '')
+        if estimated + max_tokens > self.context_window:
+            raise ValueError(
+                f"Request too large for the model: about {estimated} input tokens "
+                f"plus {max_tokens} output tokens exceeds {self.context_window}"
+            )
+
+        system_tokens = estimate_tokens(system) if system else 0
+        request = {
+            "model": self.model,
+            "max_tokens": max_tokens,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": _cacheable_breakpoints(content, system_tokens)
+                }
+            ]
+        }
+
+        if system:
+            # The instructions are too short to cache on their own; they are cached as
+            # part of the prefix when a content block (e.g. the knowledge) is a breakpoint
+            request["system"] = system
+
+        return request
+
+    def _record(self, label, started, usage, first_token=None, retries=0):
+        """Add one call's latency and token usage to the stats."""
+        latency = time.perf_counter() - started
+        cache_read = getattr(usage, 'cache_read_input_tokens', None) or 0
+        cache_write = getattr(usage, 'cache_creation_input_tokens', None) or 0
+
+        LLM_SECONDS.observe(latency, label=label)
+        LLM_TOKENS.inc(usage.input_tokens or 0, label=label, kind='input')
+        LLM_TOKENS.inc(usage.output_tokens or 0, label=label, kind='output')
+        LLM_TOKENS.inc(cache_read, label=label, kind='cache_read')
+        LLM_TOKENS.inc(cache_write, label=label, kind='cache_write')
+
+        with self._lock:
+            stats = self._stats.setdefault(label, {
+                'calls': 0,
+                'retried_calls': 0,
+                'input_tokens': 0,
+                'output_tokens': 0,
+                'cache_read_tokens': 0,
+                'cache_write_tokens': 0,
+                'latencies': deque(maxlen=self.history),
+                'first_token': deque(maxlen=self.history)
+            })
+            stats['calls'] += 1
+            stats['retried_calls'] += 1 if retries else 0
+            stats['input_tokens'] += usage.input_tokens or 0
+            stats['output_tokens'] += usage.output_tokens or 0
+            stats['cache_read_tokens'] += cache_read
+            stats['cache_write_tokens'] += cache_write
+            stats['latencies'].append(latency)
+            if first_token is not None:
+                stats['first_token'].append(first_token)
+
+    def stats(self):
+        """
+        Get per-label call counters and limiter state.
+
+        Returns:
+            dict: Calls, token totals and recent latency percentiles per label,
+                plus queue depth, wait times and retry counts under 'limiter'
+        """
+        with self._lock:
+            report = {}
+            for label, stats in self._stats.items():
+                cached = stats['cache_read_tokens']
+                prompt_tokens = stats['input_tokens'] + cached + stats['cache_write_tokens']
+                report[label] = {
+                    'calls': stats['calls'],
+                    'retried_calls': stats['retried_calls'],
+                    'input_tokens': stats['input_tokens'],
+                    'output_tokens': stats['output_tokens'],
+                    'cache_read_tokens': cached,
+                    'cache_write_tokens': stats['cache_write_tokens'],
+                    'cache_hit_rate': round(cached / prompt_tokens, 3) if prompt_tokens else 0,
+                    'latency_p50': _percentile(stats['latencies'], 0.5),
+                    'latency_p95': _percentile(stats['latencies'], 0.95),
+                    'first_token_p50': _percentile(stats['first_token'], 0.5)
+                }
+
+            report['limiter'] = dict(
+                self._limiter,
+                queue_depth=self._waiting,
+                in_flight=self._in_flight,
+                max_concurrency=self.max_concurrency,
+                async_max_concurrency=self.async_max_concurrency,
+                requests_per_minute=self.requests_per_minute,
+                wait_p50=_percentile(self._waits, 0.5),
+                wait_p95=_percentile(self._waits, 0.95)
+            )
+            return report
+
+
+class _TokenBucket:
+    """Thread-safe token bucket allowing short bursts above the average rate."""
+
+    def __init__(self, requests_per_minute, burst_seconds=10):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline):
+        """Take one token, waiting for a refill until the deadline."""
+        while True:
+            wait = self._take(deadline)
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, deadline):
+        """Like acquire(), but waits without blocking the event loop."""
+        while True:
+            wait = self._take(deadline)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def _take(self, deadline):
+        """Take a token if one is left, otherwise return the seconds until the next refill."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            wait = (1 - self.tokens) / self.rate
+
+        if now + wait >= deadline:
+            raise DeadlineExceededError("Timed out waiting for the Claude request rate limit")
+        return wait
+
+
+def get_llm_client(backend=None, **kwargs):
+    """
+    Get the process-wide LLMClient, creating it on first use.
+
+    Args:
+        backend: 'anthropic' or 'fake' (default: LLM_BACKEND environment variable)
+        **kwargs: LLMClient settings, used only by the first call
+
+    Returns:
+        LLMClient: Shared client
+    """
+    global _shared_client
+
+    with _shared_lock:
+        if _shared_client is None:
+            backend = backend or os.getenv('LLM_BACKEND', 'anthropic')
+            if backend == 'fake':
+                from utils.fake_llm import FakeLLMClient
+                _shared_client = FakeLLMClient(**kwargs)
+            elif backend == 'anthropic':
+                _shared_client = LLMClient(**kwargs)
+            else:
+                raise ValueError(f"Unknown LLM backend: {backend}")
+        return _shared_client
+
+
+def estimate_tokens(content):
+    """
+    Estimate input tokens for message content without calling the API.
+
+    Args:
+        content: String or list of content blocks
+
+    Returns:
+        int: Approximate token count
+    """
+    if isinstance(content, str):
+        return len(content) // CHARS_PER_TOKEN + 1
+
+    tokens = 0
+    for block in content:
+        if block.get('type') == 'image':
+            tokens += IMAGE_TOKENS
+        elif block.get('type') == 'text':
+            tokens += len(block['text']) // CHARS_PER_TOKEN + 1
+    return tokens
+
+
+def quiz_max_tokens(num_questions):
+    """
+    Output token limit for a quiz of num_questions questions.
+
+    Args:
+        num_questions: Questions requested
+
+    Returns:
+        int: max_tokens value
+    """
+    return min(MAX_OUTPUT_TOKENS, max(1024, 256 + num_questions * TOKENS_PER_QUESTION))
+
+
+def cached_text(text):
+    """Text content block marked as a prompt-cache breakpoint."""
+    return {"type": "text", "text": text, "cache_control": CACHE_CONTROL}
+
+
+def _cacheable_breakpoints(content, prefix_tokens):
+    """
+    Drop cache breakpoints whose prompt prefix is too short to be cached.
+
+    Args:
+        content: String or list of content blocks
+        prefix_tokens: Estimated tokens sent before the content (system prompt)
+
+    Returns:
+        Content with breakpoints kept only where the prefix reaches MIN_CACHEABLE_TOKENS
+    """
+    if isinstance(content, str):
+        return content
+
+    blocks = []
+    for block in content:
+        prefix_tokens += estimate_tokens([block])
+        if 'cache_control' in block and prefix_tokens < MIN_CACHEABLE_TOKENS:
+            block = {key: value for key, value in block.items() if key != 'cache_control'}
+        blocks.append(block)
+    return blocks
+
+
+def _import_httpx():
+    """The httpx module the SDK uses, or None if it cannot be found."""
+    try:
+        import httpx
+    except ImportError:
+        httpx = None
+    return httpx
+
+
+def _remaining(deadline):
+    """Seconds left before a deadline, raising once it has passed."""
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceededError("Claude call deadline exceeded")
+    return remaining
+
+
+def _retry_after(error):
+    """Seconds from a Retry-After header, if the error response has one."""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+def _percentile(values, fraction):
+    """Percentile of recent values, in seconds."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 3)
@@ -0,0 +1,59 @@
+import fcntl
+import threading
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+
+class StripedFileLock:
+    """
+    Cross-process locks for arbitrary keys.
+
+    Keys are hashed onto a fixed set of lock files, so the lock directory
+    never grows. Each stripe is guarded by a thread lock plus an flock on
+    its file, and holding is reentrant within a thread so nested holds on
+    keys that share a stripe cannot deadlock.
+    """
+
+    def __init__(self, lock_dir='data/locks', stripes=64):
+        """
+        Initialize lock set.
+
+        Args:
+            lock_dir: Directory holding the lock files
+            stripes: Number of lock files keys are spread across
+        """
+        self.lock_dir = Path(lock_dir)
+        self.stripes = stripes
+        self._thread_locks = [threading.Lock() for _ in range(stripes)]
+        self._local = threading.local()
+
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+
+    @contextmanager
+    def hold(self, key):
+        """
+        Hold the lock for a key across threads and processes.
+
+        Args:
+            key: Lock key (e.g. a session ID)
+        """
+        stripe = zlib.crc32(key.encode('utf-8')) % self.stripes
+        held = self._local.__dict__.setdefault('held', {})
+
+        if stripe in held:
+            held[stripe] += 1
+            try:
+                yield
+            finally:
+                held[stripe] -= 1
+            return
+
+        with self._thread_locks[stripe]:
+            with open(self.lock_dir / f'stripe-{stripe}.lock', 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                held[stripe] = 1
+                try:
+                    yield
+                finally:
+                    del held[stripe]
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -0,0 +1,69 @@
+import contextvars
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+
+# Request ID of the HTTP request (or the job it queued) being handled
+request_id_var = contextvars.ContextVar('request_id', default=None)
+
+# Attributes every LogRecord has; anything else was passed with extra= and is logged as a field
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+class JsonFormatter(logging.Formatter):
+    """Format log records as one JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': request_id_var.get(),
+            'pid': record.process,
+            'thread': record.threadName
+        }
+
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(log_dir='logs', level='INFO', max_bytes=10 * 1024 * 1024, backups=5):
+    """
+    Send application logs to logs/webquiz.jsonl as structured JSON.
+
+    Warnings and errors are also written to stderr.
+
+    Args:
+        log_dir: Directory for the log file
+        level: Minimum level written to the file
+        max_bytes: Size at which the log file is rotated
+        backups: Rotated files kept
+    """
+    os.makedirs(log_dir, exist_ok=True)
+
+    file_handler = RotatingFileHandler(
+        os.path.join(log_dir, 'webquiz.jsonl'), maxBytes=max_bytes, backupCount=backups
+    )
+    file_handler.setFormatter(JsonFormatter())
+    file_handler.setLevel(level)
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(JsonFormatter())
+    console_handler.setLevel(logging.WARNING)
+
+    root = logging.getLogger()
+    # Replace handlers from an earlier call instead of logging everything twice
+    for handler in list(root.handlers):
+        if isinstance(handler.formatter, JsonFormatter):
+            root.removeHandler(handler)
+    root.addHandler(file_handler)
+    root.addHandler(console_handler)
+    root.setLevel(level)
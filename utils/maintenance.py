@@ -0,0 +1,251 @@
+import logging
+import os
+import threading
+import time
+
+from utils.db import SQLiteDatabase
+from utils.metrics import REGISTRY
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS expiry (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    due_at REAL NOT NULL,
+    PRIMARY KEY (kind, key)
+);
+CREATE INDEX IF NOT EXISTS idx_expiry_due ON expiry (due_at);
+
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+logger = logging.getLogger(__name__)
+
+RECLAIMED = REGISTRY.counter(
+    'webquiz_maintenance_reclaimed_total', 'Expired items deleted by the maintenance scheduler', ('kind',)
+)
+RECLAIMED_BYTES = REGISTRY.counter(
+    'webquiz_maintenance_reclaimed_bytes_total', 'Disk space freed by the maintenance scheduler', ('kind',)
+)
+MAINTENANCE_ERRORS = REGISTRY.counter(
+    'webquiz_maintenance_errors_total', 'Maintenance tasks that raised an exception', ('kind',)
+)
+
+class Postpone:
+    """Expiry handler result: the item is still in use, check it again at due_at."""
+
+    def __init__(self, due_at):
+        self.due_at = due_at
+
+
+class MaintenanceScheduler:
+    """
+    Background expiry of sessions, uploads and cache entries.
+
+    Items are scheduled in an SQLite index ordered by due time, so each
+    pass only reads the items that are due instead of scanning
+    directories. Every pass handles at most batch_size items, which keeps
+    the I/O of a large backlog spread out. Due items are leased before
+    they are handled, so several server processes can share one index
+    without handling an item twice, and items claimed by a process that
+    dies are retried once the lease runs out.
+    """
+
+    def __init__(self, db_path='data/maintenance.db', interval=60, batch_size=200, lease_seconds=300):
+        """
+        Initialize maintenance scheduler.
+
+        Args:
+            db_path: Path to the SQLite expiry index
+            interval: Seconds between passes
+            batch_size: Maximum due items handled per pass
+            lease_seconds: Seconds a claimed item is hidden from other processes
+        """
+        self.db = SQLiteDatabase(db_path, SCHEMA)
+        self.interval = interval
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+
+        self._handlers = {}
+        self._periodic = {}
+        self._backfills = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._thread_pid = None
+        self._stop = threading.Event()
+
+    def register(self, kind, handler, backfill=None):
+        """
+        Set how expired items of a kind are deleted.
+
+        Args:
+            kind: Item type (e.g. 'upload')
+            handler: Callable taking the item key and returning the bytes it
+                freed, None if the item was already gone, or Postpone(due_at)
+                to keep it until then
+            backfill: Optional callable yielding (key, due_at) for items that
+                existed before they were scheduled; run once per index
+        """
+        self._handlers[kind] = handler
+        if backfill:
+            self._backfills[kind] = backfill
+
+    def register_periodic(self, kind, func):
+        """
+        Run a task on every pass (e.g. cache eviction that has its own index).
+
+        Args:
+            kind: Name the reclaimed count is exported under
+            func: Callable returning the number of items it deleted
+        """
+        self._periodic[kind] = func
+
+    def schedule(self, kind, key, due_at):
+        """
+        Schedule an item for expiry, replacing any earlier due time.
+
+        Args:
+            kind: Registered item type
+            key: Item key (e.g. session ID or file path)
+            due_at: Unix timestamp after which the item is expired
+        """
+        self.db.execute(
+            'INSERT OR REPLACE INTO expiry (kind, key, due_at) VALUES (?, ?, ?)',
+            (kind, key, due_at)
+        )
+
+    def ensure_started(self):
+        """Start the background thread in this process if it is not running."""
+        # Started lazily so forked server workers each run their own
+        if self._thread_pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._thread_pid != os.getpid():
+                self._stop = threading.Event()
+                self._thread = threading.Thread(
+                    target=self._loop, name='maintenance', daemon=True
+                )
+                self._thread_pid = os.getpid()
+                self._thread.start()
+
+    def close(self):
+        """Stop the background thread after its current pass."""
+        self._stop.set()
+
+    def _loop(self):
+        """Background thread: run passes until stopped."""
+        try:
+            self.backfill()
+        except Exception:
+            logger.exception("Maintenance backfill failed")
+
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Maintenance pass failed")
+
+    def backfill(self):
+        """
+        Schedule items that predate the index, once per index database.
+
+        Returns:
+            int: Number of items scheduled
+        """
+        total = 0
+
+        for kind, backfill in self._backfills.items():
+            with self.db.transaction() as conn:
+                # Claim the backfill so only one process runs it
+                claimed = conn.execute(
+                    'INSERT OR IGNORE INTO meta (name, value) VALUES (?, ?)',
+                    (f'backfill:{kind}', str(time.time()))
+                ).rowcount
+            if not claimed:
+                continue
+
+            scheduled = 0
+            with self.db.transaction() as conn:
+                for key, due_at in backfill():
+                    conn.execute(
+                        'INSERT OR IGNORE INTO expiry (kind, key, due_at) VALUES (?, ?, ?)',
+                        (kind, key, due_at)
+                    )
+                    scheduled += 1
+
+            logger.info("Scheduled %d existing %s items for expiry", scheduled, kind)
+            total += scheduled
+
+        return total
+
+    def run_once(self, now=None):
+        """
+        Handle the items that are due, up to batch_size, and run periodic tasks.
+
+        Args:
+            now: Current Unix time (default: time.time())
+
+        Returns:
+            dict: Items reclaimed per kind in this pass
+        """
+        now = time.time() if now is None else now
+        reclaimed = {}
+
+        for kind, key in self._claim(now):
+            handler = self._handlers.get(kind)
+            if handler is None:
+                self.db.execute('DELETE FROM expiry WHERE kind = ? AND key = ?', (kind, key))
+                continue
+
+            try:
+                result = handler(key)
+            except Exception:
+                # Leave the lease in place so the item is retried later
+                MAINTENANCE_ERRORS.inc(kind=kind)
+                logger.exception("Expiring %s %s failed", kind, key)
+                continue
+
+            if isinstance(result, Postpone):
+                self.db.execute(
+                    'UPDATE expiry SET due_at = ? WHERE kind = ? AND key = ?', (result.due_at, kind, key)
+                )
+                continue
+
+            self.db.execute('DELETE FROM expiry WHERE kind = ? AND key = ?', (kind, key))
+            if result is not None:
+                RECLAIMED.inc(kind=kind)
+                RECLAIMED_BYTES.inc(result, kind=kind)
+                reclaimed[kind] = reclaimed.get(kind, 0) + 1
+
+        for kind, func in self._periodic.items():
+            try:
+                removed = func()
+            except Exception:
+                MAINTENANCE_ERRORS.inc(kind=kind)
+                logger.exception("Maintenance task %s failed", kind)
+                continue
+            if removed:
+                RECLAIMED.inc(removed, kind=kind)
+                reclaimed[kind] = reclaimed.get(kind, 0) + removed
+
+        if reclaimed:
+            logger.info("Maintenance reclaimed %s", reclaimed, extra={'reclaimed': reclaimed})
+
+        return reclaimed
+
+    def _claim(self, now):
+        """Lease up to batch_size due items to this process."""
+        with self.db.transaction() as conn:
+            rows = conn.execute(
+                'SELECT kind, key FROM expiry WHERE due_at <= ? ORDER BY due_at LIMIT ?',
+                (now, self.batch_size)
+            ).fetchall()
+            conn.executemany(
+                'UPDATE expiry SET due_at = ? WHERE kind = ? AND key = ?',
+                [(now + self.lease_seconds, row['kind'], row['key']) for row in rows]
+            )
+
+        return [(row['kind'], row['key']) for row in rows]
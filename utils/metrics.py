@@ -0,0 +1,182 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; covers sub-millisecond cache hits up to multi-minute Claude extractions
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+class Counter:
+    """Monotonic counter with labels."""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        """Add amount to the series for labels."""
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def observe(self, value, **labels):
+        """Record one observation for labels."""
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][index] += 1
+                    break
+            series['sum'] += value
+            series['count'] += 1
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, series in self._values.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets, series['counts']):
+                    cumulative += count
+                    samples.append((f'{self.name}_bucket', key + (('le', _format(bound)),), cumulative))
+                samples.append((f'{self.name}_bucket', key + (('le', '+Inf'),), series['count']))
+                samples.append((f'{self.name}_sum', key, series['sum']))
+                samples.append((f'{self.name}_count', key, series['count']))
+        return samples
+
+
+class Gauge:
+    """Gauge read from a callback when metrics are collected."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, callback):
+        self.name = name
+        self.help_text = help_text
+        self.callback = callback
+
+    def samples(self):
+        return [(self.name, (), self.callback())]
+
+
+class Registry:
+    """Collection of metrics rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def register(self, metric):
+        """
+        Add a metric, or return the one already registered under its name.
+
+        Args:
+            metric: Counter, Histogram or Gauge
+
+        Returns:
+            The registered metric
+        """
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help_text, labelnames=()):
+        return self.register(Counter(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help_text, labelnames, buckets))
+
+    def gauge(self, name, help_text, callback):
+        return self.register(Gauge(name, help_text, callback))
+
+    def render(self):
+        """
+        Render every metric for a /metrics scrape.
+
+        Returns:
+            str: Prometheus text exposition format
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines = []
+        for metric in metrics:
+            try:
+                samples = metric.samples()
+            except Exception:
+                # A failing gauge callback must not break the whole scrape
+                continue
+
+            lines.append(f'# HELP {metric.name} {metric.help_text}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in samples:
+                label_text = ','.join(f'{key}="{_escape(val)}"' for key, val in labels)
+                lines.append(f'{name}{{{label_text}}} {_format(value)}' if label_text
+                             else f'{name} {_format(value)}')
+
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'webquiz_stage_seconds', 'Time spent in each processing stage', ('stage',)
+)
+STAGE_ERRORS = REGISTRY.counter(
+    'webquiz_stage_errors_total', 'Processing stages that raised an exception', ('stage',)
+)
+
+@contextmanager
+def stage(name):
+    """
+    Time a processing stage into webquiz_stage_seconds.
+
+    Args:
+        name: Stage name (e.g. 'pdf_render')
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=name)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=name)
+
+
+def _label_key(labelnames, labels):
+    """Ordered label tuple for a series."""
+    return tuple((name, str(labels.get(name, ''))) for name in labelnames)
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format(value):
+    if isinstance(value, float):
+        return repr(value) if not value.is_integer() else str(int(value))
+    return str(value)
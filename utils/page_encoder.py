@@ -0,0 +1,185 @@
+import base64
+import io
+import math
+
+# Claude downsamples anything with a longer edge than this, so larger pages only cost bytes
+DEFAULT_MAX_LONG_EDGE = 1568
+DEFAULT_MAX_PIXELS = 1_150_000
+
+MEDIA_TYPES = {
+    'PNG': 'image/png',
+    'JPEG': 'image/jpeg',
+    'WEBP': 'image/webp'
+}
+
+class PageEncoder:
+    """Pick a compact image encoding for each rendered PDF page."""
+
+    def __init__(self, max_long_edge=DEFAULT_MAX_LONG_EDGE, max_pixels=DEFAULT_MAX_PIXELS,
+                 max_bytes=400 * 1024, image_format='auto', quality=85, min_quality=40,
+                 text_pages=False, text_min_chars=200):
+        """
+        Initialize page encoder.
+
+        Args:
+            max_long_edge: Longest allowed image edge in pixels
+            max_pixels: Largest allowed image area in pixels
+            max_bytes: Target encoded size per page
+            image_format: 'auto', 'png', 'jpeg' or 'webp'
+            quality: Starting quality for lossy formats
+            min_quality: Lowest quality tried before downscaling further
+            text_pages: Send text-only pages as extracted text instead of images
+            text_min_chars: Minimum extracted characters for a page to go as text
+
+        Raises:
+            ValueError: If image_format is not one of the supported formats
+        """
+        if image_format.upper() != 'AUTO' and image_format.upper() not in MEDIA_TYPES:
+            raise ValueError(f"Unknown page image format: {image_format}")
+
+        self.max_long_edge = max_long_edge
+        self.max_pixels = max_pixels
+        self.max_bytes = max_bytes
+        self.image_format = image_format.upper()
+        self.quality = quality
+        self.min_quality = min_quality
+        self.text_pages = text_pages
+        self.text_min_chars = text_min_chars
+
+    def encode(self, image, page_text=None):
+        """
+        Encode a page as a Claude content block.
+
+        Args:
+            image: PIL Image of the rendered page
+            page_text: Text extracted from the page, if available
+
+        Returns:
+            dict: Content block plus format and byte counts
+        """
+        raw_bytes = image.width * image.height * len(image.getbands())
+        profile = _profile(image)
+
+        if (self.text_pages and page_text and profile['text_like']
+                and len(page_text.strip()) >= self.text_min_chars):
+            text = page_text.strip()
+            return {
+                'block': {'type': 'text', 'text': text},
+                'format': 'text',
+                'raw_bytes': raw_bytes,
+                'encoded_bytes': len(text.encode('utf-8'))
+            }
+
+        image = self._prepare(image, profile)
+        image_format = self._choose_format(profile)
+
+        data = self._encode_within_budget(image, image_format)
+
+        return {
+            'block': {
+                'type': 'image',
+                'source': {
+                    'type': 'base64',
+                    'media_type': MEDIA_TYPES[image_format],
+                    'data': base64.b64encode(data).decode('utf-8')
+                }
+            },
+            'format': image_format.lower(),
+            'raw_bytes': raw_bytes,
+            'encoded_bytes': len(data)
+        }
+
+    def _prepare(self, image, profile):
+        """Convert to grayscale when colorless and downscale to the pixel budget."""
+        from PIL import Image
+
+        if profile['grayscale']:
+            image = image.convert('L')
+        elif image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+        scale = min(
+            1.0,
+            self.max_long_edge / max(image.width, image.height),
+            math.sqrt(self.max_pixels / (image.width * image.height))
+        )
+        if scale < 1.0:
+            size = (max(1, int(image.width * scale)), max(1, int(image.height * scale)))
+            image = image.resize(size, Image.LANCZOS, reducing_gap=2.0)
+
+        return image
+
+    def _choose_format(self, profile):
+        """Lossless for text and line art, lossy for photographic content."""
+        if self.image_format != 'AUTO':
+            return self.image_format
+        return 'PNG' if profile['few_colors'] else 'JPEG'
+
+    def _encode_within_budget(self, image, image_format):
+        """Lower quality, then resolution, until the page fits max_bytes."""
+        from PIL import Image
+
+        quality = self.quality
+
+        while True:
+            data = _save(image, image_format, quality)
+            if len(data) <= self.max_bytes or min(image.size) <= 256:
+                return data
+
+            if image_format != 'PNG' and quality > self.min_quality:
+                quality = max(self.min_quality, quality - 15)
+                continue
+
+            image = image.resize(
+                (int(image.width * 0.8), int(image.height * 0.8)), Image.LANCZOS
+            )
+
+
+def _save(image, image_format, quality):
+    """Encode an image in the given format."""
+    buffered = io.BytesIO()
+    if image_format == 'PNG':
+        image.save(buffered, format='PNG', optimize=False, compress_level=6)
+    elif image_format == 'JPEG':
+        image.save(buffered, format='JPEG', quality=quality, optimize=True)
+    else:
+        image.save(buffered, format=image_format, quality=quality, method=4)
+    return buffered.getvalue()
+
+
+def _profile(image):
+    """
+    Classify a page from a small thumbnail.
+
+    Args:
+        image: PIL Image of the rendered page
+
+    Returns:
+        dict: grayscale, few_colors and text_like flags
+    """
+    from PIL import Image, ImageStat
+
+    scale = 128 / max(image.width, image.height)
+    thumb = image.resize(
+        (max(1, int(image.width * scale)), max(1, int(image.height * scale))), Image.BOX
+    ).convert('RGB')
+
+    saturation = thumb.convert('HSV').getchannel('S')
+    grayscale = ImageStat.Stat(saturation).mean[0] < 8 and saturation.getextrema()[1] < 48
+
+    # Text pages are almost entirely near-white paper and near-black ink
+    histogram = thumb.convert('L').histogram()
+    extremes = sum(histogram[:64]) + sum(histogram[192:])
+    text_like = grayscale and extremes / (thumb.width * thumb.height) >= 0.97
+
+    # Line art and slides keep a small palette even after antialiasing; photos do not
+    if grayscale:
+        few_colors = text_like
+    else:
+        few_colors = thumb.getcolors(1024) is not None
+
+    return {
+        'grayscale': grayscale,
+        'few_colors': few_colors,
+        'text_like': text_like
+    }
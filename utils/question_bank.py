@@ -0,0 +1,199 @@
+import hashlib
+import json
+import random
+import time
+
+from utils.db import SQLiteDatabase
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pools (
+    knowledge_hash TEXT PRIMARY KEY,
+    document_name TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS questions (
+    knowledge_hash TEXT NOT NULL,
+    qid TEXT NOT NULL,
+    type TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (knowledge_hash, qid)
+);
+CREATE INDEX IF NOT EXISTS idx_questions_pool ON questions (knowledge_hash, type);
+"""
+
+class QuestionBank:
+    """Reusable store of generated questions, grouped by the knowledge they test."""
+
+    def __init__(self, db_path='data/question_bank.db'):
+        """
+        Initialize question bank.
+
+        Args:
+            db_path: Path to the SQLite question bank
+        """
+        self.db = SQLiteDatabase(db_path, SCHEMA)
+
+    @staticmethod
+    def knowledge_hash(knowledge):
+        """
+        Hash extracted knowledge text.
+
+        Args:
+            knowledge: Extracted knowledge text
+
+        Returns:
+            str: Hex SHA-256 digest
+        """
+        return hashlib.sha256(knowledge.strip().encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def question_id(question):
+        """
+        Stable ID for a question, shared by questions with the same wording.
+
+        Args:
+            question: Quiz question dict
+
+        Returns:
+            str: Short hex digest
+        """
+        text = ' '.join(question['question'].lower().split())
+        return hashlib.sha256(f"{question['type']}|{text}".encode('utf-8')).hexdigest()[:16]
+
+    def add_questions(self, knowledge, questions, document_name=None):
+        """
+        Store questions in the pool for a piece of knowledge.
+
+        Questions whose wording is already in the bank are skipped.
+
+        Args:
+            knowledge: Knowledge text the questions were generated from
+            questions: List of quiz questions
+            document_name: Name of the source document
+
+        Returns:
+            int: Number of new questions stored
+        """
+        knowledge_hash = self.knowledge_hash(knowledge)
+        now = time.time()
+        added = 0
+
+        with self.db.transaction() as conn:
+            conn.execute(
+                'INSERT INTO pools (knowledge_hash, document_name, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (knowledge_hash) DO UPDATE SET updated_at = excluded.updated_at',
+                (knowledge_hash, document_name, now, now)
+            )
+
+            for question in questions:
+                cursor = conn.execute(
+                    'INSERT OR IGNORE INTO questions (knowledge_hash, qid, type, payload, created_at) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (knowledge_hash, self.question_id(question), question['type'],
+                     json.dumps(question), now)
+                )
+                added += cursor.rowcount
+
+        return added
+
+    def get_questions(self, knowledge_hash):
+        """
+        Get every stored question for a piece of knowledge.
+
+        Args:
+            knowledge_hash: Hash from knowledge_hash
+
+        Returns:
+            list: Quiz questions, each with its bank 'qid'
+        """
+        rows = self.db.execute(
+            'SELECT qid, payload FROM questions WHERE knowledge_hash = ? ORDER BY created_at',
+            (knowledge_hash,)
+        ).fetchall()
+
+        return [dict(json.loads(row['payload']), qid=row['qid']) for row in rows]
+
+    def pool_size(self, knowledge_hash):
+        """
+        Count the questions stored for a piece of knowledge.
+
+        Args:
+            knowledge_hash: Hash from knowledge_hash
+
+        Returns:
+            int: Number of questions in the pool
+        """
+        return self.db.execute(
+            'SELECT COUNT(*) FROM questions WHERE knowledge_hash = ?', (knowledge_hash,)
+        ).fetchone()[0]
+
+    def sample(self, knowledge_hash, num_questions, multiple_choice_share=0.6):
+        """
+        Draw a random quiz from a pool.
+
+        The quiz is balanced between multiple-choice and fill-blank questions
+        (falling back to the other type when one runs short), contains each
+        question once, and is shuffled and numbered from 1.
+
+        Args:
+            knowledge_hash: Hash from knowledge_hash
+            num_questions: Number of questions wanted
+            multiple_choice_share: Fraction of multiple-choice questions
+
+        Returns:
+            list: Quiz questions, or None if the pool holds fewer than num_questions
+        """
+        num_multiple_choice = round(num_questions * multiple_choice_share)
+        picked = {
+            'multiple_choice': self._sample_type(knowledge_hash, 'multiple_choice', num_multiple_choice),
+            'fill_blank': self._sample_type(knowledge_hash, 'fill_blank', num_questions - num_multiple_choice)
+        }
+
+        # Top up from whichever type has questions left over
+        for question_type in picked:
+            shortfall = num_questions - len(picked['multiple_choice']) - len(picked['fill_blank'])
+            if shortfall > 0:
+                exclude = [question['qid'] for question in picked[question_type]]
+                picked[question_type] += self._sample_type(
+                    knowledge_hash, question_type, shortfall, exclude
+                )
+
+        questions = picked['multiple_choice'] + picked['fill_blank']
+        if len(questions) < num_questions:
+            return None
+
+        random.shuffle(questions)
+        for number, question in enumerate(questions, 1):
+            question['id'] = number
+
+        return questions
+
+    def _sample_type(self, knowledge_hash, question_type, limit, exclude=()):
+        """Randomly pick up to limit questions of one type."""
+        if limit <= 0:
+            return []
+
+        placeholders = ','.join('?' * len(exclude))
+        rows = self.db.execute(
+            'SELECT qid, payload FROM questions WHERE knowledge_hash = ? AND type = ? '
+            f'AND qid NOT IN ({placeholders}) ORDER BY RANDOM() LIMIT ?',
+            (knowledge_hash, question_type, *exclude, limit)
+        ).fetchall()
+
+        return [dict(json.loads(row['payload']), qid=row['qid']) for row in rows]
+
+    def stats(self):
+        """
+        Get bank size.
+
+        Returns:
+            dict: Number of pools and questions
+        """
+        pools = self.db.execute('SELECT COUNT(*) FROM pools').fetchone()[0]
+        questions = self.db.execute('SELECT COUNT(*) FROM questions').fetchone()[0]
+
+        return {'pools': pools, 'questions': questions}
@@ -1,35 +1,19 @@
+import asyncio
 import os
 import json
-from anthropic import Anthropic
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from utils.llm_client import cached_text, get_llm_client, quiz_max_tokens
+from utils.metrics import stage
 
 load_dotenv()
 
-class QuizGenerator:
-    """Generate quiz questions from extracted knowledge using Claude."""
-
-    def __init__(self):
-        """Initialize Anthropic client."""
-        api_key = os.getenv('ANTHROPIC_API_KEY')
-        if not api_key:
-            raise ValueError("ANTHROPIC_API_KEY not found in environment variables")
-        self.client = Anthropic(api_key=api_key)
-
-    def generate_quiz(self, knowledge, num_questions=10):
-        """
-        Generate quiz questions from extracted knowledge.
-
-        Args:
-            knowledge: Extracted knowledge text from document
-            num_questions: Number of questions to generate
+logger = logging.getLogger(__name__)
 
-        Returns:
-            list: Quiz questions in structured format
-        """
-        prompt = f"""Based on the following extracted knowledge, create {num_questions} quiz questions.
-
-KNOWLEDGE:
-{knowledge}
+# Sent as the system prompt of every quiz generation call
+QUIZ_SYSTEM = """You write quiz questions from extracted study knowledge.
 
 REQUIREMENTS:
 - Mix multiple-choice (60%) and fill-in-blank (40%) questions
@@ -40,52 +24,543 @@ REQUIREMENTS:
 - Include brief explanations for correct answers
 
 Return ONLY valid JSON in this exact format:
-{{
+{
   "questions": [
-    {{
+    {
       "id": 1,
       "type": "multiple_choice",
       "question": "What is the main function of chloroplasts?",
       "options": ["Photosynthesis", "Respiration", "Protein synthesis", "Cell division"],
       "correct_answer": "Photosynthesis",
       "explanation": "Chloroplasts are the organelles where photosynthesis occurs in plant cells."
-    }},
-    {{
+    },
+    {
       "id": 2,
       "type": "fill_blank",
       "question": "The process by which plants convert sunlight into energy is called ___",
       "correct_answer": "photosynthesis",
       "acceptable_answers": ["photosynthesis", "Photosynthesis"],
       "explanation": "Photosynthesis is the process plants use to convert light energy into chemical energy."
-    }}
+    }
   ]
-}}
+}"""
+
+class QuizGenerator:
+    """Generate quiz questions from extracted knowledge using Claude."""
+
+    def __init__(self, llm=None, bank=None, pool_size=40, pool_min=20, pool_batch=20):
+        """
+        Initialize quiz generator.
+
+        With a question bank, quizzes are sampled from a stored pool of
+        questions for the same knowledge whenever the pool is big enough,
+        and the pool is topped up in the background when it runs low.
+
+        Args:
+            llm: LLMClient to use (default: the process-wide client)
+            bank: Optional QuestionBank to serve and store question pools
+            pool_size: Questions a pool is topped up to
+            pool_min: Pools smaller than this are topped up
+            pool_batch: Questions generated per Claude call while topping up
+        """
+        self.llm = llm or get_llm_client()
+        self.bank = bank
+        self.pool_size = pool_size
+        self.pool_min = pool_min
+        self.pool_batch = pool_batch
+        self._refill_lock = threading.Lock()
+        self._claimed = set()
+        self._claimed_pid = None
+        self._refill_executor = None
+        self._refill_pid = None
+
+    def _build_prompt(self, knowledge, num_questions):
+        """
+        Build the quiz request content.
+
+        The knowledge block is a cache breakpoint, so repeated requests for
+        the same knowledge (e.g. pool top-ups) reuse the cached prefix.
+        """
+        return [
+            cached_text(f"KNOWLEDGE:\n{knowledge}"),
+            {
+                "type": "text",
+                "text": f"Based on the knowledge above, create exactly {num_questions} quiz questions following the required format."
+            }
+        ]
+
+    def generate_quiz(self, knowledge, num_questions=10):
+        """
+        Generate quiz questions from extracted knowledge.
+
+        Args:
+            knowledge: Extracted knowledge text from document
+            num_questions: Number of questions to generate
 
-Generate exactly {num_questions} questions following this format."""
+        Returns:
+            list: Quiz questions in structured format
+        """
+        prompt = self._build_prompt(knowledge, num_questions)
 
         # Call Claude API
-        message = self.client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=8192,
-            messages=[
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ]
+        response_text = self.llm.create(
+            prompt, system=QUIZ_SYSTEM, max_tokens=quiz_max_tokens(num_questions), label='quiz'
+        )
+
+        return _parse_quiz(response_text)
+
+    def generate_quiz_stream(self, knowledge, num_questions=10, document_name=None):
+        """
+        Generate quiz questions, yielding each one as soon as it is complete.
+
+        With a question bank, a pool holding enough questions answers the
+        request locally; otherwise questions are streamed from Claude and
+        added to the pool afterwards.
+
+        Args:
+            knowledge: Extracted knowledge text from document
+            num_questions: Number of questions to generate
+            document_name: Name of the source document, stored with the pool
+
+        Yields:
+            dict: Quiz question in structured format
+        """
+        if self.bank is None:
+            yield from self._stream_questions(knowledge, num_questions)
+            return
+
+        questions = self.sample_quiz(knowledge, num_questions, document_name)
+        if questions is not None:
+            yield from questions
+            return
+
+        # Keep a prewarm or top-up from generating the same questions alongside this stream
+        knowledge_hash = self.bank.knowledge_hash(knowledge)
+        claimed = self._claim_pool(knowledge_hash)
+        try:
+            generated = []
+            for question in self._stream_questions(knowledge, num_questions):
+                generated.append(question)
+                yield question
+
+            self.bank.add_questions(knowledge, generated, document_name=document_name)
+        finally:
+            if claimed:
+                self._release_pool(knowledge_hash)
+
+        self._schedule_refill(knowledge, document_name)
+
+    def sample_quiz(self, knowledge, num_questions, document_name=None):
+        """
+        Sample a quiz from the question bank pool for this knowledge.
+
+        Args:
+            knowledge: Extracted knowledge text from document
+            num_questions: Number of questions wanted
+            document_name: Name of the source document, stored with the pool
+
+        Returns:
+            list: Quiz questions, or None if the pool is too small
+        """
+        questions, low = self._sample_pool(knowledge, num_questions)
+        # Without a sample the caller generates the quiz and tops up the pool afterwards
+        if low and questions is not None:
+            self._schedule_refill(knowledge, document_name)
+
+        return questions
+
+    def _sample_pool(self, knowledge, num_questions):
+        """
+        Sample questions from the pool without scheduling a top-up.
+
+        Returns:
+            tuple: (questions or None, whether the pool is below pool_min)
+        """
+        knowledge_hash = self.bank.knowledge_hash(knowledge)
+        with stage('quiz_pool_sample'):
+            questions = self.bank.sample(knowledge_hash, num_questions)
+
+        return questions, self.bank.pool_size(knowledge_hash) < self.pool_min
+
+    def prewarm(self, knowledge, document_name=None):
+        """
+        Start filling the pool for freshly extracted knowledge.
+
+        Called as soon as extraction finishes, so by the time the user asks
+        for a quiz it can usually be sampled instead of generated. Nothing
+        is started when the pool is already full or a generation for the
+        same knowledge is running.
+
+        Args:
+            knowledge: Extracted knowledge text from document
+            document_name: Name of the source document, stored with the pool
+        """
+        if self.bank is not None:
+            self._schedule_refill(knowledge, document_name)
+
+    def fill_pool(self, knowledge, document_name=None):
+        """
+        Generate questions until the pool for this knowledge reaches pool_size.
+
+        Stops early when a round adds nothing new, so a document that keeps
+        producing the same questions does not loop.
+
+        Args:
+            knowledge: Extracted knowledge text from document
+            document_name: Name of the source document, stored with the pool
+
+        Returns:
+            int: Number of questions added
+        """
+        knowledge_hash = self.bank.knowledge_hash(knowledge)
+        added = 0
+
+        while True:
+            missing = self.pool_size - self.bank.pool_size(knowledge_hash)
+            if missing <= 0:
+                break
+
+            questions = self.generate_quiz(knowledge, min(missing, self.pool_batch))
+            new = self.bank.add_questions(knowledge, questions, document_name=document_name)
+            added += new
+            if not new:
+                break
+
+        return added
+
+    def _schedule_refill(self, knowledge, document_name):
+        """Top up a pool in the background, once at a time per pool."""
+        knowledge_hash = self.bank.knowledge_hash(knowledge)
+
+        if self.bank.pool_size(knowledge_hash) >= self.pool_size:
+            return
+        if not self._claim_pool(knowledge_hash):
+            return
+
+        with self._refill_lock:
+            # Create the executor lazily so forked server workers each get their own
+            if self._refill_executor is None or self._refill_pid != os.getpid():
+                self._refill_executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix='webquiz-pool'
+                )
+                self._refill_pid = os.getpid()
+            executor = self._refill_executor
+
+        executor.submit(self._refill, knowledge_hash, knowledge, document_name)
+
+    def _refill(self, knowledge_hash, knowledge, document_name):
+        """Background task: fill a pool and report failures."""
+        try:
+            self.fill_pool(knowledge, document_name)
+        except Exception:
+            logger.exception("Question pool top-up failed for %s", knowledge_hash)
+        finally:
+            self._release_pool(knowledge_hash)
+
+    def _claim_pool(self, knowledge_hash):
+        """
+        Mark a pool as being generated for or topped up in this process.
+
+        Returns:
+            bool: False if a generation or top-up for the pool is already running
+        """
+        with self._refill_lock:
+            if self._claimed_pid != os.getpid():
+                self._claimed = set()
+                self._claimed_pid = os.getpid()
+            if knowledge_hash in self._claimed:
+                return False
+            self._claimed.add(knowledge_hash)
+            return True
+
+    def _release_pool(self, knowledge_hash):
+        """Clear the mark set by _claim_pool()."""
+        with self._refill_lock:
+            self._claimed.discard(knowledge_hash)
+
+    def _stream_questions(self, knowledge, num_questions):
+        """Stream freshly generated questions from Claude."""
+        prompt = self._build_prompt(knowledge, num_questions)
+        parser = QuestionStreamParser()
+
+        for text in self.llm.stream(prompt, system=QUIZ_SYSTEM,
+                                    max_tokens=quiz_max_tokens(num_questions), label='quiz_stream'):
+            yield from parser.feed(text)
+
+        if not parser.found_array:
+            raise ValueError("No JSON found in Claude response")
+
+
+class AsyncQuizGenerator:
+    """
+    Async counterpart of QuizGenerator, calling Claude through AsyncAnthropic.
+
+    Wraps a QuizGenerator for its settings, question bank and prompts.
+    Question bank reads and writes run in the loop's executor, and pool
+    top-ups run as tasks on the loop instead of on a refill thread; both
+    generators share one record of the pools being topped up.
+    """
+
+    def __init__(self, generator, loop):
+        """
+        Initialize async quiz generator.
+
+        Args:
+            generator: QuizGenerator providing the client, bank and pool settings
+            loop: BackgroundLoop running the pool top-ups
+        """
+        self.generator = generator
+        self.loop = loop
+
+    @property
+    def llm(self):
+        """LLMClient shared with the wrapped generator."""
+        return self.generator.llm
+
+    @property
+    def bank(self):
+        """QuestionBank shared with the wrapped generator."""
+        return self.generator.bank
+
+    async def generate_quiz(self, knowledge, num_questions=10):
+        """
+        Generate quiz questions from extracted knowledge.
+
+        Args:
+            knowledge: Extracted knowledge text from document
+            num_questions: Number of questions to generate
+
+        Returns:
+            list: Quiz questions in structured format
+        """
+        prompt = self.generator._build_prompt(knowledge, num_questions)
+
+        response_text = await self.llm.acreate(
+            prompt, system=QUIZ_SYSTEM, max_tokens=quiz_max_tokens(num_questions), label='quiz'
         )
 
-        # Extract and parse JSON response
-        response_text = message.content[0].text
+        return _parse_quiz(response_text)
+
+    async def generate_quiz_stream(self, knowledge, num_questions=10, document_name=None):
+        """
+        Generate quiz questions, yielding each one as soon as it is complete.
+
+        Args:
+            knowledge: Extracted knowledge text from document
+            num_questions: Number of questions to generate
+            document_name: Name of the source document, stored with the pool
+
+        Yields:
+            dict: Quiz question in structured format
+        """
+        if self.bank is None:
+            async for question in self._stream_questions(knowledge, num_questions):
+                yield question
+            return
+
+        questions = await self.sample_quiz(knowledge, num_questions, document_name)
+        if questions is not None:
+            for question in questions:
+                yield question
+            return
+
+        # Keep a prewarm or top-up from generating the same questions alongside this stream
+        knowledge_hash = self.bank.knowledge_hash(knowledge)
+        claimed = self.generator._claim_pool(knowledge_hash)
+        try:
+            generated = []
+            async for question in self._stream_questions(knowledge, num_questions):
+                generated.append(question)
+                yield question
+
+            await asyncio.to_thread(self.bank.add_questions, knowledge, generated, document_name=document_name)
+        finally:
+            if claimed:
+                self.generator._release_pool(knowledge_hash)
 
-        # Find JSON in response (handle cases where Claude adds explanation)
-        json_start = response_text.find('{')
-        json_end = response_text.rfind('}') + 1
+        self._schedule_refill(knowledge, document_name)
 
-        if json_start == -1 or json_end == 0:
+    async def sample_quiz(self, knowledge, num_questions, document_name=None):
+        """
+        Sample a quiz from the question bank pool for this knowledge.
+
+        Args:
+            knowledge: Extracted knowledge text from document
+            num_questions: Number of questions wanted
+            document_name: Name of the source document, stored with the pool
+
+        Returns:
+            list: Quiz questions, or None if the pool is too small
+        """
+        questions, low = await asyncio.to_thread(self.generator._sample_pool, knowledge, num_questions)
+        if low and questions is not None:
+            self._schedule_refill(knowledge, document_name)
+
+        return questions
+
+    def prewarm(self, knowledge, document_name=None):
+        """
+        Start filling the pool for freshly extracted knowledge.
+
+        Args:
+            knowledge: Extracted knowledge text from document
+            document_name: Name of the source document, stored with the pool
+        """
+        if self.bank is not None:
+            self._schedule_refill(knowledge, document_name)
+
+    async def fill_pool(self, knowledge, document_name=None):
+        """
+        Generate questions until the pool for this knowledge reaches pool_size.
+
+        Args:
+            knowledge: Extracted knowledge text from document
+            document_name: Name of the source document, stored with the pool
+
+        Returns:
+            int: Number of questions added
+        """
+        knowledge_hash = self.bank.knowledge_hash(knowledge)
+        added = 0
+
+        while True:
+            missing = self.generator.pool_size - await asyncio.to_thread(self.bank.pool_size, knowledge_hash)
+            if missing <= 0:
+                break
+
+            questions = await self.generate_quiz(knowledge, min(missing, self.generator.pool_batch))
+            new = await asyncio.to_thread(
+                self.bank.add_questions, knowledge, questions, document_name=document_name
+            )
+            added += new
+            if not new:
+                break
+
+        return added
+
+    def _schedule_refill(self, knowledge, document_name):
+        """Top up a pool with a task on the loop, once at a time per pool; safe from any thread."""
+        knowledge_hash = self.bank.knowledge_hash(knowledge)
+
+        # fill_pool returns right away when the pool is already full
+        if self.generator._claim_pool(knowledge_hash):
+            self.loop.submit(self._refill(knowledge_hash, knowledge, document_name))
+
+    async def _refill(self, knowledge_hash, knowledge, document_name):
+        """Background task: fill a pool and report failures."""
+        try:
+            await self.fill_pool(knowledge, document_name)
+        except Exception:
+            logger.exception("Question pool top-up failed for %s", knowledge_hash)
+        finally:
+            self.generator._release_pool(knowledge_hash)
+
+    async def _stream_questions(self, knowledge, num_questions):
+        """Stream freshly generated questions from Claude."""
+        prompt = self.generator._build_prompt(knowledge, num_questions)
+        parser = QuestionStreamParser()
+
+        async for text in self.llm.astream(prompt, system=QUIZ_SYSTEM,
+                                           max_tokens=quiz_max_tokens(num_questions), label='quiz_stream'):
+            for question in parser.feed(text):
+                yield question
+
+        if not parser.found_array:
             raise ValueError("No JSON found in Claude response")
 
-        json_str = response_text[json_start:json_end]
+
+class QuestionStreamParser:
+    """Incrementally pull complete objects out of a streamed {"questions": [...]} document."""
+
+    def __init__(self):
+        """Initialize parser state."""
+        self.buffer = ''
+        self.found_array = False
+        self.done = False
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._object_start = None
+
+    def feed(self, text):
+        """
+        Consume the next chunk of streamed text.
+
+        Args:
+            text: Text delta from the stream
+
+        Returns:
+            list: Questions completed by this chunk
+        """
+        questions = []
+        if self.done:
+            return questions
+
+        self.buffer += text
+
+        if not self.found_array:
+            key = self.buffer.find('"questions"')
+            if key == -1:
+                return questions
+            start = self.buffer.find('[', key)
+            if start == -1:
+                return questions
+            self.found_array = True
+            self._pos = start + 1
+
+        while self._pos < len(self.buffer):
+            char = self.buffer[self._pos]
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == '{':
+                if self._depth == 0:
+                    self._object_start = self._pos
+                self._depth += 1
+            elif char == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    questions.append(json.loads(self.buffer[self._object_start:self._pos + 1]))
+                    # Drop consumed text so the buffer stays small
+                    self.buffer = self.buffer[self._pos + 1:]
+                    self._pos = -1
+            elif char == ']' and self._depth == 0:
+                self.done = True
+                self.buffer = ''
+                break
+
+            self._pos += 1
+
+        return questions
+
+
+def _parse_quiz(response_text):
+    """
+    Pull the questions out of a complete quiz response.
+
+    Args:
+        response_text: Claude's response, JSON possibly surrounded by prose
+
+    Returns:
+        list: Quiz questions
+    """
+    # Find JSON in response (handle cases where Claude adds explanation)
+    json_start = response_text.find('{')
+    json_end = response_text.rfind('}') + 1
+
+    if json_start == -1 or json_end == 0:
+        raise ValueError("No JSON found in Claude response")
+
+    json_str = response_text[json_start:json_end]
+    with stage('quiz_parse'):
         quiz_data = json.loads(json_str)
 
-        return quiz_data['questions']
+    return quiz_data['questions']
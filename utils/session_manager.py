@@ -1,22 +1,214 @@
-import json
+import atexit
 import os
+import threading
+import time
 import uuid
-from datetime import datetime, timedelta
-from pathlib import Path
+from collections import OrderedDict
+from datetime import datetime
+
+from utils.locks import StripedFileLock
+from utils.metrics import stage
+from utils.storage import JSONFileStorage
+
+# Latest scores kept per document for the trend
+RECENT_SCORES = 10
 
 class SessionManager:
     """Manage quiz sessions and history."""
 
-    def __init__(self, sessions_dir='data/sessions', history_dir='data/history'):
-        """Initialize session manager."""
-        self.sessions_dir = Path(sessions_dir)
-        self.history_dir = Path(history_dir)
+    def __init__(self, sessions_dir='data/sessions', history_dir='data/history',
+                 cache_size=256, flush_interval=2.0, storage=None, write_behind=True,
+                 lock_dir='data/locks'):
+        """
+        Initialize session manager.
+
+        Sessions are served from an in-memory LRU cache. With write_behind,
+        changes are marked dirty and written to storage in batches by a
+        background flusher every flush_interval seconds, and once more at
+        interpreter shutdown. Without it (multi-process deployments), every
+        change is written through under a cross-process session lock and
+        cached sessions are revalidated against the stored version on read.
+
+        Args:
+            sessions_dir: Directory for session files (JSON backend)
+            history_dir: Directory for user history files (JSON backend)
+            cache_size: Maximum sessions kept in memory
+            flush_interval: Seconds between write-behind flushes
+            storage: Storage backend (default: JSONFileStorage)
+            write_behind: Batch writes in this process instead of writing through
+            lock_dir: Directory for cross-process session lock files
+        """
+        self.storage = storage or JSONFileStorage(sessions_dir, history_dir)
+        self.cache_size = cache_size
+        self.flush_interval = flush_interval
+        self.write_behind = write_behind
+        self.locks = StripedFileLock(lock_dir)
+        # Separate stripes so session and history locks never collide, which
+        # keeps the session -> history lock order deadlock free
+        self.history_locks = StripedFileLock(os.path.join(lock_dir, 'history'))
+        self._lock = threading.RLock()
+        self._io_lock = threading.Lock()
+
+        self._cache = OrderedDict()
+        self._versions = {}
+        # session_id -> {'fields': set or None for new sessions, 'answers': [records]}
+        self._dirty = {}
+        self._flusher = None
+        self._flusher_pid = None
+        self._stop = threading.Event()
+
+        atexit.register(self.close)
+
+    def _load(self, session_id):
+        """
+        Get the cached session dict, reading it from storage on a miss.
+
+        Without write-behind, the cached copy is only used while its stored
+        version is unchanged, so writes from other processes are seen.
+        Must be called with the lock held.
+        """
+        session = self._cache.get(session_id)
+
+        if self.write_behind:
+            if session is not None:
+                self._cache.move_to_end(session_id)
+                return session
+        else:
+            version = self.storage.session_version(session_id)
+            if version is None:
+                self._cache.pop(session_id, None)
+                self._versions.pop(session_id, None)
+                return None
+            if session is not None and self._versions.get(session_id) == version:
+                self._cache.move_to_end(session_id)
+                return session
+            self._versions[session_id] = version
+
+        with stage('session_load'):
+            session = self.storage.load_session(session_id)
+        if session is None:
+            return None
+
+        self._cache_put(session_id, session)
+        return session
+
+    def _cache_put(self, session_id, session):
+        """Insert into the LRU cache, writing out evicted dirty sessions. Lock must be held."""
+        self._cache[session_id] = session
+        self._cache.move_to_end(session_id)
 
-        # Ensure directories exist
-        self.sessions_dir.mkdir(parents=True, exist_ok=True)
-        self.history_dir.mkdir(parents=True, exist_ok=True)
+        while len(self._cache) > self.cache_size:
+            evicted_id, evicted = self._cache.popitem(last=False)
+            self._versions.pop(evicted_id, None)
+            changes = self._dirty.pop(evicted_id, None)
+            if changes:
+                self.storage.save_session(evicted, changes['fields'], changes['answers'])
 
-    def create_session(self, user_id, document_name, questions):
+    def _mark_dirty(self, session_id, fields=(), answers=()):
+        """
+        Queue a session change for the next flush. Lock must be held.
+
+        Args:
+            session_id: Session UUID
+            fields: Names of changed session fields
+            answers: Newly appended answer records
+        """
+        changes = self._dirty.setdefault(session_id, {'fields': set(), 'answers': []})
+        if changes['fields'] is not None:
+            changes['fields'].update(fields)
+            changes['answers'].extend(answers)
+
+        # Start the flusher lazily so forked server workers each run their own
+        if self._flusher is None or self._flusher_pid != os.getpid():
+            self._flusher = threading.Thread(
+                target=self._flush_loop, name='session-flusher', daemon=True
+            )
+            self._flusher_pid = os.getpid()
+            self._flusher.start()
+
+    def _modify(self, session_id, change):
+        """
+        Apply a change to a session under its cross-process lock.
+
+        Args:
+            session_id: Session UUID
+            change: Callable taking the session dict, mutating it in place and
+                returning (changed fields, new answers, result)
+
+        Returns:
+            Result returned by change
+        """
+        with self.locks.hold(session_id):
+            with self._lock:
+                session = self._load(session_id)
+                if not session:
+                    raise ValueError(f"Session {session_id} not found")
+
+                fields, answers, result = change(session)
+
+                if not fields and not answers:
+                    return result
+
+                if self.write_behind:
+                    self._mark_dirty(session_id, fields=fields, answers=answers)
+                    return result
+
+                snapshot = dict(session, user_answers=list(session['user_answers']))
+
+            # Write through while still holding the session lock
+            with stage('session_write'):
+                self.storage.save_session(snapshot, fields, answers)
+            with self._lock:
+                self._versions[session_id] = self.storage.session_version(session_id)
+
+            return result
+
+    def _flush_loop(self):
+        """Background thread: flush dirty sessions periodically."""
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """
+        Write all dirty sessions to storage.
+
+        Returns:
+            int: Number of sessions written
+        """
+        # Snapshot under the cache lock, but write outside it so readers never wait on disk
+        with self._io_lock:
+            with self._lock:
+                pending = []
+                for session_id, changes in self._dirty.items():
+                    session = self._cache.get(session_id)
+                    if session is not None:
+                        snapshot = dict(session, user_answers=list(session['user_answers']))
+                        pending.append((snapshot, changes))
+                self._dirty = {}
+
+            if pending:
+                with stage('session_flush'):
+                    for session, changes in pending:
+                        self.storage.save_session(session, changes['fields'], changes['answers'])
+
+        return len(pending)
+
+    def close(self):
+        """Stop the background flusher and write any pending changes."""
+        self._stop.set()
+        self.flush()
+
+    def stats(self):
+        """
+        Get cache counters.
+
+        Returns:
+            dict: Cached and dirty (not yet flushed) session counts
+        """
+        with self._lock:
+            return {'cached': len(self._cache), 'dirty': len(self._dirty)}
+
+    def create_session(self, user_id, document_name, questions, expected_questions=None):
         """
         Create a new quiz session.
 
@@ -24,6 +216,8 @@ class SessionManager:
             user_id: Browser-generated user UUID
             document_name: Name of uploaded document
             questions: List of quiz questions
+            expected_questions: Set when questions are still being generated;
+                they are added later with append_questions
 
         Returns:
             str: Session ID
@@ -39,13 +233,23 @@ class SessionManager:
             'user_answers': [],
             'current_question': 0,
             'correct_count': 0,
-            'start_time': datetime.utcnow().isoformat() + 'Z'
+            'start_time': datetime.utcnow().isoformat() + 'Z',
+            'generation_status': 'generating' if expected_questions else 'complete',
+            'total_questions': expected_questions or len(questions)
         }
 
-        # Save session file
-        session_file = self.sessions_dir / f'session_{session_id}.json'
-        with open(session_file, 'w') as f:
-            json.dump(session_data, f, indent=2)
+        if not self.write_behind:
+            self.storage.save_session(session_data)
+
+        with self._lock:
+            self._cache_put(session_id, session_data)
+
+            if self.write_behind:
+                # A new session is written in full on the next flush
+                self._dirty[session_id] = {'fields': None, 'answers': []}
+                self._mark_dirty(session_id)
+            else:
+                self._versions[session_id] = self.storage.session_version(session_id)
 
         return session_id
 
@@ -59,13 +263,13 @@ class SessionManager:
         Returns:
             dict: Session data or None if not found
         """
-        session_file = self.sessions_dir / f'session_{session_id}.json'
+        with self._lock:
+            session = self._load(session_id)
+            if session is None:
+                return None
 
-        if not session_file.exists():
-            return None
-
-        with open(session_file, 'r') as f:
-            return json.load(f)
+            # Hand out a copy whose answer list cannot change the cached session
+            return dict(session, user_answers=list(session['user_answers']))
 
     def update_session(self, session_id, updates):
         """
@@ -75,26 +279,117 @@ class SessionManager:
             session_id: Session UUID
             updates: Dict of fields to update
         """
-        session = self.get_session(session_id)
-        if not session:
-            raise ValueError(f"Session {session_id} not found")
+        def change(session):
+            session.update(updates)
+            return list(updates.keys()), [], None
+
+        self._modify(session_id, change)
+
+    def record_answer(self, session_id, question_num, answer, is_correct):
+        """
+        Record an answer and update the score.
 
-        session.update(updates)
+        Submitting the same question twice is idempotent: the first recorded
+        answer is kept and returned, and the score is not counted again.
 
-        session_file = self.sessions_dir / f'session_{session_id}.json'
-        with open(session_file, 'w') as f:
-            json.dump(session, f, indent=2)
+        Args:
+            session_id: Session UUID
+            question_num: Index of the answered question
+            answer: Answer record for the results review
+            is_correct: Whether the answer was correct
+
+        Returns:
+            tuple: (updated session data, recorded answer)
+        """
+        session, recorded = self.record_answers(session_id, [(question_num, answer, is_correct)])
+        return session, recorded[0]
+
+    def record_answers(self, session_id, answers):
+        """
+        Record several answers with a single session update.
+
+        Args:
+            session_id: Session UUID
+            answers: List of (question_num, answer record, is_correct) tuples
+
+        Returns:
+            tuple: (updated session data, recorded answers in the given order)
+        """
+        def change(session):
+            existing = {item.get('question_num'): item for item in session['user_answers']}
+            new_answers = []
+            results = []
+
+            for question_num, answer, is_correct in answers:
+                if question_num in existing:
+                    results.append(existing[question_num])
+                    continue
+
+                recorded = dict(answer, question_num=question_num)
+                existing[question_num] = recorded
+                new_answers.append(recorded)
+                results.append(recorded)
+
+                session['user_answers'].append(recorded)
+                if is_correct:
+                    session['correct_count'] += 1
+                session['current_question'] = max(session['current_question'], question_num + 1)
+
+            if not new_answers:
+                return (), [], results
+            return ('correct_count', 'current_question'), new_answers, results
+
+        results = self._modify(session_id, change)
+        return self.get_session(session_id), results
+
+    def append_questions(self, session_id, questions):
+        """
+        Add newly generated questions to a session.
+
+        Args:
+            session_id: Session UUID
+            questions: List of quiz questions
+        """
+        def change(session):
+            session['questions'] = session['questions'] + questions
+            return ('questions',), [], None
+
+        self._modify(session_id, change)
+
+    def finish_generation(self, session_id, error=None):
+        """
+        Mark question generation for a session as finished.
+
+        Args:
+            session_id: Session UUID
+            error: Error message if generation failed
+        """
+        def change(session):
+            # Keep whatever was generated before a failure, if anything
+            if error and not session['questions']:
+                updates = {'generation_status': 'failed', 'generation_error': error}
+            else:
+                updates = {'generation_status': 'complete'}
+
+            updates['total_questions'] = len(session['questions'])
+            session.update(updates)
+            return list(updates.keys()), [], None
+
+        self._modify(session_id, change)
 
     def delete_session(self, session_id):
         """
-        Delete session file.
+        Delete session.
 
         Args:
             session_id: Session UUID
         """
-        session_file = self.sessions_dir / f'session_{session_id}.json'
-        if session_file.exists():
-            session_file.unlink()
+        # Hold the I/O lock so an in-progress flush cannot recreate the session
+        with self.locks.hold(session_id), self._io_lock, self._lock:
+            self._cache.pop(session_id, None)
+            self._versions.pop(session_id, None)
+            self._dirty.pop(session_id, None)
+            self.storage.delete_session(session_id)
 
     def save_to_history(self, session_id):
         """
@@ -103,16 +398,26 @@ class SessionManager:
         Args:
             session_id: Session UUID
         """
-        session = self.get_session(session_id)
-        if not session:
-            raise ValueError(f"Session {session_id} not found")
+        with self.locks.hold(session_id):
+            # Re-check under the lock so duplicate completions save only once
+            session = self.get_session(session_id)
+            if not session:
+                raise ValueError(f"Session {session_id} not found")
+
+            self._save_to_history(session)
 
+            # Delete session
+            self.delete_session(session_id)
+
+    def _save_to_history(self, session):
+        """Build the quiz record for a finished session and add it to history."""
+        session_id = session['session_id']
         user_id = session['user_id']
 
         # Calculate metrics
         total_questions = len(session['questions'])
         correct_answers = session['correct_count']
-        score_percentage = round((correct_answers / total_questions) * 100)
+        score_percentage = round((correct_answers / total_questions) * 100) if total_questions > 0 else 0
 
         # Calculate time taken
         start_time = datetime.fromisoformat(session['start_time'].replace('Z', ''))
@@ -131,60 +436,156 @@ class SessionManager:
             'questions_review': session['user_answers']
         }
 
-        # Load or create user history
-        history_file = self.history_dir / f'user_{user_id}_history.json'
+        # Keep only last 50 quizzes; aggregates cover every quiz ever completed
+        with self.history_locks.hold(user_id), stage('history_save'):
+            stats = self.storage.get_history_stats(user_id)
+            if stats is None:
+                stats = self._rebuild_stats(user_id)
+            self.storage.add_history(user_id, quiz_record, limit=50,
+                                     stats=update_stats(stats, quiz_record))
+
+    def _rebuild_stats(self, user_id):
+        """Aggregates for a history saved before they were tracked."""
+        stats = None
+        for quiz_record in reversed(self.storage.get_history(user_id)):
+            stats = update_stats(stats, quiz_record)
+        return stats
 
-        if history_file.exists():
-            with open(history_file, 'r') as f:
-                history = json.load(f)
-        else:
-            history = {'user_id': user_id, 'quizzes': []}
+    def get_user_history(self, user_id):
+        """
+        Get user's quiz history.
 
-        # Append quiz record
-        history['quizzes'].insert(0, quiz_record)  # Most recent first
+        Args:
+            user_id: Browser-generated user UUID
 
-        # Keep only last 50 quizzes
-        history['quizzes'] = history['quizzes'][:50]
+        Returns:
+            list: Quiz history or empty list
+        """
+        return self.storage.get_history(user_id)
+
+    def get_history_page(self, user_id, offset=0, limit=20, reviews=False):
+        """
+        Get one page of a user's history with their aggregates.
 
-        # Save history
-        with open(history_file, 'w') as f:
-            json.dump(history, f, indent=2)
+        Args:
+            user_id: Browser-generated user UUID
+            offset: Quizzes to skip
+            limit: Maximum quizzes returned
+            reviews: Include each quiz's questions_review
 
-        # Delete session
-        self.delete_session(session_id)
+        Returns:
+            dict: Quizzes (most recent first), total, offset, limit and stats
+        """
+        quizzes, total = self.storage.get_history_page(user_id, offset, limit, reviews)
+
+        return {
+            'quizzes': quizzes,
+            'total': total,
+            'offset': offset,
+            'limit': limit,
+            'stats': self.storage.get_history_stats(user_id) or update_stats(None)
+        }
 
-    def get_user_history(self, user_id):
+    def get_history_quiz(self, user_id, quiz_id):
         """
-        Get user's quiz history.
+        Get one completed quiz with the user's stats for its document.
 
         Args:
             user_id: Browser-generated user UUID
+            quiz_id: Quiz (session) UUID
 
         Returns:
-            list: Quiz history or empty list
+            dict: Full quiz record plus 'document_stats', or None if not found
         """
-        history_file = self.history_dir / f'user_{user_id}_history.json'
+        quiz_record = self.storage.get_history_quiz(user_id, quiz_id)
+        if quiz_record is None:
+            return None
+
+        stats = self.storage.get_history_stats(user_id) or {}
+        quiz_record['document_stats'] = stats.get('documents', {}).get(quiz_record['document_name'])
+        return quiz_record
+
+    def expire_session(self, session_id, max_idle_seconds):
+        """
+        Delete a session that has not been written for max_idle_seconds.
+
+        Args:
+            session_id: Session UUID
+            max_idle_seconds: Idle time after which the session is deleted
 
-        if not history_file.exists():
-            return []
+        Returns:
+            tuple: (deleted, time the session could next expire or None)
+        """
+        with self.locks.hold(session_id):
+            with self._lock:
+                if session_id in self._dirty:
+                    # Changed since the last flush, so in use right now
+                    return False, time.time() + max_idle_seconds
 
-        with open(history_file, 'r') as f:
-            history = json.load(f)
+            updated_at = self.storage.session_updated_at(session_id)
+            if updated_at is None:
+                return False, None
+            if updated_at > time.time() - max_idle_seconds:
+                return False, updated_at + max_idle_seconds
 
-        return history.get('quizzes', [])
+            self.delete_session(session_id)
+            return True, None
 
     def cleanup_old_sessions(self, hours=24):
         """
-        Delete session files older than specified hours.
+        Delete sessions not written for the specified hours.
 
         Args:
             hours: Age threshold in hours (default 24)
-        """
-        threshold = datetime.utcnow() - timedelta(hours=hours)
 
-        for session_file in self.sessions_dir.glob('session_*.json'):
-            # Check file modification time
-            mtime = datetime.fromtimestamp(session_file.stat().st_mtime)
-
-            if mtime < threshold:
-                session_file.unlink()
+        Returns:
+            int: Number of sessions deleted
+        """
+        # Make sure recent changes are stored before judging sessions by age
+        self.flush()
+
+        with self._io_lock:
+            expired = self.storage.expire_sessions(time.time() - hours * 3600)
+
+        with self._lock:
+            for session_id in expired:
+                self._cache.pop(session_id, None)
+
+        return len(expired)
+
+
+def update_stats(stats, quiz_record=None):
+    """
+    Fold one completed quiz into a user's history aggregates.
+
+    Args:
+        stats: Current aggregates, or None to start empty
+        quiz_record: Completed quiz record (None returns the empty aggregates)
+
+    Returns:
+        dict: Updated aggregates (the input is modified in place when given)
+    """
+    if stats is None:
+        stats = {'quizzes': 0, 'score_total': 0, 'average_score': None, 'best_score': None,
+                 'documents': {}}
+    if quiz_record is None:
+        return stats
+
+    score = quiz_record['score_percentage']
+    document = stats['documents'].setdefault(quiz_record['document_name'], {
+        'quizzes': 0, 'score_total': 0, 'average_score': None, 'best_score': None,
+        'last_score': None, 'recent_scores': [], 'trend': None
+    })
+
+    for totals in (stats, document):
+        totals['quizzes'] += 1
+        totals['score_total'] += score
+        totals['average_score'] = round(totals['score_total'] / totals['quizzes'])
+        totals['best_score'] = score if totals['best_score'] is None else max(totals['best_score'], score)
+
+    # Change since the previous attempt at the same document
+    document['trend'] = None if document['last_score'] is None else score - document['last_score']
+    document['last_score'] = score
+    document['recent_scores'] = (document['recent_scores'] + [score])[-RECENT_SCORES:]
+
+    return stats
@@ -0,0 +1,253 @@
+import hashlib
+import random
+from collections import deque
+
+# Share of the per-sheet budget kept from the start, middle and end of a sampled sheet
+HEAD_SHARE = 0.4
+MIDDLE_SHARE = 0.3
+TAIL_SHARE = 0.3
+
+def iter_workbook(file_path, file_extension):
+    """
+    Stream the sheets of a workbook without loading it into memory.
+
+    .xlsx files are read with openpyxl in read-only mode; .xls files need
+    the optional xlrd package.
+
+    Args:
+        file_path: Path to Excel file
+        file_extension: 'xlsx' or 'xls'
+
+    Yields:
+        tuple: (sheet name, iterator over row value tuples)
+    """
+    if file_extension == 'xls':
+        yield from _iter_xls(file_path)
+        return
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            yield sheet.title, sheet.iter_rows(values_only=True)
+    finally:
+        # Read-only workbooks keep the file open until closed
+        workbook.close()
+
+
+def _iter_xls(file_path):
+    """Stream the sheets of a legacy .xls workbook with xlrd."""
+    try:
+        import xlrd
+    except ImportError:
+        raise ValueError("Reading .xls files requires the xlrd package (pip install xlrd)")
+
+    workbook = xlrd.open_workbook(file_path, on_demand=True)
+    try:
+        for sheet_name in workbook.sheet_names():
+            sheet = workbook.sheet_by_name(sheet_name)
+            yield sheet_name, (
+                [_xls_value(cell, workbook.datemode, xlrd) for cell in sheet.row(index)]
+                for index in range(sheet.nrows)
+            )
+            workbook.unload_sheet(sheet_name)
+    finally:
+        workbook.release_resources()
+
+
+def _xls_value(cell, datemode, xlrd):
+    """Convert an xlrd cell to the value openpyxl would return."""
+    if cell.ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK, xlrd.XL_CELL_ERROR):
+        return None
+    if cell.ctype == xlrd.XL_CELL_DATE:
+        try:
+            return xlrd.xldate_as_datetime(cell.value, datemode)
+        except (ValueError, OverflowError, xlrd.xldate.XLDateError):
+            return cell.value
+    if cell.ctype == xlrd.XL_CELL_BOOLEAN:
+        return bool(cell.value)
+    if cell.ctype == xlrd.XL_CELL_NUMBER and cell.value.is_integer():
+        return int(cell.value)
+    return cell.value
+
+
+def read_sheet(name, rows, max_chars):
+    """
+    Read a sheet's rows into a bounded table.
+
+    Empty rows are skipped, repeated rows are kept once and trailing empty
+    columns are trimmed. When the sheet is larger than max_chars, only a
+    sample is kept: the first rows, an even random sample of the middle,
+    and the last rows, so memory stays bounded however long the sheet is.
+
+    Args:
+        name: Sheet name
+        rows: Iterator over row value tuples
+        max_chars: Approximate markdown budget for the sheet
+
+    Returns:
+        dict: Header, kept rows in sheet order, column count and row counts
+    """
+    header = None
+    width = 0
+    seen = set()
+    total_rows = 0
+    duplicate_rows = 0
+
+    kept = []
+    kept_chars = 0
+    sampling = False
+    head_chars = max_chars * HEAD_SHARE
+    tail_chars = max_chars * TAIL_SHARE
+    tail = deque()
+    tail_size = 0
+    reservoir = []
+    reservoir_size = 0
+    middle_seen = 0
+
+    def add_to_middle(row):
+        nonlocal middle_seen
+        # Reservoir sampling keeps a uniform sample of the middle rows
+        middle_seen += 1
+        if len(reservoir) < reservoir_size:
+            reservoir.append((middle_seen, row))
+        else:
+            slot = random.randrange(middle_seen)
+            if slot < reservoir_size:
+                reservoir[slot] = (middle_seen, row)
+
+    def add_to_tail(row):
+        nonlocal tail_size
+        tail.append(row)
+        tail_size += _row_chars(row)
+        while tail_size > tail_chars and len(tail) > 1:
+            dropped = tail.popleft()
+            tail_size -= _row_chars(dropped)
+            add_to_middle(dropped)
+
+    for values in rows:
+        row = _clean_row(values)
+        if not row:
+            continue
+
+        if header is None:
+            header = row
+            width = len(row)
+            continue
+
+        total_rows += 1
+        digest = hashlib.blake2b('\x1f'.join(row).encode('utf-8'), digest_size=8).digest()
+        if digest in seen:
+            duplicate_rows += 1
+            continue
+        seen.add(digest)
+        width = max(width, len(row))
+
+        if not sampling:
+            kept.append(row)
+            kept_chars += _row_chars(row)
+            if kept_chars <= max_chars:
+                continue
+
+            # Over budget: keep a head and push the rest through the sampler
+            sampling = True
+            split = 0
+            kept_chars = 0
+            while split < len(kept) and kept_chars + _row_chars(kept[split]) <= head_chars:
+                kept_chars += _row_chars(kept[split])
+                split += 1
+            kept, overflow = kept[:split], kept[split:]
+            average = max(1, kept_chars // max(1, len(kept)))
+            reservoir_size = max(1, int(max_chars * MIDDLE_SHARE // average))
+            for pending in overflow:
+                add_to_tail(pending)
+            continue
+
+        add_to_tail(row)
+
+    middle = [row for _, row in sorted(reservoir, key=lambda item: item[0])]
+    table_rows = kept + middle + list(tail)
+
+    return {
+        'name': name,
+        'header': header or [],
+        'rows': table_rows,
+        'width': width,
+        'total_rows': total_rows,
+        'duplicate_rows': duplicate_rows,
+        'omitted_rows': total_rows - duplicate_rows - len(table_rows)
+    }
+
+
+def sheet_chunks(sheet, chunk_chars):
+    """
+    Render a sheet as markdown tables of at most about chunk_chars each.
+
+    Every chunk repeats the header row, so chunks can be extracted
+    independently.
+
+    Args:
+        sheet: Table from read_sheet
+        chunk_chars: Approximate markdown size per chunk
+
+    Returns:
+        list: Markdown strings with a sheet heading
+    """
+    if not sheet['header']:
+        return []
+
+    width = sheet['width']
+    header_lines = [_markdown_row(sheet['header'], width), '| ' + ' | '.join(['---'] * width) + ' |']
+    header_size = sum(len(line) + 1 for line in header_lines)
+
+    groups = []
+    current = []
+    current_size = header_size
+    for row in sheet['rows']:
+        line = _markdown_row(row, width)
+        if current and current_size + len(line) + 1 > chunk_chars:
+            groups.append(current)
+            current = []
+            current_size = header_size
+        current.append(line)
+        current_size += len(line) + 1
+    groups.append(current)
+
+    notes = []
+    if sheet['omitted_rows']:
+        shown = len(sheet['rows'])
+        notes.append(f"_Showing {shown} of {shown + sheet['omitted_rows']} distinct rows: "
+                     f"the first rows, an even sample of the middle and the last rows._")
+    if sheet['duplicate_rows']:
+        notes.append(f"_{sheet['duplicate_rows']} repeated rows were removed._")
+
+    chunks = []
+    for index, lines in enumerate(groups):
+        heading = f"## Sheet: {sheet['name']}"
+        if len(groups) > 1:
+            heading += f" (part {index + 1} of {len(groups)})"
+
+        chunks.append('\n'.join([heading, ''] + notes + [''] * bool(notes) + header_lines + lines) + '\n')
+
+    return chunks
+
+
+def _clean_row(values):
+    """Convert cell values to strings and drop trailing empty cells."""
+    row = ['' if value is None else str(value).strip() for value in values]
+    while row and not row[-1]:
+        row.pop()
+    return row
+
+
+def _row_chars(row):
+    """Approximate markdown size of a row."""
+    return sum(len(cell) for cell in row) + 3 * len(row) + 2
+
+
+def _markdown_row(row, width):
+    """Render a row as a markdown table line padded to width."""
+    cells = [cell.replace('|', '\\|').replace('\n', ' ') for cell in row]
+    cells += [''] * (width - len(cells))
+    return '| ' + ' | '.join(cells) + ' |'
@@ -0,0 +1,166 @@
+"""
+Startup profile and warm-up helpers.
+
+    python -m utils.startup --budget-ms 1000
+
+imports app in a fresh interpreter with -X importtime, answers one /health
+request and runs the warm-up hook, then reports where the time went: import
+time per package (third-party packages include everything they import),
+time to the first /health response, and what the warm-up loaded. Exits with
+status 1 when import plus the first /health response exceed the budget.
+"""
+import argparse
+import importlib
+import json
+import os
+import subprocess
+import sys
+import time
+
+# Libraries imported on first use; the warm-up hook loads them ahead of time
+HEAVY_MODULES = ('anthropic', 'pdf2image', 'PIL.Image', 'openpyxl')
+
+FIRST_PARTY = {'app', 'utils'}
+
+PROBE = """
+import json, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+status = app.app.test_client().get('/health').status_code
+answered = time.perf_counter()
+warm_up = app.warm_up()
+print(json.dumps({'import': imported - started, 'first_health': answered - imported,
+                  'health_status': status, 'warm_up': warm_up}))
+"""
+
+def import_modules(modules=HEAVY_MODULES):
+    """
+    Import modules ahead of their first use.
+
+    Args:
+        modules: Module names
+
+    Returns:
+        dict: Seconds spent per module (0 when it was already loaded or is not installed)
+    """
+    timings = {}
+    for name in modules:
+        started = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+        timings[name] = round(time.perf_counter() - started, 3)
+    return timings
+
+def parse_importtime(lines):
+    """
+    Build the import tree from -X importtime output.
+
+    Args:
+        lines: stderr lines of the profiled interpreter
+
+    Returns:
+        list: Root nodes, each a dict with module, self_us, cumulative_us and children
+    """
+    # Modules are printed after the modules they import, indented two spaces per level
+    pending = {}
+    for line in lines:
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+
+        depth = (len(fields[2]) - len(fields[2].lstrip()) - 1) // 2
+        node = {
+            'module': fields[2].strip(),
+            'self_us': int(fields[0]),
+            'cumulative_us': int(fields[1]),
+            'children': pending.pop(depth + 1, [])
+        }
+        pending.setdefault(depth, []).append(node)
+
+    return pending.get(0, [])
+
+def package_times(roots):
+    """
+    Attribute import time to the packages app code imports.
+
+    First-party modules are listed individually; everything a third-party
+    package imports counts towards that package.
+
+    Args:
+        roots: Nodes from parse_importtime()
+
+    Returns:
+        dict: Name -> seconds, slowest first
+    """
+    totals = {}
+
+    def walk(node, owner):
+        package = node['module'].split('.')[0]
+        if owner is None:
+            owner = node['module'] if package in FIRST_PARTY else package
+        totals[owner] = totals.get(owner, 0) + node['self_us']
+
+        child_owner = None if package in FIRST_PARTY else owner
+        for child in node['children']:
+            walk(child, child_owner)
+
+    for root in roots:
+        walk(root, None)
+
+    return {name: us / 1e6 for name, us in sorted(totals.items(), key=lambda item: -item[1])}
+
+def profile(python=sys.executable):
+    """
+    Profile a cold start of the app in a fresh interpreter.
+
+    Args:
+        python: Interpreter to run
+
+    Returns:
+        dict: import, first_health and warm_up timings plus per-package import times
+    """
+    result = subprocess.run(
+        [python, '-X', 'importtime', '-c', PROBE],
+        capture_output=True, text=True, env=os.environ.copy()
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Startup probe failed:\n{result.stderr[-2000:]}")
+
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    # Only what `import app` loaded; interpreter startup and the warm-up are reported separately
+    roots = [root for root in parse_importtime(result.stderr.splitlines()) if root['module'] == 'app']
+    report['packages'] = package_times(roots)
+    return report
+
+
+def main():
+    """Command line entry point: profile startup and check it against a budget."""
+    parser = argparse.ArgumentParser(description='Report where WebQuiz startup time goes.')
+    parser.add_argument('--budget-ms', type=float, default=float(os.getenv('STARTUP_BUDGET_MS', '1000')),
+                        help='Fail when import plus the first /health response take longer')
+    parser.add_argument('--top', type=int, default=15, help='Packages to list')
+    args = parser.parse_args()
+
+    report = profile()
+    startup_ms = (report['import'] + report['first_health']) * 1000
+
+    print("Import time by package (-X importtime adds some overhead):")
+    for name, seconds in list(report['packages'].items())[:args.top]:
+        print(f"  {name:<32} {seconds * 1000:8.1f} ms")
+    print(f"import app: {report['import'] * 1000:.0f} ms, first /health: {report['first_health'] * 1000:.0f} ms "
+          f"(status {report['health_status']})")
+    print("Warm-up: " + ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in report['warm_up'].items()))
+
+    if startup_ms > args.budget_ms:
+        print(f"Startup took {startup_ms:.0f} ms, over the {args.budget_ms:.0f} ms budget")
+        sys.exit(1)
+    print(f"Startup took {startup_ms:.0f} ms, within the {args.budget_ms:.0f} ms budget")
+
+
+if __name__ == '__main__':
+    main()
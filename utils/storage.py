@@ -0,0 +1,947 @@
+import argparse
+import gzip
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from utils.db import SQLiteDatabase
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Session fields stored outside the generic state blob in SQLite
+SESSION_COLUMNS = ('session_id', 'user_id', 'document_name', 'questions', 'user_answers')
+
+# Answer fields moved into the shared question table of a history file
+SHARED_QUESTION_FIELDS = ('question', 'correct_answer', 'explanation')
+
+FORMAT_SUFFIXES = {'json': '.json', 'msgpack': '.msgpack'}
+COMPRESSION_SUFFIXES = {'none': '', 'gzip': '.gz', 'zstd': '.zst'}
+# Every file suffix a codec can produce, longest first for suffix matching
+ALL_SUFFIXES = sorted((fmt + comp for fmt in FORMAT_SUFFIXES.values()
+                       for comp in COMPRESSION_SUFFIXES.values()), key=len, reverse=True)
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+class Codec:
+    """On-disk encoding of session and history files."""
+
+    def __init__(self, data_format='json', compression='none'):
+        """
+        Initialize codec.
+
+        Files are self-describing, so any codec reads files written in
+        every other format.
+
+        Args:
+            data_format: 'json' (minified) or 'msgpack'
+            compression: 'none', 'gzip' or 'zstd'
+
+        Raises:
+            ValueError: If the format or compression is unknown or its package is missing
+        """
+        if data_format not in FORMAT_SUFFIXES:
+            raise ValueError(f"Unknown storage format: {data_format}")
+        if compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"Unknown storage compression: {compression}")
+        if data_format == 'msgpack' and msgpack is None:
+            raise ValueError("msgpack storage requires the msgpack package (pip install msgpack)")
+        if compression == 'zstd' and zstandard is None:
+            raise ValueError("zstd compression requires the zstandard package (pip install zstandard)")
+
+        self.data_format = data_format
+        self.compression = compression
+        self.suffix = FORMAT_SUFFIXES[data_format] + COMPRESSION_SUFFIXES[compression]
+
+    def dumps(self, obj):
+        """
+        Encode a record.
+
+        Args:
+            obj: JSON-compatible data
+
+        Returns:
+            bytes: Encoded (and compressed) data
+        """
+        if self.data_format == 'msgpack':
+            data = msgpack.packb(obj, use_bin_type=True)
+        else:
+            data = json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+        if self.compression == 'gzip':
+            return gzip.compress(data, compresslevel=6)
+        if self.compression == 'zstd':
+            return zstandard.ZstdCompressor(level=3).compress(data)
+        return data
+
+    def loads(self, data):
+        """
+        Decode a record written in any supported format.
+
+        Args:
+            data: File contents
+
+        Returns:
+            Decoded data
+        """
+        if data.startswith(GZIP_MAGIC):
+            data = gzip.decompress(data)
+        elif data.startswith(ZSTD_MAGIC):
+            if zstandard is None:
+                raise ValueError("Reading zstd files requires the zstandard package")
+            data = zstandard.ZstdDecompressor().decompress(data)
+
+        # JSON documents start with '{' (after optional whitespace); msgpack maps never do
+        if data.lstrip()[:1] in (b'{', b'['):
+            return json.loads(data)
+        if msgpack is None:
+            raise ValueError("Reading msgpack files requires the msgpack package")
+        return msgpack.unpackb(data, raw=False)
+
+
+class JSONFileStorage:
+    """Storage backend keeping one file per session and per user history."""
+
+    def __init__(self, sessions_dir='data/sessions', history_dir='data/history', codec=None):
+        """
+        Initialize file storage.
+
+        Args:
+            sessions_dir: Directory for session files
+            history_dir: Directory for user history files
+            codec: File encoding (default: minified JSON)
+        """
+        self.sessions_dir = Path(sessions_dir)
+        self.history_dir = Path(history_dir)
+        self.codec = codec or Codec()
+        # File stem -> copy found in another format, removed once rewritten in the current one
+        self._stale = {}
+
+        # Ensure directories exist
+        self.sessions_dir.mkdir(parents=True, exist_ok=True)
+        self.history_dir.mkdir(parents=True, exist_ok=True)
+
+    def _session_file(self, session_id):
+        """Path of a session's file on disk."""
+        return self.sessions_dir / f'session_{session_id}{self.codec.suffix}'
+
+    def _history_file(self, user_id):
+        """Path of a user's history file on disk."""
+        return self.history_dir / f'user_{user_id}_history{self.codec.suffix}'
+
+    def _locate(self, path):
+        """
+        Find a file in the current format or, failing that, any older one.
+
+        Args:
+            path: Path in the current format
+
+        Returns:
+            Path: Existing file, or None if not found
+        """
+        if path.exists():
+            return path
+
+        stem = path.name[:-len(self.codec.suffix)]
+        for suffix in ALL_SUFFIXES:
+            candidate = path.with_name(stem + suffix)
+            if candidate != path and candidate.exists():
+                self._stale[stem] = candidate
+                return candidate
+
+        return None
+
+    def _read(self, path):
+        """Decode a file in whichever format it was written, or None if not found."""
+        located = self._locate(path)
+        if located is None:
+            return None
+
+        try:
+            return self.codec.loads(located.read_bytes())
+        except FileNotFoundError:
+            return None
+
+    def _write(self, path, obj):
+        """Write a file in the current format, replacing any copy in an older one."""
+        _atomic_write(path, self.codec.dumps(obj))
+
+        stale = self._stale.pop(path.name[:-len(self.codec.suffix)], None)
+        if stale is not None and stale != path:
+            try:
+                stale.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _files(self, directory, prefix):
+        """Yield (key, path) for every stored file named prefix + key + suffix."""
+        for path in directory.glob(f'{prefix}*'):
+            suffix = _known_suffix(path.name)
+            if suffix:
+                yield path.name[len(prefix):-len(suffix)], path
+
+    def load_session(self, session_id):
+        """
+        Read a session.
+
+        Args:
+            session_id: Session UUID
+
+        Returns:
+            dict: Session data or None if not found
+        """
+        return self._read(self._session_file(session_id))
+
+    def save_session(self, session, changed_fields=None, new_answers=None):
+        """
+        Persist a session.
+
+        The file backend always rewrites the whole file, so the change
+        details are ignored.
+
+        Args:
+            session: Full session dict
+            changed_fields: Names of fields changed since the last save (None for a new session)
+            new_answers: Answer records appended since the last save
+        """
+        self._write(self._session_file(session['session_id']), session)
+
+    def session_version(self, session_id):
+        """
+        Get a token that changes whenever the session is written.
+
+        Args:
+            session_id: Session UUID
+
+        Returns:
+            tuple: File identity and mtime, or None if not found
+        """
+        session_file = self._locate(self._session_file(session_id))
+        try:
+            stat = session_file.stat() if session_file else None
+        except FileNotFoundError:
+            stat = None
+        if stat is None:
+            return None
+
+        # Every write renames a new file into place, so the inode changes too
+        return (stat.st_ino, stat.st_mtime_ns)
+
+    def delete_session(self, session_id):
+        """
+        Delete a session.
+
+        Args:
+            session_id: Session UUID
+        """
+        session_file = self._locate(self._session_file(session_id))
+        if session_file:
+            self._stale.pop(f'session_{session_id}', None)
+            session_file.unlink()
+
+    def expire_sessions(self, before):
+        """
+        Delete sessions last written before a timestamp.
+
+        Args:
+            before: Unix timestamp threshold
+
+        Returns:
+            list: IDs of deleted sessions
+        """
+        expired = []
+
+        for session_id, session_file in self._files(self.sessions_dir, 'session_'):
+            # Check file modification time
+            if session_file.stat().st_mtime < before:
+                session_file.unlink()
+                expired.append(session_id)
+
+        return expired
+
+    def session_updated_at(self, session_id):
+        """
+        Get when a session was last written.
+
+        Args:
+            session_id: Session UUID
+
+        Returns:
+            float: Unix timestamp, or None if not found
+        """
+        session_file = self._locate(self._session_file(session_id))
+        try:
+            return session_file.stat().st_mtime if session_file else None
+        except FileNotFoundError:
+            return None
+
+    def iter_session_updates(self):
+        """Yield (session_id, last write time) for every stored session."""
+        for session_id, session_file in self._files(self.sessions_dir, 'session_'):
+            try:
+                yield session_id, session_file.stat().st_mtime
+            except FileNotFoundError:
+                continue
+
+    def iter_sessions(self):
+        """Yield every stored session."""
+        for _, session_file in self._files(self.sessions_dir, 'session_'):
+            yield self.codec.loads(session_file.read_bytes())
+
+    def add_history(self, user_id, quiz_record, limit=50, stats=None):
+        """
+        Add a completed quiz to the front of a user's history.
+
+        Args:
+            user_id: Browser-generated user UUID
+            quiz_record: Completed quiz record
+            limit: Maximum quizzes kept per user
+            stats: Updated aggregates to store with the history (None keeps the current ones)
+        """
+        # Load or create user history
+        history_file = self._history_file(user_id)
+        history = self._read(history_file) or {}
+        quizzes = unpack_history(history)
+
+        # Append quiz record
+        quizzes.insert(0, quiz_record)  # Most recent first
+
+        # Keep only the most recent quizzes
+        self._write(history_file, pack_history(user_id, quizzes[:limit], stats or history.get('stats')))
+
+    def get_history(self, user_id):
+        """
+        Get a user's quiz history, most recent first.
+
+        Args:
+            user_id: Browser-generated user UUID
+
+        Returns:
+            list: Quiz records
+        """
+        history = self._read(self._history_file(user_id))
+
+        if history is None:
+            return []
+
+        return unpack_history(history)
+
+    def get_history_page(self, user_id, offset=0, limit=20, reviews=False):
+        """
+        Get a slice of a user's history, most recent first.
+
+        The whole history file is still read and decoded, so unlike the
+        SQLite backend this saves no I/O; only the requested quizzes get
+        their questions_review expanded.
+
+        Args:
+            user_id: Browser-generated user UUID
+            offset: Quizzes to skip
+            limit: Maximum quizzes returned
+            reviews: Include each quiz's questions_review
+
+        Returns:
+            tuple: (quiz records, total quizzes stored)
+        """
+        history = self._read(self._history_file(user_id)) or {}
+        quizzes = history.get('quizzes', [])
+        page = dict(history, quizzes=quizzes[offset:offset + limit])
+
+        if reviews:
+            return unpack_history(page), len(quizzes)
+        return [_summary(quiz) for quiz in page['quizzes']], len(quizzes)
+
+    def get_history_quiz(self, user_id, quiz_id):
+        """
+        Get one quiz from a user's history.
+
+        Args:
+            user_id: Browser-generated user UUID
+            quiz_id: Quiz (session) UUID
+
+        Returns:
+            dict: Full quiz record, or None if not found
+        """
+        history = self._read(self._history_file(user_id)) or {}
+
+        for quiz in history.get('quizzes', []):
+            if quiz.get('quiz_id') == quiz_id:
+                return unpack_history(dict(history, quizzes=[quiz]))[0]
+
+        return None
+
+    def get_history_stats(self, user_id):
+        """
+        Get a user's stored history aggregates.
+
+        Args:
+            user_id: Browser-generated user UUID
+
+        Returns:
+            dict: Aggregates, or None if none are stored yet
+        """
+        history = self._read(self._history_file(user_id)) or {}
+        return history.get('stats')
+
+    def iter_histories(self):
+        """Yield (user_id, quizzes) for every stored history."""
+        for _, history_file in self._files(self.history_dir, 'user_'):
+            history = self.codec.loads(history_file.read_bytes())
+            yield history['user_id'], unpack_history(history)
+
+    def compact(self):
+        """
+        Rewrite every session and history file in the current format.
+
+        Returns:
+            dict: Rewritten session and history file counts
+        """
+        counts = {'sessions': 0, 'histories': 0}
+
+        for session_id, session_file in list(self._files(self.sessions_dir, 'session_')):
+            self._stale[f'session_{session_id}'] = session_file
+            self._write(self._session_file(session_id), self.codec.loads(session_file.read_bytes()))
+            counts['sessions'] += 1
+
+        for key, history_file in list(self._files(self.history_dir, 'user_')):
+            history = self.codec.loads(history_file.read_bytes())
+            self._stale[f'user_{key}'] = history_file
+            self._write(self._history_file(history['user_id']),
+                        pack_history(history['user_id'], unpack_history(history), history.get('stats')))
+            counts['histories'] += 1
+
+        return counts
+
+    def disk_usage(self):
+        """
+        Measure the space taken by stored files.
+
+        Returns:
+            dict: File count and bytes for sessions and history
+        """
+        usage = {}
+        for name, directory, prefix in (('sessions', self.sessions_dir, 'session_'),
+                                        ('history', self.history_dir, 'user_')):
+            sizes = [path.stat().st_size for _, path in self._files(directory, prefix)]
+            usage[name] = {'files': len(sizes), 'bytes': sum(sizes)}
+        return usage
+
+
+def pack_history(user_id, quizzes, stats=None):
+    """
+    Build a history document with question text stored once.
+
+    Answers carrying a question-bank 'qid' keep only a reference; the
+    question, correct answer and explanation move to a 'questions' table
+    shared by every quiz in the file.
+
+    Args:
+        user_id: Browser-generated user UUID
+        quizzes: Quiz records, most recent first
+        stats: Aggregates stored alongside, if any
+
+    Returns:
+        dict: History document
+    """
+    questions = {}
+    packed = []
+
+    for quiz in quizzes:
+        review = []
+        for answer in quiz.get('questions_review', []):
+            qid = answer.get('qid')
+            shared = {field: answer.get(field) for field in SHARED_QUESTION_FIELDS}
+            # Same wording with a different answer keeps its own copy
+            if qid and questions.setdefault(qid, shared) == shared:
+                answer = {key: value for key, value in answer.items()
+                          if key not in SHARED_QUESTION_FIELDS}
+            review.append(answer)
+        packed.append(dict(quiz, questions_review=review))
+
+    history = {'user_id': user_id, 'quizzes': packed, 'questions': questions}
+    if stats is not None:
+        history['stats'] = stats
+    return history
+
+
+def unpack_history(history):
+    """
+    Expand a history document into full quiz records.
+
+    Args:
+        history: Document written by pack_history, or an older one without a questions table
+
+    Returns:
+        list: Quiz records, most recent first
+    """
+    questions = history.get('questions', {})
+    quizzes = []
+
+    for quiz in history.get('quizzes', []):
+        review = [dict(questions[answer['qid']], **answer)
+                  if 'question' not in answer and answer.get('qid') in questions else answer
+                  for answer in quiz.get('questions_review', [])]
+        quizzes.append(dict(quiz, questions_review=review))
+
+    return quizzes
+
+
+def _summary(quiz_record):
+    """Quiz record without its questions_review."""
+    return {key: value for key, value in quiz_record.items() if key != 'questions_review'}
+
+
+def _known_suffix(name):
+    """Storage file suffix of a file name, or None for other files."""
+    for suffix in ALL_SUFFIXES:
+        if name.endswith(suffix):
+            return suffix
+    return None
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    document_name TEXT,
+    questions TEXT NOT NULL,
+    state TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions (updated_at);
+
+CREATE TABLE IF NOT EXISTS answers (
+    session_id TEXT NOT NULL,
+    question_num INTEGER NOT NULL,
+    record TEXT NOT NULL,
+    answered_at REAL NOT NULL,
+    PRIMARY KEY (session_id, question_num)
+);
+
+CREATE TABLE IF NOT EXISTS history (
+    quiz_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    completed_at TEXT NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_history_user ON history (user_id, completed_at DESC);
+
+CREATE TABLE IF NOT EXISTS history_stats (
+    user_id TEXT PRIMARY KEY,
+    stats TEXT NOT NULL
+);
+"""
+
+class SQLiteStorage:
+    """Storage backend using indexed SQLite tables in WAL mode."""
+
+    def __init__(self, db_path='data/webquiz.db'):
+        """
+        Initialize SQLite storage.
+
+        Args:
+            db_path: Path to the SQLite database file
+        """
+        self.db = SQLiteDatabase(db_path, SQLITE_SCHEMA)
+
+    def load_session(self, session_id):
+        """
+        Read a session, assembling its answers from the answers table.
+
+        Args:
+            session_id: Session UUID
+
+        Returns:
+            dict: Session data or None if not found
+        """
+        row = self.db.execute(
+            'SELECT * FROM sessions WHERE session_id = ?', (session_id,)
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        answers = self.db.execute(
+            'SELECT record FROM answers WHERE session_id = ? ORDER BY question_num',
+            (session_id,)
+        ).fetchall()
+
+        session = json.loads(row['state'])
+        session.update({
+            'session_id': row['session_id'],
+            'user_id': row['user_id'],
+            'document_name': row['document_name'],
+            'questions': json.loads(row['questions']),
+            'user_answers': [json.loads(answer['record']) for answer in answers]
+        })
+        return session
+
+    def save_session(self, session, changed_fields=None, new_answers=None):
+        """
+        Persist a session.
+
+        New answers are appended as individual rows; the questions blob is
+        only rewritten when the questions changed.
+
+        Args:
+            session: Full session dict
+            changed_fields: Names of fields changed since the last save (None for a new session)
+            new_answers: Answer records appended since the last save
+        """
+        session_id = session['session_id']
+        state = json.dumps({key: value for key, value in session.items()
+                            if key not in SESSION_COLUMNS})
+        now = time.time()
+
+        with self.db.transaction() as conn:
+            if changed_fields is None:
+                conn.execute(
+                    'INSERT OR REPLACE INTO sessions '
+                    '(session_id, user_id, document_name, questions, state, created_at, updated_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (session_id, session['user_id'], session['document_name'],
+                     json.dumps(session['questions']), state, now, now)
+                )
+                new_answers = session['user_answers']
+            elif 'questions' in changed_fields:
+                conn.execute(
+                    'UPDATE sessions SET questions = ?, state = ?, updated_at = ? WHERE session_id = ?',
+                    (json.dumps(session['questions']), state, now, session_id)
+                )
+            else:
+                conn.execute(
+                    'UPDATE sessions SET state = ?, updated_at = ? WHERE session_id = ?',
+                    (state, now, session_id)
+                )
+
+            if changed_fields is not None and 'user_answers' in changed_fields:
+                # Wholesale replacement of the answer list
+                conn.execute('DELETE FROM answers WHERE session_id = ?', (session_id,))
+                new_answers = session['user_answers']
+
+            for index, answer in enumerate(new_answers or []):
+                conn.execute(
+                    'INSERT OR IGNORE INTO answers (session_id, question_num, record, answered_at) '
+                    'VALUES (?, ?, ?, ?)',
+                    (session_id, answer.get('question_num', index), json.dumps(answer), now)
+                )
+
+    def session_version(self, session_id):
+        """
+        Get a token that changes whenever the session is written.
+
+        Args:
+            session_id: Session UUID
+
+        Returns:
+            float: Last write time, or None if not found
+        """
+        row = self.db.execute(
+            'SELECT updated_at FROM sessions WHERE session_id = ?', (session_id,)
+        ).fetchone()
+
+        return row['updated_at'] if row else None
+
+    def delete_session(self, session_id):
+        """
+        Delete a session and its answers.
+
+        Args:
+            session_id: Session UUID
+        """
+        with self.db.transaction() as conn:
+            conn.execute('DELETE FROM answers WHERE session_id = ?', (session_id,))
+            conn.execute('DELETE FROM sessions WHERE session_id = ?', (session_id,))
+
+    def expire_sessions(self, before):
+        """
+        Delete sessions last written before a timestamp, using the updated_at index.
+
+        Args:
+            before: Unix timestamp threshold
+
+        Returns:
+            list: IDs of deleted sessions
+        """
+        with self.db.transaction() as conn:
+            expired = [row['session_id'] for row in conn.execute(
+                'SELECT session_id FROM sessions WHERE updated_at < ?', (before,)
+            )]
+            for session_id in expired:
+                conn.execute('DELETE FROM answers WHERE session_id = ?', (session_id,))
+                conn.execute('DELETE FROM sessions WHERE session_id = ?', (session_id,))
+
+        return expired
+
+    def session_updated_at(self, session_id):
+        """
+        Get when a session was last written.
+
+        Args:
+            session_id: Session UUID
+
+        Returns:
+            float: Unix timestamp, or None if not found
+        """
+        return self.session_version(session_id)
+
+    def iter_session_updates(self):
+        """Yield (session_id, last write time) for every stored session."""
+        for row in self.db.execute('SELECT session_id, updated_at FROM sessions').fetchall():
+            yield row['session_id'], row['updated_at']
+
+    def iter_sessions(self):
+        """Yield every stored session."""
+        for row in self.db.execute('SELECT session_id FROM sessions').fetchall():
+            session = self.load_session(row['session_id'])
+            if session:
+                yield session
+
+    def add_history(self, user_id, quiz_record, limit=50, stats=None):
+        """
+        Add a completed quiz to a user's history.
+
+        Args:
+            user_id: Browser-generated user UUID
+            quiz_record: Completed quiz record
+            limit: Maximum quizzes kept per user
+            stats: Updated aggregates to store in the same transaction (None keeps the current ones)
+        """
+        with self.db.transaction() as conn:
+            if stats is not None:
+                conn.execute(
+                    'INSERT OR REPLACE INTO history_stats (user_id, stats) VALUES (?, ?)',
+                    (user_id, json.dumps(stats))
+                )
+            conn.execute(
+                'INSERT OR REPLACE INTO history (quiz_id, user_id, completed_at, record) '
+                'VALUES (?, ?, ?, ?)',
+                (quiz_record['quiz_id'], user_id, quiz_record['completed_at'],
+                 json.dumps(quiz_record))
+            )
+            conn.execute(
+                'DELETE FROM history WHERE user_id = ? AND quiz_id NOT IN ('
+                'SELECT quiz_id FROM history WHERE user_id = ? ORDER BY completed_at DESC LIMIT ?)',
+                (user_id, user_id, limit)
+            )
+
+    def get_history(self, user_id):
+        """
+        Get a user's quiz history, most recent first.
+
+        Args:
+            user_id: Browser-generated user UUID
+
+        Returns:
+            list: Quiz records
+        """
+        rows = self.db.execute(
+            'SELECT record FROM history WHERE user_id = ? ORDER BY completed_at DESC',
+            (user_id,)
+        ).fetchall()
+
+        return [json.loads(row['record']) for row in rows]
+
+    def get_history_page(self, user_id, offset=0, limit=20, reviews=False):
+        """
+        Get a slice of a user's history from the (user_id, completed_at) index.
+
+        Args:
+            user_id: Browser-generated user UUID
+            offset: Quizzes to skip
+            limit: Maximum quizzes returned
+            reviews: Include each quiz's questions_review
+
+        Returns:
+            tuple: (quiz records, total quizzes stored)
+        """
+        # Let SQLite drop the reviews so they are never decoded here
+        column = 'record' if reviews else "json_remove(record, '$.questions_review')"
+        rows = self.db.execute(
+            f'SELECT {column} AS record FROM history WHERE user_id = ? '
+            'ORDER BY completed_at DESC LIMIT ? OFFSET ?',
+            (user_id, limit, offset)
+        ).fetchall()
+        total = self.db.execute(
+            'SELECT COUNT(*) FROM history WHERE user_id = ?', (user_id,)
+        ).fetchone()[0]
+
+        return [json.loads(row['record']) for row in rows], total
+
+    def get_history_quiz(self, user_id, quiz_id):
+        """
+        Get one quiz from a user's history.
+
+        Args:
+            user_id: Browser-generated user UUID
+            quiz_id: Quiz (session) UUID
+
+        Returns:
+            dict: Full quiz record, or None if not found
+        """
+        row = self.db.execute(
+            'SELECT record FROM history WHERE quiz_id = ? AND user_id = ?', (quiz_id, user_id)
+        ).fetchone()
+
+        return json.loads(row['record']) if row else None
+
+    def get_history_stats(self, user_id):
+        """
+        Get a user's stored history aggregates.
+
+        Args:
+            user_id: Browser-generated user UUID
+
+        Returns:
+            dict: Aggregates, or None if none are stored yet
+        """
+        row = self.db.execute(
+            'SELECT stats FROM history_stats WHERE user_id = ?', (user_id,)
+        ).fetchone()
+
+        return json.loads(row['stats']) if row else None
+
+    def iter_histories(self):
+        """Yield (user_id, quizzes) for every stored history."""
+        user_ids = [row['user_id'] for row in
+                    self.db.execute('SELECT DISTINCT user_id FROM history').fetchall()]
+        for user_id in user_ids:
+            yield user_id, self.get_history(user_id)
+
+
+def _atomic_write(path, payload):
+    """
+    Replace a file in one step so readers never see a partial write.
+
+    Args:
+        path: Destination path
+        payload: Bytes to write
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def create_storage(backend='json', sessions_dir='data/sessions', history_dir='data/history',
+                   db_path='data/webquiz.db', data_format='json', compression='none'):
+    """
+    Build the configured storage backend.
+
+    Args:
+        backend: 'json' or 'sqlite'
+        sessions_dir: Session directory for the JSON backend
+        history_dir: History directory for the JSON backend
+        db_path: Database path for the SQLite backend
+        data_format: File format for the JSON backend ('json' or 'msgpack')
+        compression: File compression for the JSON backend ('none', 'gzip' or 'zstd')
+
+    Returns:
+        JSONFileStorage or SQLiteStorage
+    """
+    if backend == 'json':
+        return JSONFileStorage(sessions_dir, history_dir, Codec(data_format, compression))
+    elif backend == 'sqlite':
+        return SQLiteStorage(db_path)
+    else:
+        raise ValueError(f"Unknown storage backend: {backend}")
+
+
+def migrate(source, target):
+    """
+    Copy all sessions and histories from one backend to another.
+
+    Each user's history aggregates are copied too, or rebuilt from the
+    stored quizzes when the source has none.
+
+    Args:
+        source: Storage backend to read from
+        target: Storage backend to write to
+
+    Returns:
+        dict: Counts of migrated sessions, users and quizzes
+    """
+    counts = {'sessions': 0, 'users': 0, 'quizzes': 0}
+
+    for session in source.iter_sessions():
+        target.save_session(session)
+        counts['sessions'] += 1
+
+    # session_manager imports this module
+    from utils.session_manager import update_stats
+
+    for user_id, quizzes in source.iter_histories():
+        stats = source.get_history_stats(user_id)
+        if stats is None:
+            for quiz_record in reversed(quizzes):
+                stats = update_stats(stats, quiz_record)
+
+        # Insert oldest first so the target keeps most-recent-first order
+        for index, quiz_record in enumerate(reversed(quizzes)):
+            last = index == len(quizzes) - 1
+            target.add_history(user_id, quiz_record, stats=stats if last else None)
+            counts['quizzes'] += 1
+        counts['users'] += 1
+
+    return counts
+
+
+def main():
+    """Command line entry point: import the JSON data/ tree into SQLite, or compact it in place."""
+    parser = argparse.ArgumentParser(description='Migrate WebQuiz sessions and history to SQLite, '
+                                                 'or rewrite the files in a compact format.')
+    parser.add_argument('--sessions-dir', default='data/sessions')
+    parser.add_argument('--history-dir', default='data/history')
+    parser.add_argument('--db', default='data/webquiz.db')
+    parser.add_argument('--compact', action='store_true',
+                        help='Rewrite session and history files with --format and --compression')
+    parser.add_argument('--format', default='json', choices=sorted(FORMAT_SUFFIXES))
+    parser.add_argument('--compression', default='none', choices=sorted(COMPRESSION_SUFFIXES))
+    args = parser.parse_args()
+
+    started = datetime.now()
+
+    if args.compact:
+        storage = JSONFileStorage(args.sessions_dir, args.history_dir,
+                                  Codec(args.format, args.compression))
+        before = storage.disk_usage()
+        counts = storage.compact()
+        after = storage.disk_usage()
+        elapsed = (datetime.now() - started).total_seconds()
+
+        print(f"Rewrote {counts['sessions']} sessions and {counts['histories']} histories "
+              f"as {args.format}/{args.compression} in {elapsed:.1f}s")
+        for name in ('sessions', 'history'):
+            ratio = after[name]['bytes'] / before[name]['bytes'] if before[name]['bytes'] else 1
+            print(f"{name}: {before[name]['files']} files, {before[name]['bytes'] / 1024:.1f} KB -> "
+                  f"{after[name]['bytes'] / 1024:.1f} KB ({ratio:.0%} of the original size)")
+        return
+
+    counts = migrate(
+        JSONFileStorage(args.sessions_dir, args.history_dir),
+        SQLiteStorage(args.db)
+    )
+    elapsed = (datetime.now() - started).total_seconds()
+
+    print(f"Migrated {counts['sessions']} sessions and {counts['quizzes']} quizzes "
+          f"for {counts['users']} users into {args.db} in {elapsed:.1f}s")
+
+
+if __name__ == '__main__':
+    main()